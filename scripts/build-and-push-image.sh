@@ -12,5 +12,6 @@ if [ -z "$image_name" ]; then
 fi
 
 echo "Building image ${image_name} for dev"
-docker build -t ${image_name}-image -f docker/${image_name}.Dockerfile .
+# EXTRAS=parquet adds the dependencies of the Parquet sink
+docker build -t ${image_name}-image --build-arg EXTRAS="${EXTRAS:-}" -f docker/${image_name}.Dockerfile .
 kind load docker-image ${image_name}-image --name knowbe4
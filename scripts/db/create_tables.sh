@@ -6,8 +6,8 @@ DB_USER="SA"
 DB_PASSWORD="FFy2kGJzm2JO9Pb"
 DB_NAME="MDEndpoints"
 
-# SQL script file location
-SQL_SCRIPT_PATH="create_tables.sql"
+# SQL script file location, SQL_SCRIPT_PATH=create_tables_typed.sql for the typed schema
+SQL_SCRIPT_PATH="${SQL_SCRIPT_PATH:-create_tables.sql}"
 CONTAINER_NAME="mssql-server-persistence"
 
 echo "Creating database 'AdvanceHuntingQuery' if it doesn't exist..."
@@ -28,6 +28,9 @@ IF OBJECT_ID('dbo.ep_baseline_profiles', 'U') IS NOT NULL DROP TABLE dbo.ep_base
 IF OBJECT_ID('dbo.ep_baseline_configurations', 'U') IS NOT NULL DROP TABLE dbo.ep_baseline_configurations;
 IF OBJECT_ID('dbo.ep_software', 'U') IS NOT NULL DROP TABLE dbo.ep_software;
 IF OBJECT_ID('dbo.ep_execution_log', 'U') IS NOT NULL DROP TABLE dbo.ep_execution_log;
+IF OBJECT_ID('dbo.ep_sync_watermark', 'U') IS NOT NULL DROP TABLE dbo.ep_sync_watermark;
+IF OBJECT_ID('dbo.ep_checkpoint', 'U') IS NOT NULL DROP TABLE dbo.ep_checkpoint;
+IF OBJECT_ID('dbo.ep_row_hash', 'U') IS NOT NULL DROP TABLE dbo.ep_row_hash;
 
 -- 1. Execution log table (removed id column)
 CREATE TABLE ep_endpoint_execution_log (
@@ -162,7 +165,8 @@ CREATE TABLE ep_secure_config_assessment (
     isApplicable NVARCHAR(255),
     isExpectedUserImpact NVARCHAR(255),
     configurationName NVARCHAR(255),
-    recommendationReference NVARCHAR(255)
+    recommendationReference NVARCHAR(255),
+    rowKeyHash BIGINT NULL
 );
 
 -- 7. Software Inventory (removed id and constraints)
@@ -375,7 +379,8 @@ CREATE TABLE ep_certificate_assessments (
     keyUsage NTEXT,
     extendedKeyUsage NTEXT,
     rbacGroupId NVARCHAR(255),
-    rbacGroupName NVARCHAR(255)
+    rbacGroupName NVARCHAR(255),
+    rowKeyHash BIGINT NULL
 );
 
 -- 18. Indicators (removed id column)
@@ -494,7 +499,8 @@ CREATE TABLE ep_baseline_compliance_assessment (
     currentValue NTEXT,
     source NTEXT,
     isExempt NVARCHAR(255),
-    rawValue NTEXT
+    rawValue NTEXT,
+    rowKeyHash BIGINT NULL
 );
 
 -- 26. Baseline Profiles (removed id column)
@@ -563,7 +569,40 @@ CREATE TABLE ep_execution_log (
     end_time_endpoint NVARCHAR(255) NOT NULL,
     status NVARCHAR(50) NOT NULL,
     total_rows INT NULL,
+    retries INT NOT NULL DEFAULT 0,
     created_at DATETIME2(3) DEFAULT GETDATE(),
     updated_at DATETIME2(3) DEFAULT GETDATE()
 );
+
+-- High-water marks of the incrementally synced tables
+CREATE TABLE ep_sync_watermark (
+    table_name NVARCHAR(255) NOT NULL PRIMARY KEY,
+    watermark NVARCHAR(255) NULL,
+    full_sync_time DATETIME2(3) NULL,
+    updated_at DATETIME2(3) DEFAULT GETDATE()
+);
+
+-- Position of every endpoint in the current run, for resuming after a restart
+CREATE TABLE ep_checkpoint (
+    table_name NVARCHAR(255) NOT NULL PRIMARY KEY,
+    target_table NVARCHAR(255) NOT NULL,
+    status NVARCHAR(50) NOT NULL,
+    resume_url NVARCHAR(MAX) NULL,
+    skip_rows INT NOT NULL DEFAULT 0,
+    rows_committed BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME2(3) DEFAULT GETDATE()
+);
+
+-- Hashes of the rows of the "change_detection" tables as of their last load,
+-- by the key hash stored in the rowKeyHash column of each row
+CREATE TABLE ep_row_hash (
+    table_name NVARCHAR(255) NOT NULL,
+    key_hash BIGINT NOT NULL,
+    row_hash BIGINT NOT NULL,
+    PRIMARY KEY (table_name, key_hash)
+);
+
+CREATE INDEX IX_ep_secure_config_assessment_rowKeyHash ON ep_secure_config_assessment (rowKeyHash);
+CREATE INDEX IX_ep_certificate_assessments_rowKeyHash ON ep_certificate_assessments (rowKeyHash);
+CREATE INDEX IX_ep_baseline_compliance_assessment_rowKeyHash ON ep_baseline_compliance_assessment (rowKeyHash);
 GO
@@ -0,0 +1,612 @@
+-- Typed variant of create_tables.sql: the same tables and columns, with
+-- timestamps as DATETIME2, counts as INT, scores as FLOAT, flags as BIT and
+-- NVARCHAR(MAX) instead of the deprecated NTEXT. Load it with TYPED_BINDING=true.
+
+-- Drop existing tables if they exist to avoid conflicts
+IF OBJECT_ID('dbo.ep_endpoint_execution_log', 'U') IS NOT NULL DROP TABLE dbo.ep_endpoint_execution_log;
+IF OBJECT_ID('dbo.ep_vulnerabilities', 'U') IS NOT NULL DROP TABLE dbo.ep_vulnerabilities;
+IF OBJECT_ID('dbo.ep_vulnerabilities_by_machine', 'U') IS NOT NULL DROP TABLE dbo.ep_vulnerabilities_by_machine;
+IF OBJECT_ID('dbo.ep_device_av_info', 'U') IS NOT NULL DROP TABLE dbo.ep_device_av_info;
+IF OBJECT_ID('dbo.ep_machines', 'U') IS NOT NULL DROP TABLE dbo.ep_machines;
+IF OBJECT_ID('dbo.ep_secure_config_assessment', 'U') IS NOT NULL DROP TABLE dbo.ep_secure_config_assessment;
+IF OBJECT_ID('dbo.ep_software_inventory', 'U') IS NOT NULL DROP TABLE dbo.ep_software_inventory;
+IF OBJECT_ID('dbo.ep_non_product_software_inventory', 'U') IS NOT NULL DROP TABLE dbo.ep_non_product_software_inventory;
+IF OBJECT_ID('dbo.ep_software_vulnerabilities_by_machine', 'U') IS NOT NULL DROP TABLE dbo.ep_software_vulnerabilities_by_machine;
+IF OBJECT_ID('dbo.ep_remediation_tasks', 'U') IS NOT NULL DROP TABLE dbo.ep_remediation_tasks;
+IF OBJECT_ID('dbo.ep_alerts', 'U') IS NOT NULL DROP TABLE dbo.ep_alerts;
+IF OBJECT_ID('dbo.ep_device_authenticated_scan_definitions', 'U') IS NOT NULL DROP TABLE dbo.ep_device_authenticated_scan_definitions;
+IF OBJECT_ID('dbo.ep_device_authenticated_scan_agents', 'U') IS NOT NULL DROP TABLE dbo.ep_device_authenticated_scan_agents;
+IF OBJECT_ID('dbo.ep_browser_extensions_inventory', 'U') IS NOT NULL DROP TABLE dbo.ep_browser_extensions_inventory;
+IF OBJECT_ID('dbo.ep_browser_extensions_permissions', 'U') IS NOT NULL DROP TABLE dbo.ep_browser_extensions_permissions;
+IF OBJECT_ID('dbo.ep_investigations', 'U') IS NOT NULL DROP TABLE dbo.ep_investigations;
+IF OBJECT_ID('dbo.ep_certificate_assessments', 'U') IS NOT NULL DROP TABLE dbo.ep_certificate_assessments;
+IF OBJECT_ID('dbo.ep_indicators', 'U') IS NOT NULL DROP TABLE dbo.ep_indicators;
+IF OBJECT_ID('dbo.ep_info_gathering', 'U') IS NOT NULL DROP TABLE dbo.ep_info_gathering;
+IF OBJECT_ID('dbo.ep_library_files', 'U') IS NOT NULL DROP TABLE dbo.ep_library_files;
+IF OBJECT_ID('dbo.ep_machine_actions', 'U') IS NOT NULL DROP TABLE dbo.ep_machine_actions;
+IF OBJECT_ID('dbo.ep_exposure_score_by_machine_groups', 'U') IS NOT NULL DROP TABLE dbo.ep_exposure_score_by_machine_groups;
+IF OBJECT_ID('dbo.ep_exposure_score', 'U') IS NOT NULL DROP TABLE dbo.ep_exposure_score;
+IF OBJECT_ID('dbo.ep_device_secure_score', 'U') IS NOT NULL DROP TABLE dbo.ep_device_secure_score;
+IF OBJECT_ID('dbo.ep_baseline_compliance_assessment', 'U') IS NOT NULL DROP TABLE dbo.ep_baseline_compliance_assessment;
+IF OBJECT_ID('dbo.ep_baseline_profiles', 'U') IS NOT NULL DROP TABLE dbo.ep_baseline_profiles;
+IF OBJECT_ID('dbo.ep_baseline_configurations', 'U') IS NOT NULL DROP TABLE dbo.ep_baseline_configurations;
+IF OBJECT_ID('dbo.ep_software', 'U') IS NOT NULL DROP TABLE dbo.ep_software;
+IF OBJECT_ID('dbo.ep_execution_log', 'U') IS NOT NULL DROP TABLE dbo.ep_execution_log;
+IF OBJECT_ID('dbo.ep_sync_watermark', 'U') IS NOT NULL DROP TABLE dbo.ep_sync_watermark;
+IF OBJECT_ID('dbo.ep_checkpoint', 'U') IS NOT NULL DROP TABLE dbo.ep_checkpoint;
+IF OBJECT_ID('dbo.ep_row_hash', 'U') IS NOT NULL DROP TABLE dbo.ep_row_hash;
+
+-- 1. Execution log table (removed id column)
+CREATE TABLE ep_endpoint_execution_log (
+    endpoint NVARCHAR(255),
+    tableName NVARCHAR(255),
+    startTime NVARCHAR(255),
+    endTime NVARCHAR(255),
+    status NVARCHAR(50),
+    recordsCount NVARCHAR(255),
+    batchSize NVARCHAR(255),
+    errorMessage NTEXT,
+    additionalInfo NTEXT
+);
+
+-- 2. Vulnerabilities (removed id column)
+CREATE TABLE ep_vulnerabilities (
+    id NVARCHAR(255),
+    name NVARCHAR(255),
+    description NVARCHAR(MAX),
+    severity NVARCHAR(50),
+    cvssV3 FLOAT,
+    cvssVector NVARCHAR(MAX),
+    exposedMachines INT,
+    publishedOn DATETIME2(7),
+    updatedOn DATETIME2(7),
+    firstDetected DATETIME2(7),
+    patchFirstAvailable DATETIME2(7),
+    publicExploit BIT,
+    exploitVerified BIT,
+    exploitInKit BIT,
+    exploitTypes NVARCHAR(MAX),
+    exploitUris NVARCHAR(MAX),
+    cveSupportability NVARCHAR(50),
+    tags NVARCHAR(MAX),
+    epss FLOAT
+);
+
+-- 3. Vulnerabilities by Machine (removed id column)
+CREATE TABLE ep_vulnerabilities_by_machine (
+    cveId NVARCHAR(255),
+    machineId NVARCHAR(255),
+    fixingKbId NVARCHAR(255),
+    productName NVARCHAR(255),
+    productVendor NVARCHAR(255),
+    productVersion NVARCHAR(50),
+    severity NVARCHAR(50)
+);
+
+-- 4. Device AV Info (removed id column)
+CREATE TABLE ep_device_av_info (
+    id NVARCHAR(255),
+    machineId NVARCHAR(255),
+    computerDnsName NVARCHAR(255),
+    osKind NVARCHAR(50),
+    osPlatform NVARCHAR(50),
+    osVersion NVARCHAR(50),
+    avMode NVARCHAR(50),
+    avSignatureVersion NVARCHAR(50),
+    avEngineVersion NVARCHAR(50),
+    avPlatformVersion NVARCHAR(50),
+    lastSeenTime DATETIME2(7),
+    quickScanResult NVARCHAR(50),
+    quickScanError NVARCHAR(50),
+    quickScanTime DATETIME2(7),
+    fullScanResult NVARCHAR(50),
+    fullScanError NVARCHAR(50),
+    fullScanTime DATETIME2(7),
+    dataRefreshTimestamp DATETIME2(7),
+    avEngineUpdateTime DATETIME2(7),
+    avSignatureUpdateTime DATETIME2(7),
+    avPlatformUpdateTime DATETIME2(7),
+    avIsSignatureUpToDate NVARCHAR(255),
+    avIsEngineUpToDate NVARCHAR(255),
+    avIsPlatformUpToDate NVARCHAR(255),
+    avSignaturePublishTime DATETIME2(7),
+    avSignatureDataRefreshTime DATETIME2(7),
+    cloudProtectionState NVARCHAR(255),
+    avModeDataRefreshTime DATETIME2(7),
+    rbacGroupName NVARCHAR(255),
+    rbacGroupId NVARCHAR(255)
+);
+
+-- 5. Machines (removed id column)
+CREATE TABLE ep_machines (
+    id NVARCHAR(255),
+    mergedIntoMachineId NVARCHAR(255),
+    isPotentialDuplication BIT,
+    isExcluded BIT,
+    exclusionReason NVARCHAR(255),
+    computerDnsName NVARCHAR(255),
+    firstSeen DATETIME2(7),
+    lastSeen DATETIME2(7),
+    osPlatform NVARCHAR(50),
+    osVersion NVARCHAR(255),
+    osProcessor NVARCHAR(50),
+    version NVARCHAR(MAX),
+    lastIpAddress NVARCHAR(50),
+    lastExternalIpAddress NVARCHAR(50),
+    agentVersion NVARCHAR(255),
+    osBuild NVARCHAR(255),
+    healthStatus NVARCHAR(50),
+    deviceValue NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    riskScore NVARCHAR(255),
+    exposureLevel NVARCHAR(255),
+    isAadJoined BIT,
+    aadDeviceId NVARCHAR(255),
+    machineTags NVARCHAR(255),
+    onboardingStatus NVARCHAR(255),
+    osArchitecture NVARCHAR(255),
+    managedBy NVARCHAR(255),
+    managedByStatus NVARCHAR(255),
+    ipAddresses NVARCHAR(MAX),
+    vmMetadata NVARCHAR(MAX)
+);
+
+-- 6. Secure Configuration Assessment (removed constraints)
+CREATE TABLE ep_secure_config_assessment (
+    deviceId NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    osPlatform NVARCHAR(50),
+    osVersion NVARCHAR(50),
+    timestamp DATETIME2(7),
+    configurationId NVARCHAR(255),
+    configurationCategory NVARCHAR(255),
+    configurationSubcategory NVARCHAR(255),
+    configurationImpact NVARCHAR(255),
+    isCompliant BIT,
+    isApplicable BIT,
+    isExpectedUserImpact BIT,
+    configurationName NVARCHAR(255),
+    recommendationReference NVARCHAR(255),
+    rowKeyHash BIGINT NULL
+);
+
+-- 7. Software Inventory (removed id and constraints)
+CREATE TABLE ep_software_inventory (
+    deviceId NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    osPlatform NVARCHAR(50),
+    softwareVendor NVARCHAR(255),
+    softwareName NVARCHAR(255),
+    softwareVersion NVARCHAR(255),
+    numberOfWeaknesses INT,
+    diskPaths NVARCHAR(MAX),
+    registryPaths NVARCHAR(MAX),
+    softwareFirstSeenTimestamp DATETIME2(7),
+    endOfSupportStatus NVARCHAR(255),
+    endOfSupportDate DATETIME2(7)
+);
+
+-- 8. Non-Product Software Inventory (removed constraints)
+CREATE TABLE ep_non_product_software_inventory (
+    deviceId NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    osPlatform NVARCHAR(50),
+    softwareVendor NVARCHAR(500),
+    softwareName NVARCHAR(500),
+    softwareVersion NVARCHAR(255),
+    softwareLastSeenTimestamp DATETIME2(7)
+);
+
+-- 9. Software Vulnerabilities by Machine (removed id column)
+CREATE TABLE ep_software_vulnerabilities_by_machine (
+    id NVARCHAR(255),
+    deviceId NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    osPlatform NVARCHAR(50),
+    osVersion NVARCHAR(255),
+    osArchitecture NVARCHAR(255),
+    softwareVendor NVARCHAR(255),
+    softwareName NVARCHAR(255),
+    softwareVersion NVARCHAR(255),
+    cveId NVARCHAR(255),
+    vulnerabilitySeverityLevel NVARCHAR(255),
+    recommendedSecurityUpdate NVARCHAR(255),
+    recommendedSecurityUpdateId NVARCHAR(255),
+    recommendedSecurityUpdateUrl NVARCHAR(255),
+    diskPaths NVARCHAR(MAX),
+    registryPaths NVARCHAR(MAX),
+    lastSeenTimestamp DATETIME2(7),
+    firstSeenTimestamp DATETIME2(7),
+    endOfSupportStatus NVARCHAR(255),
+    endOfSupportDate DATETIME2(7),
+    exploitabilityLevel NVARCHAR(50),
+    recommendationReference NVARCHAR(255),
+    cvssScore FLOAT,
+    securityUpdateAvailable BIT,
+    cveMitigationStatus NVARCHAR(255)
+);
+
+-- 10. Remediation Tasks (removed id column)
+CREATE TABLE ep_remediation_tasks (
+    id NVARCHAR(255),
+    title NVARCHAR(255),
+    createdOn DATETIME2(7),
+    requesterId NVARCHAR(255),
+    requesterEmail NVARCHAR(255),
+    status NVARCHAR(50),
+    statusLastModifiedOn DATETIME2(7),
+    description NVARCHAR(MAX),
+    relatedComponent NVARCHAR(255),
+    targetDevices NVARCHAR(MAX),
+    rbacGroupNames NVARCHAR(MAX),
+    fixedDevices NVARCHAR(MAX),
+    requesterNotes NVARCHAR(MAX),
+    dueOn DATETIME2(7),
+    category NVARCHAR(50),
+    productivityImpactRemediationType NVARCHAR(50),
+    priority NVARCHAR(50),
+    completionMethod NVARCHAR(50),
+    completerId NVARCHAR(255),
+    completerEmail NVARCHAR(255),
+    scid NVARCHAR(255),
+    type NVARCHAR(50),
+    productId NVARCHAR(255),
+    vendorId NVARCHAR(255),
+    nameId NVARCHAR(255),
+    recommendedVersion NVARCHAR(50),
+    recommendedVendor NVARCHAR(255),
+    recommendedProgram NVARCHAR(255),
+    recommendationReference NVARCHAR(255)
+);
+
+-- 11. Alerts (removed id column)
+CREATE TABLE ep_alerts (
+    id NVARCHAR(255),
+    incidentId NVARCHAR(255),
+    investigationId NVARCHAR(255),
+    assignedTo NVARCHAR(255),
+    severity NVARCHAR(50),
+    status NVARCHAR(50),
+    classification NVARCHAR(255),
+    determination NVARCHAR(255),
+    investigationState NVARCHAR(50),
+    detectionSource NVARCHAR(255),
+    detectorId NVARCHAR(255),
+    category NVARCHAR(255),
+    threatFamilyName NVARCHAR(255),
+    title NVARCHAR(255),
+    description NVARCHAR(MAX),
+    alertCreationTime DATETIME2(7),
+    firstEventTime DATETIME2(7),
+    lastEventTime DATETIME2(7),
+    lastUpdateTime DATETIME2(7),
+    resolvedTime DATETIME2(7),
+    machineId NVARCHAR(255),
+    computerDnsName NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    aadTenantId NVARCHAR(255),
+    threatName NVARCHAR(255),
+    mitreTechniques NVARCHAR(MAX),
+    relatedUser NVARCHAR(MAX),
+    loggedOnUsers NVARCHAR(MAX),
+    comments NVARCHAR(MAX),
+    evidence NVARCHAR(MAX),
+    domains NVARCHAR(MAX)
+);
+
+-- 12. Device Authenticated Scan Definitions (removed id column)
+CREATE TABLE ep_device_authenticated_scan_definitions (
+    id NVARCHAR(255),
+    scanType NVARCHAR(50),
+    scanName NVARCHAR(255),
+    isActive BIT,
+    target NVARCHAR(MAX),
+    orgId NVARCHAR(255),
+    intervalInHours INT,
+    createdBy NVARCHAR(255),
+    targetType NVARCHAR(50),
+    scanAuthenticationParams NVARCHAR(MAX),
+    scannerAgent NVARCHAR(MAX),
+    latestScan NVARCHAR(MAX),
+    advancedActiveConfiguration NVARCHAR(MAX)
+);
+
+-- 13. Device Authenticated Scan Agents (removed id column)
+CREATE TABLE ep_device_authenticated_scan_agents (
+    machineId NVARCHAR(255),
+    lastSeen DATETIME2(7),
+    computerDnsName NVARCHAR(255),
+    assignedApplicationId NVARCHAR(255),
+    scannerSoftwareVersion NVARCHAR(50),
+    lastCommandExecutionTimestamp DATETIME2(7),
+    mdeClientVersion NVARCHAR(50)
+);
+
+-- 14. Browser Extensions Inventory (removed constraints)
+CREATE TABLE ep_browser_extensions_inventory (
+    deviceId NVARCHAR(255),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    installationTime DATETIME2(7),
+    browserName NVARCHAR(255),
+    extensionId NVARCHAR(255),
+    extensionName NVARCHAR(255),
+    extensionDescription NVARCHAR(MAX),
+    extensionVersion NVARCHAR(50),
+    extensionRisk NVARCHAR(50),
+    extensionVendor NVARCHAR(255),
+    isActivated BIT
+);
+
+-- 15. Browser Extensions Permissions (removed id column)
+CREATE TABLE ep_browser_extensions_permissions (
+    [key] NVARCHAR(1000),
+    permissionName NVARCHAR(1000),
+    description NVARCHAR(1000)
+);
+
+-- 16. Investigations (removed id column)
+CREATE TABLE ep_investigations (
+    startTime DATETIME2(7),
+    endTime DATETIME2(7),
+    state NVARCHAR(50),
+    cancelledBy NVARCHAR(255),
+    statusDetails NVARCHAR(MAX),
+    machineId NVARCHAR(255),
+    computerDnsName NVARCHAR(255),
+    triggeringAlertId NVARCHAR(255)
+);
+
+-- 17. Certificate Assessments (removed constraints)
+CREATE TABLE ep_certificate_assessments (
+    deviceId NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    thumbprint NVARCHAR(255),
+    path NVARCHAR(MAX),
+    signatureAlgorithm NVARCHAR(255),
+    keySize INT,
+    expirationDate DATETIME2(7),
+    issueDate DATETIME2(7),
+    subjectType NVARCHAR(50),
+    serialNumber NVARCHAR(255),
+    issuedTo NVARCHAR(MAX),
+    issuedBy NVARCHAR(MAX),
+    keyUsage NVARCHAR(MAX),
+    extendedKeyUsage NVARCHAR(MAX),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    rowKeyHash BIGINT NULL
+);
+
+-- 18. Indicators (removed id column)
+CREATE TABLE ep_indicators (
+    id NVARCHAR(255),
+    indicatorValue NVARCHAR(255),
+    indicatorType NVARCHAR(50),
+    action NVARCHAR(50),
+    createdBy NVARCHAR(255),
+    severity NVARCHAR(50),
+    category NVARCHAR(255),
+    application NVARCHAR(255),
+    educateUrl NVARCHAR(MAX),
+    bypassDurationHours INT,
+    title NVARCHAR(255),
+    description NVARCHAR(MAX),
+    recommendedActions NVARCHAR(MAX),
+    creationTimeDateTimeUtc DATETIME2(7),
+    expirationTime DATETIME2(7),
+    lastUpdateTime DATETIME2(7),
+    lastUpdatedBy NVARCHAR(255),
+    rbacGroupNames NVARCHAR(MAX),
+    rbacGroupIds NVARCHAR(MAX),
+    notificationId NVARCHAR(255),
+    notificationBody NVARCHAR(MAX),
+    version NVARCHAR(50),
+    mitreTechniques NVARCHAR(MAX),
+    historicalDetection BIT,
+    lookBackPeriod NVARCHAR(50),
+    generateAlert BIT,
+    additionalInfo NVARCHAR(MAX),
+    createdByDisplayName NVARCHAR(255),
+    externalId NVARCHAR(255),
+    createdBySource NVARCHAR(255),
+    certificateInfo NVARCHAR(MAX)
+);
+
+-- 19. Info Gathering (removed id column)
+CREATE TABLE ep_info_gathering (
+    exportFiles NVARCHAR(MAX),
+    generatedTime DATETIME2(7)
+);
+
+-- 20. Library Files (removed id column, kept sha256 as regular column)
+CREATE TABLE ep_library_files (
+    fileName NVARCHAR(255),
+    sha256 NVARCHAR(255),
+    description NVARCHAR(MAX),
+    creationTime DATETIME2(7),
+    lastUpdatedTime DATETIME2(7),
+    createdBy NVARCHAR(255),
+    hasParameters BIT,
+    parametersDescription NVARCHAR(MAX)
+);
+
+-- 21. Machine Actions (updated to match API data structure)
+CREATE TABLE ep_machine_actions (
+    id NVARCHAR(255),
+    type NVARCHAR(255),
+    title NVARCHAR(500),
+    requestor NVARCHAR(255),
+    requestorComment NVARCHAR(MAX),
+    status NVARCHAR(255),
+    machineId NVARCHAR(255),
+    computerDnsName NVARCHAR(255),
+    creationDateTimeUtc DATETIME2(7),
+    lastUpdateDateTimeUtc DATETIME2(7),
+    cancellationRequestor NVARCHAR(255),
+    cancellationComment NVARCHAR(MAX),
+    cancellationDateTimeUtc DATETIME2(7),
+    errorHResult BIGINT,
+    scope NVARCHAR(255),
+    externalId NVARCHAR(255),
+    requestSource NVARCHAR(255),
+    relatedFileInfo NVARCHAR(500),
+    commands NVARCHAR(MAX),
+    troubleshootInfo NVARCHAR(MAX)
+);
+
+-- 22. Exposure Score by Machine Groups (removed constraints)
+CREATE TABLE ep_exposure_score_by_machine_groups (
+    time DATETIME2(7),
+    score FLOAT,
+    rbacGroupName NVARCHAR(255),
+    rbacGroupId NVARCHAR(255)
+);
+
+-- 23. Exposure Score (removed id column)
+CREATE TABLE ep_exposure_score (
+    time DATETIME2(7),
+    score FLOAT
+);
+
+-- 24. Device Secure Score (removed id column)
+CREATE TABLE ep_device_secure_score (
+    time DATETIME2(7),
+    score FLOAT
+);
+
+-- 25. Baseline Compliance Assessment (removed id column)
+CREATE TABLE ep_baseline_compliance_assessment (
+    id NVARCHAR(255),
+    configurationId NVARCHAR(255),
+    deviceId NVARCHAR(255),
+    deviceName NVARCHAR(255),
+    profileId NVARCHAR(255),
+    osPlatform NVARCHAR(50),
+    osVersion NVARCHAR(50),
+    rbacGroupId NVARCHAR(255),
+    rbacGroupName NVARCHAR(255),
+    isApplicable BIT,
+    isCompliant BIT,
+    dataCollectionTimeOffset DATETIME2(7),
+    complianceCalculationTimeOffset DATETIME2(7),
+    recommendedValue NVARCHAR(MAX),
+    currentValue NVARCHAR(MAX),
+    source NVARCHAR(MAX),
+    isExempt BIT,
+    rawValue NVARCHAR(MAX),
+    rowKeyHash BIGINT NULL
+);
+
+-- 26. Baseline Profiles (removed id column)
+CREATE TABLE ep_baseline_profiles (
+    id NVARCHAR(255),
+    name NVARCHAR(MAX),
+    description NVARCHAR(MAX),
+    benchmark NVARCHAR(MAX),
+    version NVARCHAR(50),
+    operatingSystem NVARCHAR(50),
+    operatingSystemVersion NVARCHAR(50),
+    status NVARCHAR(50),
+    complianceLevel NVARCHAR(MAX),
+    settingsNumber INT,
+    createdBy NVARCHAR(255),
+    lastUpdatedBy NVARCHAR(255),
+    createdOnTimeOffset DATETIME2(7),
+    lastUpdateTimeOffset DATETIME2(7),
+    passedDevices INT,
+    totalDevices INT,
+    rbacGroupIdsProfileScope NVARCHAR(MAX),
+    rbacGroupNamesProfileScope NVARCHAR(MAX),
+    deviceTagsProfileScope NVARCHAR(MAX)
+);
+
+-- 27. Baseline Configurations (removed id column)
+CREATE TABLE ep_baseline_configurations (
+    id NVARCHAR(255),
+    uniqueId NVARCHAR(255),
+    benchmarkName NVARCHAR(MAX),
+    benchmarkVersion NVARCHAR(50),
+    name NVARCHAR(MAX),
+    description NVARCHAR(MAX),
+    category NVARCHAR(MAX),
+    complianceLevels NVARCHAR(MAX),
+    cce NVARCHAR(255),
+    rationale NVARCHAR(MAX),
+    remediation NVARCHAR(MAX),
+    recommendedValue NVARCHAR(MAX),
+    source NVARCHAR(MAX),
+    isCustom BIT,
+    assessmentMethod NVARCHAR(MAX)
+);
+
+-- 28. Software (updated to match API data structure)
+CREATE TABLE ep_software (
+    id NVARCHAR(255),
+    name NVARCHAR(255),
+    vendor NVARCHAR(255),
+    weaknesses INT,
+    publicExploit BIT,
+    activeAlert BIT,
+    exposedMachines INT,
+    installedMachines INT,
+    impactScore FLOAT,
+    isNormalized BIT,
+    category NVARCHAR(MAX),
+    distributions NVARCHAR(255)
+);
+
+-- Create the execution log table
+CREATE TABLE ep_execution_log (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    table_name NVARCHAR(255) NOT NULL,
+    start_time_endpoint NVARCHAR(255) NOT NULL,
+    end_time_endpoint NVARCHAR(255) NOT NULL,
+    status NVARCHAR(50) NOT NULL,
+    total_rows INT NULL,
+    retries INT NOT NULL DEFAULT 0,
+    created_at DATETIME2(3) DEFAULT GETDATE(),
+    updated_at DATETIME2(3) DEFAULT GETDATE()
+);
+
+-- High-water marks of the incrementally synced tables
+CREATE TABLE ep_sync_watermark (
+    table_name NVARCHAR(255) NOT NULL PRIMARY KEY,
+    watermark NVARCHAR(255) NULL,
+    full_sync_time DATETIME2(3) NULL,
+    updated_at DATETIME2(3) DEFAULT GETDATE()
+);
+
+-- Position of every endpoint in the current run, for resuming after a restart
+CREATE TABLE ep_checkpoint (
+    table_name NVARCHAR(255) NOT NULL PRIMARY KEY,
+    target_table NVARCHAR(255) NOT NULL,
+    status NVARCHAR(50) NOT NULL,
+    resume_url NVARCHAR(MAX) NULL,
+    skip_rows INT NOT NULL DEFAULT 0,
+    rows_committed BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME2(3) DEFAULT GETDATE()
+);
+
+-- Hashes of the rows of the "change_detection" tables as of their last load,
+-- by the key hash stored in the rowKeyHash column of each row
+CREATE TABLE ep_row_hash (
+    table_name NVARCHAR(255) NOT NULL,
+    key_hash BIGINT NOT NULL,
+    row_hash BIGINT NOT NULL,
+    PRIMARY KEY (table_name, key_hash)
+);
+
+CREATE INDEX IX_ep_secure_config_assessment_rowKeyHash ON ep_secure_config_assessment (rowKeyHash);
+CREATE INDEX IX_ep_certificate_assessments_rowKeyHash ON ep_certificate_assessments (rowKeyHash);
+CREATE INDEX IX_ep_baseline_compliance_assessment_rowKeyHash ON ep_baseline_compliance_assessment (rowKeyHash);
+GO
@@ -0,0 +1,140 @@
+"""
+Measure and check the "via files" export path without a tenant or a SQL Server.
+
+For every table with an "export_endpoint", a local mock of the MDE API answers
+the export request with the urls of gzip JSON-lines files it serves itself,
+and API.get_and_save_data downloads them in parallel into an in-memory sink.
+The report shows rows/s and the peak RSS, and a run fails when the sink
+did not get every generated row, or the PascalCase fields of the files did
+not match every column of the table. With --broken-file one of the files answers
+403, and the run checks that the load fails without its SAS url showing up in
+the error or its traceback.
+
+    uv run services/get_data/benchmarks/bench_export.py --rows 200000 --files 8
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from loguru import logger  # noqa: E402
+from memory_sink import MemoryDatabase  # noqa: E402
+from mock_mde_api import MockEndpoint, MockExport, MockMdeApi  # noqa: E402
+from payloads import PayloadGenerator, load_table_schemas  # noqa: E402
+
+
+def export_configs() -> dict:
+    """
+    The ENDPOINT_CONFIGS with an export endpoint by table name, as plain
+    snapshots written by one connection, the only one the in-memory sink
+    has, without reading settings.env
+    """
+    from config import Settings
+
+    configs = Settings.model_fields["ENDPOINT_CONFIGS"].default
+    return {
+        config["table_name"]: {
+            key: value
+            for key, value in config.items()
+            if key
+            not in ("delta", "incremental", "change_detection", "shards", "insert_writers")
+        }
+        for config in configs.values()
+        if config.get("export_endpoint")
+    }
+
+
+def run_table(config: dict, schemas: dict, args) -> bool:
+    from api import API
+    from rate_limiter import RateLimiter
+
+    table_name = config["table_name"]
+    generator = PayloadGenerator(schemas[table_name], seed=args.seed)
+    broken_files = () if args.broken_file is None else (args.broken_file,)
+    server = MockMdeApi(
+        {},
+        exports={
+            config["export_endpoint"]: MockExport(
+                MockEndpoint(generator, args.rows), args.files, broken_files
+            )
+        },
+    ).start_process()
+
+    api = API(
+        api_tenant_id="bench-tenant",
+        api_client_id="bench-client",
+        api_client_secret="bench-secret",
+        base_url=server.base_url,
+        token_url=server.token_url,
+        export_download_workers=args.workers,
+        rate_limiter=RateLimiter(calls_per_minute=10**6, calls_per_hour=10**8),
+    )
+    db = MemoryDatabase(schemas, args.batch_size)
+
+    start = time.perf_counter()
+    error = None
+    try:
+        success, total_rows = api.get_and_save_data(config, db)
+    except Exception as e:
+        success, total_rows = False, 0
+        error = "".join(traceback.format_exception(e))
+    wall = time.perf_counter() - start
+
+    server.stop()
+    api.token_cache.close()
+
+    if args.broken_file is not None:
+        leaked = error is not None and "sig=" in error
+        print(
+            f"{table_name:<40}"
+            + ("failed as expected" if not success else "loaded despite a broken file")
+            + (", SAS url in the traceback" if leaked else "")
+        )
+        return not success and not leaked
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    complete = success and db.rows_inserted == args.rows
+    # Rows whose fields do not match the table's columns are checked once
+    matched = not db.checked_column_sets
+    print(
+        f"{table_name:<40}{args.files:>6}{total_rows:>10,}{wall:>8.2f}"
+        f"{total_rows / wall:>11,.0f}{peak_rss:>10.0f}"
+        + ("" if complete else f"  INCOMPLETE: {db.rows_inserted:,} of {args.rows:,} rows")
+        + ("" if matched else "  UNMATCHED COLUMNS")
+    )
+    return complete and matched
+
+
+def main():
+    configs = export_configs()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", nargs="+", default=sorted(configs))
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--broken-file", type=int, help="index of a file that answers 403")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    schemas = load_table_schemas()
+
+    if args.broken_file is None:
+        print(f"{'table':<40}{'files':>6}{'rows':>10}{'wall s':>8}{'rows/s':>11}{'RSS MB':>10}")
+    ok = all([run_table(configs[table_name], schemas, args) for table_name in args.tables])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare the executemany and openjson load methods of Database.save_data
+against a real SQL Server, using the connection settings of settings.env.
+
+Rows shaped like ep_secure_config_assessment are inserted into a scratch copy
+of that table, which is dropped at the end.
+
+    uv run services/get_data/benchmarks/bench_load_methods.py --rows 200000 \
+        --insert-writers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_save_data import make_rows  # noqa: E402
+from config import Settings  # noqa: E402
+from database import Database  # noqa: E402
+
+SOURCE_TABLE = "ep_secure_config_assessment"
+SCRATCH_TABLE = "ep_bench_load_methods"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument(
+        "--methods", nargs="+", default=["executemany", "openjson"]
+    )
+    parser.add_argument(
+        "--insert-writers", nargs="+", type=int, default=[1],
+        help="writer connections per save_data call, one run per value",
+    )
+    args = parser.parse_args()
+
+    settings = Settings()
+    db = Database(
+        host=settings.SQL_HOST,
+        database=settings.SQL_DATABASE,
+        username=settings.SQL_USERNAME,
+        password=settings.SQL_PASSWORD,
+        port=settings.SQL_PORT,
+        batch_size=args.batch_size,
+    )
+    data = make_rows(args.rows)
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"IF OBJECT_ID('{SCRATCH_TABLE}', 'U') IS NOT NULL DROP TABLE {SCRATCH_TABLE}"
+        )
+        cursor.execute(f"SELECT TOP 0 * INTO {SCRATCH_TABLE} FROM {SOURCE_TABLE}")
+        conn.commit()
+
+        try:
+            print(f"{args.rows:,} rows, batch size {args.batch_size:,}")
+            print(f"{'method':<14}{'writers':>8}{'seconds':>10}{'rows/s':>14}")
+            for method in args.methods:
+                for writers in args.insert_writers:
+                    cursor.execute(f"TRUNCATE TABLE {SCRATCH_TABLE}")
+                    conn.commit()
+
+                    endpoint_config = {
+                        "table_name": SCRATCH_TABLE,
+                        "load_method": method,
+                        "insert_writers": writers,
+                    }
+                    start = time.perf_counter()
+                    if not db.save_data(data, endpoint_config, conn):
+                        print(f"{method:<14}{writers:>8}  failed")
+                        continue
+                    seconds = time.perf_counter() - start
+                    print(f"{method:<14}{writers:>8}{seconds:>10.2f}{args.rows / seconds:>14,.0f}")
+        finally:
+            cursor.execute(f"DROP TABLE {SCRATCH_TABLE}")
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Measure API.get_and_save_data end to end without a tenant or a SQL Server.
+
+A local mock of the MDE API serves generated rows shaped like each table, as
+paginated OData with @odata.nextLink and the odd 429, and a sink stands in for
+the database. Every table and page size runs in its own process, and the
+report shows rows/s and MB/s per stage and the peak RSS after each stage.
+
+    uv run services/get_data/benchmarks/bench_pipeline.py --rows 100000 \
+        --page-sizes 1000 10000 50000 --json results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from loguru import logger  # noqa: E402
+from memory_sink import MemoryDatabase  # noqa: E402
+from mock_mde_api import MockEndpoint, MockMdeApi  # noqa: E402
+from payloads import PayloadGenerator, load_table_schemas  # noqa: E402
+
+DEFAULT_TABLES = [
+    "ep_secure_config_assessment",
+    "ep_software_vulnerabilities_by_machine",
+    "ep_machines",
+    "ep_vulnerabilities",
+]
+
+STAGES = ("fetch", "decode", "clean", "insert", "commit")
+
+# Stand-ins for the database, each built from the table schemas
+SINKS = {
+    "memory": lambda schemas, batch_size: MemoryDatabase(schemas, batch_size),
+}
+
+
+def endpoint_configs() -> dict:
+    """
+    ENDPOINT_CONFIGS by table name, without reading settings.env
+    """
+    from config import Settings
+
+    configs = Settings.model_fields["ENDPOINT_CONFIGS"].default
+    return {config["table_name"]: config for config in configs.values()}
+
+
+def bench_endpoint_config(config: dict, pagesize: int) -> dict:
+    """
+    The endpoint as a plain paginated snapshot at the given page size
+    """
+    config = {
+        key: value
+        for key, value in config.items()
+        if key not in ("export_endpoint", "delta", "incremental")
+    }
+    config["pagesize"] = pagesize
+    return config
+
+
+class StagePeaks:
+    """
+    Peak RSS seen right after each stage handled a page
+    """
+
+    def __init__(self):
+        from autotune import current_rss_bytes
+
+        self.current_rss_bytes = current_rss_bytes
+        self.baseline = current_rss_bytes()
+        self.peaks = {"fetch": 0, "clean": 0, "insert": 0}
+
+    def sample(self, stage: str):
+        self.peaks[stage] = max(self.peaks[stage], self.current_rss_bytes())
+
+    def wrap(self, stage: str, function):
+        def wrapped(*args, **kwargs):
+            result = function(*args, **kwargs)
+            self.sample(stage)
+            return result
+
+        return wrapped
+
+    def wrap_pages(self, iter_pages):
+        def wrapped(*args, **kwargs):
+            for page in iter_pages(*args, **kwargs):
+                self.sample("fetch")
+                yield page
+
+        return wrapped
+
+
+def run_variant(table_name: str, pagesize: int, args, results):
+    from api import API
+    from metrics import HTTP_RESPONSES, RESPONSE_BYTES, STAGE_SECONDS
+    from process_data import CleaningEngine
+    from rate_limiter import RateLimiter
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    schemas = load_table_schemas()
+    config = bench_endpoint_config(endpoint_configs()[table_name], pagesize)
+    if args.stream is not None:
+        config["stream"] = args.stream
+    if args.load_method:
+        config["load_method"] = args.load_method
+
+    generator = PayloadGenerator(schemas[table_name], seed=args.seed)
+    server = MockMdeApi(
+        {config["endpoint"]: MockEndpoint(generator, args.rows)},
+        throttle_every=args.throttle_every,
+    ).start_process()
+
+    api = API(
+        api_tenant_id="bench-tenant",
+        api_client_id="bench-client",
+        api_client_secret="bench-secret",
+        base_url=server.base_url,
+        token_url=server.token_url,
+        pipeline_depth=args.pipeline_depth,
+        # The mock has no quota, only the 429s it is told to send
+        rate_limiter=RateLimiter(calls_per_minute=10**6, calls_per_hour=10**8),
+    )
+    db = SINKS[args.sink](schemas, args.batch_size)
+
+    peaks = StagePeaks()
+    api.iter_pages = peaks.wrap_pages(api.iter_pages)
+    CleaningEngine.clean = peaks.wrap("clean", CleaningEngine.clean)
+    db.save_data = peaks.wrap("insert", db.save_data)
+
+    start = time.perf_counter()
+    success, total_rows = api.get_and_save_data(config, db)
+    wall = time.perf_counter() - start
+
+    server.stop()
+    api.token_cache.close()
+
+    seconds = {stage: STAGE_SECONDS.total(table_name, stage)[1] for stage in STAGES}
+    results.put(
+        {
+            "table": table_name,
+            "pagesize": pagesize,
+            "success": success,
+            "rows": total_rows,
+            "rows_inserted": db.rows_inserted,
+            "wall_seconds": wall,
+            "response_bytes": RESPONSE_BYTES.value(table_name),
+            "throttled": HTTP_RESPONSES.value(table_name, "429"),
+            "stage_seconds": seconds,
+            "baseline_rss_bytes": peaks.baseline,
+            "stage_peak_rss_bytes": peaks.peaks,
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+    )
+
+
+def print_result(result: dict):
+    mb = result["response_bytes"] / 2**20
+    seconds = result["stage_seconds"]
+    rates = "".join(
+        f"{result['rows'] / seconds[stage] if seconds[stage] else 0:>11,.0f}"
+        for stage in ("fetch", "decode", "clean", "insert")
+    )
+    peaks = "".join(
+        f"{result['stage_peak_rss_bytes'][stage] / 2**20:>9.0f}"
+        for stage in ("fetch", "clean", "insert")
+    )
+    print(
+        f"{result['table']:<40}{result['pagesize']:>9,}{result['rows']:>10,}"
+        f"{result['wall_seconds']:>8.2f}{result['rows'] / result['wall_seconds']:>11,.0f}"
+        f"{mb / result['wall_seconds']:>8.1f}{rates}{peaks}{result['throttled']:>6.0f}"
+        + ("" if result["success"] else "  FAILED")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", nargs="+", default=DEFAULT_TABLES)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--page-sizes", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--pipeline-depth", type=int, default=0)
+    parser.add_argument("--throttle-every", type=int, default=25)
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=None)
+    parser.add_argument("--load-method", choices=["executemany", "openjson"])
+    parser.add_argument("--sink", choices=sorted(SINKS), default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    print(
+        f"{'table':<40}{'pagesize':>9}{'rows':>10}{'wall s':>8}{'rows/s':>11}{'MB/s':>8}"
+        f"{'fetch r/s':>11}{'decode r/s':>11}{'clean r/s':>11}{'insert r/s':>11}"
+        f"{'RSS f MB':>9}{'RSS c MB':>9}{'RSS i MB':>9}{'429s':>6}"
+    )
+    collected = []
+    for table_name in args.tables:
+        for pagesize in args.page_sizes:
+            process = context.Process(
+                target=run_variant, args=(table_name, pagesize, args, results)
+            )
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                print(f"{table_name:<40}{pagesize:>9,}  crashed with exit code {process.exitcode}")
+                continue
+            result = results.get()
+            print_result(result)
+            collected.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(collected, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Compare the DataFrame based insert path with the direct row projection used by
+Database.save_data, on a single page of cleaned rows.
+
+The database is replaced by a connection whose cursor only consumes the
+parameters, so the numbers show the Python side of the insert. Every variant
+runs in its own process to get a clean peak RSS.
+
+    uv run services/get_data/benchmarks/bench_save_data.py --rows 200000
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from database import Database  # noqa: E402
+
+COLUMNS = [
+    "deviceId",
+    "rbacGroupId",
+    "rbacGroupName",
+    "deviceName",
+    "osPlatform",
+    "osVersion",
+    "timestamp",
+    "configurationId",
+    "configurationCategory",
+    "configurationSubcategory",
+    "configurationImpact",
+    "isCompliant",
+    "isApplicable",
+    "isExpectedUserImpact",
+    "configurationName",
+    "recommendationReference",
+]
+
+ENDPOINT_CONFIG = {"table_name": "ep_secure_config_assessment"}
+
+
+class BenchCursor:
+    """
+    Cursor that consumes executemany parameters without a server
+    """
+
+    def __init__(self):
+        self.fast_executemany = False
+        self.rows = 0
+
+    def executemany(self, query, params):
+        for row in params:
+            self.rows += len(row) > 0
+
+
+class BenchConnection:
+    def cursor(self):
+        return BenchCursor()
+
+    def commit(self):
+        pass
+
+
+def make_rows(n_rows: int) -> list[dict]:
+    """
+    Cleaned rows shaped like ep_secure_config_assessment
+    """
+    rows = []
+    for i in range(n_rows):
+        rows.append(
+            {
+                "deviceId": f"{i % 5000:040x}",
+                "rbacGroupId": float(i % 12),
+                "rbacGroupName": f"Group {i % 12}",
+                "deviceName": f"device-{i % 5000}.contoso.com",
+                "osPlatform": "Windows11",
+                "osVersion": "10.0",
+                "timestamp": "2025-05-29T04:34:31.457Z",
+                "configurationId": f"scid-{i % 900}",
+                "configurationCategory": "Security controls",
+                "configurationSubcategory": "Antivirus",
+                "configurationImpact": 9.0,
+                "isCompliant": bool(i % 2),
+                "isApplicable": True,
+                "isExpectedUserImpact": False,
+                "configurationName": "Turn on real-time protection",
+                "recommendationReference": f"sca-_-scid-{i % 900}",
+            }
+        )
+    return rows
+
+
+def dataframe_save_data(db: Database, data: list, endpoint_config: dict, conn):
+    """
+    The insert path before the direct projection: DataFrame, itertuples and
+    forced garbage collection per batch
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(data)
+    del data
+    gc.collect()
+
+    valid_columns = [col for col in COLUMNS if col in df.columns.tolist()]
+    df = df[valid_columns]
+    query = db.get_insert_statement(endpoint_config["table_name"], valid_columns)
+
+    total_rows = len(df)
+    for i in range(0, total_rows, db.batch_size):
+        batch = df[i : min(i + db.batch_size, total_rows)]
+        data_as_tuples = [tuple(row[1:]) for row in batch.itertuples()]
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cursor.executemany(query, data_as_tuples)
+        conn.commit()
+        del data_as_tuples
+        gc.collect()
+    return True
+
+
+def run_variant(variant: str, n_rows: int, batch_size: int, results):
+    db = Database(
+        host="", database="", username="", password="", port=0, batch_size=batch_size
+    )
+    db.table_columns[ENDPOINT_CONFIG["table_name"]] = COLUMNS
+    conn = BenchConnection()
+
+    data = make_rows(n_rows)
+    gc.collect()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if variant == "dataframe":
+        dataframe_save_data(db, data, ENDPOINT_CONFIG, conn)
+    else:
+        db.save_data(data, ENDPOINT_CONFIG, conn)
+    seconds = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((variant, seconds, baseline_kb, peak_kb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument(
+        "--variants", nargs="+", default=["dataframe", "projection"]
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    print(f"{args.rows:,} rows, batch size {args.batch_size:,}")
+    print(f"{'variant':<12}{'seconds':>10}{'rows/s':>14}{'peak RSS MB':>14}{'added MB':>11}")
+    for variant in args.variants:
+        process = context.Process(
+            target=run_variant, args=(variant, args.rows, args.batch_size, results)
+        )
+        process.start()
+        name, seconds, baseline_kb, peak_kb = results.get()
+        process.join()
+        print(
+            f"{name:<12}{seconds:>10.2f}{args.rows / seconds:>14,.0f}"
+            f"{peak_kb / 1024:>14.1f}{(peak_kb - baseline_kb) / 1024:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare the all-NVARCHAR/NTEXT tables of create_tables.sql with the typed
+tables of create_tables_typed.sql against a real SQL Server, using the
+connection settings of settings.env.
+
+The same generated and cleaned rows are inserted into scratch copies of each
+table, untyped with the driver picking the parameter types and typed with
+TYPED_BINDING, and the report shows insert rows/s and the space each copy
+takes. The scratch tables are dropped at the end.
+
+    uv run services/get_data/benchmarks/bench_typed_schema.py --rows 200000 \
+        --tables ep_machines ep_software_vulnerabilities_by_machine
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import Settings  # noqa: E402
+from database import Database  # noqa: E402
+from payloads import SQL_PATH, PayloadGenerator, load_table_schemas  # noqa: E402
+from process_data import CleaningEngine  # noqa: E402
+
+TYPED_SQL_PATH = os.path.join(os.path.dirname(SQL_PATH), "create_tables_typed.sql")
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE (\w+) \((.*?)\n\);", re.DOTALL)
+
+DEFAULT_TABLES = [
+    "ep_machines",
+    "ep_software_vulnerabilities_by_machine",
+    "ep_secure_config_assessment",
+]
+
+VARIANTS = (
+    # name, create script, typed binding
+    ("untyped", SQL_PATH, False),
+    ("typed", TYPED_SQL_PATH, True),
+)
+
+
+def create_statements(sql_path: str) -> dict:
+    """
+    Column definitions of every CREATE TABLE of a create script
+    """
+    with open(sql_path, encoding="utf-8") as f:
+        return dict(_CREATE_TABLE.findall(f.read()))
+
+
+def space_used(cursor, table_name: str) -> tuple:
+    """
+    Reserved and data KB of a table, from sp_spaceused
+    """
+    cursor.execute("EXEC sp_spaceused ?", (table_name,))
+    _, _, reserved, data, _, _ = cursor.fetchone()
+    return int(reserved.split()[0]), int(data.split()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", nargs="+", default=DEFAULT_TABLES)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--load-method", choices=["executemany", "openjson"], default="executemany")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = Settings()
+    schemas = load_table_schemas()
+    definitions = {name: create_statements(path) for name, path, _ in VARIANTS}
+
+    print(f"{args.rows:,} rows per table, batch size {args.batch_size:,}, {args.load_method}")
+    print(
+        f"{'table':<40}{'schema':<9}{'seconds':>9}{'rows/s':>12}"
+        f"{'reserved KB':>13}{'data KB':>11}"
+    )
+    for table_name in args.tables:
+        generator = PayloadGenerator(schemas[table_name], seed=args.seed)
+        data = CleaningEngine(table_name).clean(generator.rows(0, args.rows))
+
+        for name, _, typed_binding in VARIANTS:
+            db = Database(
+                host=settings.SQL_HOST,
+                database=settings.SQL_DATABASE,
+                username=settings.SQL_USERNAME,
+                password=settings.SQL_PASSWORD,
+                port=settings.SQL_PORT,
+                batch_size=args.batch_size,
+                typed_binding=typed_binding,
+            )
+            scratch_table = f"ep_bench_{name}_{table_name.removeprefix('ep_')}"
+
+            with db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"IF OBJECT_ID('{scratch_table}', 'U') IS NOT NULL DROP TABLE {scratch_table}"
+                )
+                cursor.execute(
+                    f"CREATE TABLE {scratch_table} ({definitions[name][table_name]}\n)"
+                )
+                conn.commit()
+
+                try:
+                    endpoint_config = {
+                        "table_name": scratch_table,
+                        "load_method": args.load_method,
+                    }
+                    start = time.perf_counter()
+                    if not db.save_data(data, endpoint_config, conn):
+                        print(f"{table_name:<40}{name:<9}failed")
+                        continue
+                    seconds = time.perf_counter() - start
+                    reserved, data_kb = space_used(cursor, scratch_table)
+                    print(
+                        f"{table_name:<40}{name:<9}{seconds:>9.2f}"
+                        f"{args.rows / seconds:>12,.0f}{reserved:>13,}{data_kb:>11,}"
+                    )
+                finally:
+                    cursor.execute(f"DROP TABLE {scratch_table}")
+                    conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Check that parallel insert writers do not block each other on a table lock,
+against a real SQL Server, using the connection settings of settings.env.
+
+Pages of rows shaped like ep_secure_config_assessment are inserted by two
+writers into a scratch copy of that table set to escalate to table locks,
+with batches well above the 5,000 locks that trigger an escalation. A page
+that does not finish within --timeout seconds, or a row count that does not
+add up, fails the run. The scratch table is dropped at the end.
+
+    uv run services/get_data/benchmarks/bench_writer_locks.py --pages 20
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_save_data import make_rows  # noqa: E402
+from config import Settings  # noqa: E402
+from database import Database  # noqa: E402
+
+SOURCE_TABLE = "ep_secure_config_assessment"
+SCRATCH_TABLE = "ep_bench_writer_locks"
+
+
+def lock_escalation(cursor) -> str:
+    cursor.execute(
+        "SELECT lock_escalation_desc FROM sys.tables WHERE object_id = OBJECT_ID(?)",
+        (SCRATCH_TABLE,),
+    )
+    return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--method", default="executemany")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    settings = Settings()
+    db = Database(
+        host=settings.SQL_HOST,
+        database=settings.SQL_DATABASE,
+        username=settings.SQL_USERNAME,
+        password=settings.SQL_PASSWORD,
+        port=settings.SQL_PORT,
+        batch_size=args.batch_size,
+    )
+    # One batch per writer on every page
+    data = make_rows(args.batch_size * args.writers)
+    endpoint_config = {
+        "table_name": SCRATCH_TABLE,
+        "load_method": args.method,
+        "insert_writers": args.writers,
+    }
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"IF OBJECT_ID('{SCRATCH_TABLE}', 'U') IS NOT NULL DROP TABLE {SCRATCH_TABLE}"
+        )
+        cursor.execute(f"SELECT TOP 0 * INTO {SCRATCH_TABLE} FROM {SOURCE_TABLE}")
+        cursor.execute(f"ALTER TABLE {SCRATCH_TABLE} SET (LOCK_ESCALATION = TABLE)")
+        conn.commit()
+
+        try:
+            print(f"{args.pages} pages of {len(data):,} rows, {args.writers} writers")
+            print(f"lock escalation before: {lock_escalation(cursor)}")
+            for page in range(args.pages):
+                result = []
+                start = time.perf_counter()
+                writer = threading.Thread(
+                    target=lambda: result.append(db.save_data(data, endpoint_config, conn)),
+                    daemon=True,
+                )
+                writer.start()
+                writer.join(args.timeout)
+                if writer.is_alive():
+                    print(f"page {page + 1} blocked for more than {args.timeout:.0f}s")
+                    # The blocked writers never return, leave without waiting for them
+                    os._exit(1)
+                if not result[0]:
+                    print(f"page {page + 1} failed")
+                    sys.exit(1)
+                print(f"page {page + 1:>4}{time.perf_counter() - start:>8.2f}s")
+
+            print(f"lock escalation after: {lock_escalation(cursor)}")
+            cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_TABLE}")
+            rows = cursor.fetchone()[0]
+            expected = args.pages * len(data)
+            print(f"{rows:,} of {expected:,} rows")
+            if rows != expected:
+                sys.exit(1)
+        finally:
+            cursor.execute(f"DROP TABLE {SCRATCH_TABLE}")
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+A Database that keeps no rows, standing in for SQL Server in benchmarks.
+
+Table schemas come from the create script, so Database.save_data runs its
+real column matching, projection and batching, and the cursor only consumes
+the parameters it is given.
+"""
+
+import json
+from contextlib import contextmanager
+
+from database import Database
+
+
+class SinkCursor:
+    def __init__(self, sink: "MemoryDatabase"):
+        self.sink = sink
+        self.fast_executemany = False
+        self.rowcount = 0
+
+    def executemany(self, query, params):
+        for row in params:
+            self.sink.rows_inserted += len(row) > 0
+
+    def execute(self, query, *params):
+        # The openjson load method sends the batch as one JSON document
+        if params and isinstance(params[0], str) and "OPENJSON" in query:
+            self.sink.rows_inserted += len(json.loads(params[0]))
+
+    def fetchone(self):
+        return None
+
+
+class SinkConnection:
+    def __init__(self, sink: "MemoryDatabase"):
+        self.sink = sink
+        self.autocommit = False
+
+    def cursor(self):
+        return SinkCursor(self.sink)
+
+    def commit(self):
+        self.sink.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryDatabase(Database):
+    def __init__(self, schemas: dict, batch_size: int = 10000):
+        super().__init__(
+            host="", database="", username="", password="", port=0, batch_size=batch_size
+        )
+        self.schemas = schemas
+        self.rows_inserted = 0
+        self.commits = 0
+
+    def clone(self) -> "MemoryDatabase":
+        return MemoryDatabase(self.schemas, self.batch_size)
+
+    @contextmanager
+    def get_connection(self):
+        yield SinkConnection(self)
+
+    def get_table_columns(self, conn, table_name: str) -> list:
+        return [name for name, _, _ in self.schemas.get(table_name, [])]
+
+    def get_table_column_types(self, conn, table_name: str) -> dict:
+        column_types = {}
+        for name, data_type, max_length in self.schemas.get(table_name, []):
+            if data_type == "NTEXT":
+                column_types[name] = "NVARCHAR(MAX)"
+            elif max_length is not None:
+                column_types[name] = f"{data_type}({max_length})"
+            else:
+                column_types[name] = data_type
+        return column_types
@@ -0,0 +1,279 @@
+"""
+Local stand-in for the MDE API and its token endpoint.
+
+Every registered endpoint serves `total_rows` generated rows as OData pages of
+`pagesize` rows, linked by an @odata.nextLink with `$skip`. A `$top` request
+gets at most that many rows and, as in OData, a next link only when the page
+size cut it short. Every
+`throttle_every`-th API call is answered with a 429 and a Retry-After header.
+Registered exports answer with the SAS-style urls of their gzip JSON-lines
+files, which are served, and never throttled, under /files/. As in the real
+export files, their fields are in PascalCase (DeviceId, OSPlatform) instead
+of the camelCase of the OData pages.
+Rows are generated once up front, and the server can run in its own process
+so that serving pages does not compete with the client for the GIL.
+"""
+
+import gzip
+import json
+import multiprocessing
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from payloads import PayloadGenerator
+
+
+class MockEndpoint:
+    def __init__(self, generator: PayloadGenerator, total_rows: int):
+        self.generator = generator
+        self.total_rows = total_rows
+        self._rows = None
+
+    def rows(self, start: int, count: int) -> list:
+        if self._rows is None:
+            self._rows = self.generator.rows(0, self.total_rows)
+        return self._rows[start : start + count]
+
+
+def export_field_name(name: str) -> str:
+    """
+    The name of an OData field in the export files, e.g. DeviceId for
+    deviceId and OSPlatform for osPlatform
+    """
+    if name.startswith("os") and name[2:3].isupper():
+        return "OS" + name[2:]
+    return name[:1].upper() + name[1:]
+
+
+class MockExport:
+    """
+    A "via files" export of an endpoint's rows, split over `files` gzip
+    JSON-lines files. The files listed in `broken_files` answer 403, like
+    an expired SAS token.
+    """
+
+    def __init__(self, endpoint: MockEndpoint, files: int = 4, broken_files: tuple = ()):
+        self.endpoint = endpoint
+        self.files = files
+        self.broken_files = set(broken_files)
+        self._bodies = None
+
+    def bodies(self) -> list:
+        if self._bodies is None:
+            per_file = -(-self.endpoint.total_rows // self.files)
+            self._bodies = [
+                gzip.compress(
+                    "".join(
+                        json.dumps(
+                            {export_field_name(key): value for key, value in row.items()}
+                        )
+                        + "\n"
+                        for row in self.endpoint.rows(i * per_file, per_file)
+                    ).encode("utf-8"),
+                    compresslevel=1,
+                )
+                for i in range(self.files)
+            ]
+        return self._bodies
+
+
+class MockMdeApi:
+    def __init__(
+        self,
+        endpoints: dict,
+        default_pagesize: int = 10000,
+        throttle_every: int = 0,
+        retry_after: float = 0,
+        exports: dict = None,
+    ):
+        self.endpoints = endpoints
+        self.exports = exports or {}
+        self.default_pagesize = default_pagesize
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+
+        self.calls = 0
+        self.throttled = 0
+        self.bytes_served = 0
+        # Made with the server, locks do not pickle into a child process
+        self._lock = None
+        self._server = None
+        self._process = None
+        self.port = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api"
+
+    @property
+    def token_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/oauth2/v2.0/token"
+
+    def _page(self, path: str, query: dict) -> tuple:
+        """
+        Status code and body of one API call
+        """
+        export = self.exports.get(path)
+        if export is not None:
+            return 200, {
+                "exportFiles": [
+                    f"http://127.0.0.1:{self.port}/files/{path}/{i}.json.gz?sig=bench-sas"
+                    for i in range(export.files)
+                ],
+                "generatedTime": "2025-05-29T04:34:31Z",
+            }
+
+        endpoint = self.endpoints.get(path)
+        if endpoint is None:
+            return 404, {"error": {"code": "ResourceNotFound", "message": path}}
+
+        params = {key.lower(): value for key, value in query.items()}
+        pagesize = int(params.get("pagesize") or self.default_pagesize)
+        skip = int(params.get("$skip", 0))
+        end = endpoint.total_rows
+        if "$top" in params:
+            end = min(end, skip + int(params["$top"]))
+        count = max(0, min(pagesize, end - skip))
+
+        body = {
+            "@odata.context": f"{self.base_url}/$metadata#{path}",
+            "value": endpoint.rows(skip, count),
+        }
+        if params.get("$count") == "true":
+            body["@odata.count"] = endpoint.total_rows
+        if skip + count < end:
+            next_query = {
+                key: value
+                for key, value in query.items()
+                if key.lower() not in ("$skip", "$top")
+            }
+            next_query["$skip"] = skip + count
+            if "$top" in params:
+                next_query["$top"] = end - skip - count
+            body["@odata.nextLink"] = f"{self.base_url}/{path}?{urlencode(next_query)}"
+        return 200, body
+
+    def _make_server(self) -> ThreadingHTTPServer:
+        api = self
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: dict, headers: dict = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                with api._lock:
+                    api.bytes_served += len(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._send(200, {"access_token": "bench-token", "expires_in": 3599})
+
+            def _send_file(self, path: str):
+                export_path, _, name = path.rpartition("/")
+                export = api.exports.get(export_path)
+                index = int(name.split(".")[0]) if name.split(".")[0].isdigit() else -1
+                if export is None or not 0 <= index < export.files:
+                    self._send(404, {"error": {"code": "BlobNotFound"}})
+                    return
+                if index in export.broken_files:
+                    self._send(403, {"error": {"code": "AuthenticationFailed"}})
+                    return
+
+                payload = export.bodies()[index]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with api._lock:
+                    api.bytes_served += len(payload)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.startswith("/files/"):
+                    self._send_file(url.path.removeprefix("/files/"))
+                    return
+                path = url.path.removeprefix("/api/")
+
+                with api._lock:
+                    api.calls += 1
+                    throttle = api.throttle_every and api.calls % api.throttle_every == 0
+                    if throttle:
+                        api.throttled += 1
+                if throttle:
+                    self._send(
+                        429,
+                        {"error": {"code": "TooManyRequests"}},
+                        {"Retry-After": str(api.retry_after)},
+                    )
+                    return
+
+                status, body = api._page(path, dict(parse_qsl(url.query)))
+                self._send(status, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Clients hang up on downloads they no longer need
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        server = Server(("127.0.0.1", 0), Handler)
+        self.port = server.server_port
+        return server
+
+    def _prepare(self):
+        for endpoint in self.endpoints.values():
+            endpoint.rows(0, 0)
+        for export in self.exports.values():
+            export.bodies()
+
+    def start(self) -> "MockMdeApi":
+        """
+        Serve from a daemon thread of this process
+        """
+        self._prepare()
+        self._server = self._make_server()
+        threading.Thread(
+            target=self._server.serve_forever, name="mock-mde-api", daemon=True
+        ).start()
+        return self
+
+    def _serve_in_process(self, ports: multiprocessing.Queue):
+        self._prepare()
+        server = self._make_server()
+        ports.put(server.server_port)
+        server.serve_forever()
+
+    def start_process(self, context=None) -> "MockMdeApi":
+        """
+        Serve from a child process. The call counters stay in the child.
+        """
+        context = context or multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        self._process = context.Process(
+            target=self._serve_in_process, args=(ports,), daemon=True
+        )
+        self._process.start()
+        self.port = ports.get(timeout=300)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
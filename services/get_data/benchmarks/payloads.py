@@ -0,0 +1,114 @@
+"""
+Synthetic MDE rows shaped like the tables of scripts/db/create_tables.sql.
+
+Values follow the column names and types: ids look like machine ids,
+*Time/*On columns hold ISO timestamps, is* columns booleans, numeric columns
+numbers, and NTEXT columns the nested lists and objects the API returns for
+them, sometimes empty so the cleaning of {} and [] is exercised too.
+"""
+
+import os
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+SQL_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "scripts", "db", "create_tables.sql"
+)
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE (\w+) \((.*?)\n\);", re.DOTALL)
+_COLUMN = re.compile(r"^\s*\[?(\w+)\]?\s+(\w+)(?:\((\w+)\))?", re.MULTILINE)
+_CONSTRAINTS = ("PRIMARY", "CONSTRAINT", "UNIQUE", "INDEX", "FOREIGN")
+# Columns filled in by the loader, not sent by the API
+_LOADER_COLUMNS = ("rowKeyHash",)
+
+_TIME_SUFFIXES = ("Time", "On", "Timestamp", "Date", "Detected", "Seen", "Available")
+_NUMBER_NAMES = ("score", "count", "cvss", "epss", "impact", "weight", "size")
+_BASE_TIME = datetime(2025, 5, 29, 4, 34, 31, tzinfo=timezone.utc)
+
+
+def load_table_schemas(sql_path: str = SQL_PATH) -> dict:
+    """
+    Columns of every table of the create script, as {table: [(name, type, length)]}
+    """
+    with open(sql_path, encoding="utf-8") as f:
+        script = f.read()
+
+    schemas = {}
+    for table_name, body in _CREATE_TABLE.findall(script):
+        columns = []
+        for name, data_type, length in _COLUMN.findall(body):
+            if name.upper() in _CONSTRAINTS:
+                continue
+            max_length = None
+            if length and length.isdigit():
+                max_length = int(length)
+            columns.append((name, data_type.upper(), max_length))
+        schemas[table_name] = columns
+    return schemas
+
+
+class PayloadGenerator:
+    """
+    Deterministic rows for one table, the same row for the same index
+    """
+
+    def __init__(self, columns: list, seed: int = 0, machines: int = 5000):
+        self.columns = [column for column in columns if column[0] not in _LOADER_COLUMNS]
+        self.seed = seed
+        self.machines = machines
+
+    def _value(self, rng: random.Random, index: int, name: str, data_type: str, max_length: int):
+        lower = name.lower()
+
+        if data_type in ("INT", "BIGINT", "SMALLINT", "TINYINT"):
+            return rng.randint(0, 10000)
+        if data_type in ("FLOAT", "REAL", "DECIMAL", "NUMERIC"):
+            return round(rng.uniform(0, 10), 2)
+        if data_type == "BIT" or (lower.startswith("is") and name[2:3].isupper()):
+            return rng.random() < 0.5
+
+        if data_type == "NTEXT":
+            # Nested values the API returns for the long text columns
+            shape = rng.random()
+            if shape < 0.2:
+                return [] if rng.random() < 0.5 else {}
+            if shape < 0.6:
+                return [f"{name}-{rng.randint(0, 99)}" for _ in range(rng.randint(1, 5))]
+            if shape < 0.8:
+                return [
+                    {"id": f"{rng.getrandbits(64):016x}", "name": f"{name} {i}", "value": rng.randint(0, 9)}
+                    for i in range(rng.randint(1, 3))
+                ]
+            return {"type": name, "id": rng.randint(0, 999), "tags": [f"tag{rng.randint(0, 9)}"]}
+
+        if name.endswith(_TIME_SUFFIXES):
+            moment = _BASE_TIME - timedelta(seconds=rng.randint(0, 90 * 86400))
+            return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rng.randint(0, 999):03d}Z"
+        if any(word in lower for word in _NUMBER_NAMES):
+            return round(rng.uniform(0, 10), 1)
+        if lower == "machineid" or lower == "deviceid":
+            return f"{index % self.machines:040x}"
+        if lower == "id" or lower.endswith("id"):
+            return f"{rng.getrandbits(160):040x}"
+        if "name" in lower:
+            return f"{name}-{index % 997}.contoso.com"
+
+        text = f"{name} {rng.randint(0, 10**6)}"
+        if max_length:
+            text = text[:max_length]
+        return text
+
+    def row(self, index: int) -> dict:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        row = {
+            name: self._value(rng, index, name, data_type, max_length)
+            for name, data_type, max_length in self.columns
+        }
+        # Some rows leave optional fields out or null
+        if self.columns and rng.random() < 0.05:
+            row[self.columns[-1][0]] = None
+        return row
+
+    def rows(self, start: int, count: int) -> list:
+        return [self.row(index) for index in range(start, start + count)]
@@ -1,11 +1,53 @@
+import json
 import time
-from datetime import datetime, timedelta
-from typing import Tuple
+from contextlib import nullcontext
+from typing import Callable, Iterator, NamedTuple, Tuple
 
 import requests
 from database import Database
+from autotune import SizeTuner, get_page_size
+from capture import CaptureCache
+from export_files import ExportFileReader
+from json_stream import StreamingPageDecoder
 from loguru import logger
-from process_data import process_result
+from metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_RESPONSES,
+    RESPONSE_BYTES,
+    STAGE_SECONDS,
+)
+from pipeline import StageTimings, iter_concurrently, run_pipelined, run_sequential
+from process_data import CleaningEngine
+from rate_limiter import RateLimiter, parse_retry_after
+from retry import RetryPolicy
+from sinks import Sink
+from token_cache import TokenCache
+
+# Page size of endpoints without a "pagesize", the auto-tuner starts from it
+DEFAULT_PAGESIZE = 10000
+
+# Connections kept open per host, enough for the endpoint workers and shards
+HTTP_POOL_SIZE = 32
+
+
+class PagePosition(NamedTuple):
+    """
+    Where to continue reading an endpoint: the url of a page and how many of
+    its rows are already committed. A url of None means no page is left.
+    """
+
+    url: str
+    skip_rows: int = 0
+
+
+class _ShortShard(NamedTuple):
+    """
+    Sent by a shard whose range ran past the end of the data
+    """
+
+    start: int
+    end: int
+    rows: int
 
 
 class API:
@@ -15,11 +57,62 @@ class API:
         api_client_id: str,
         api_client_secret: str,
         base_url: str,
+        pipeline_depth: int = 0,
+        rate_limiter: RateLimiter = None,
+        max_throttle_retries: int = 10,
+        stream_chunk_size: int = 20000,
+        export_download_workers: int = 4,
+        auto_tune: bool = False,
+        memory_limit_mb: int = 2048,
+        max_page_retries: int = 5,
+        max_endpoint_retries: int = 20,
+        token_url: str = None,
+        capture: CaptureCache = None,
+        sinks: list[Sink] = None,
     ):
         self.api_tenant_id = api_tenant_id
         self.api_client_id = api_client_id
         self.api_client_secret = api_client_secret
         self.base_url = base_url
+        # Azure AD token endpoint of the tenant, overridable for local stand-ins
+        self.token_url = (
+            token_url
+            or f"https://login.microsoftonline.com/{api_tenant_id}/oauth2/v2.0/token"
+        )
+        self.pipeline_depth = pipeline_depth
+        # One call budget for every endpoint using this client
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_throttle_retries = max_throttle_retries
+        self.stream_chunk_size = stream_chunk_size
+        self.export_download_workers = export_download_workers
+        # Let a SizeTuner pick page and batch sizes within the memory ceiling
+        self.auto_tune = auto_tune
+        self.memory_limit_mb = memory_limit_mb
+        # Retries of failed pages, per page and per endpoint
+        self.max_page_retries = max_page_retries
+        self.max_endpoint_retries = max_endpoint_retries
+        # Keep-alive connections to the API, shared by every endpoint and
+        # reused from one page, and one scheduled run, to the next
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # One token for every endpoint, refreshed before it expires
+        self.token_cache = TokenCache(self.request_token)
+        # Raw pages are stored in, or read back from, the capture cache
+        self.capture = capture
+        # Outputs the cleaned pages go to besides the database
+        self.sinks = sinks or []
+
+    def retry_policy(self, table_name: str) -> RetryPolicy:
+        """
+        A fresh page retry budget for one run of an endpoint
+        """
+        return RetryPolicy(
+            table_name,
+            max_retries=self.max_endpoint_retries,
+            max_page_retries=self.max_page_retries,
+        )
 
     def log_progress(
         self, current: int, total: int, table_name: str, milestones: dict
@@ -51,15 +144,11 @@ class API:
 
         return milestones
 
-    def get_token(self) -> str:
+    def request_token(self) -> Tuple[str, int]:
         """
-        Get a token from the API
+        Request a new token from the API, returns the token and its lifetime in seconds
         """
 
-        token_url = (
-            f"https://login.microsoftonline.com/{self.api_tenant_id}/oauth2/v2.0/token"
-        )
-
         data = {
             "grant_type": "client_credentials",
             "client_id": self.api_client_id,
@@ -68,16 +157,138 @@ class API:
         }
 
         try:
-            response = requests.post(token_url, data=data)
+            response = self.session.post(self.token_url, data=data)
             response.raise_for_status()  # Raise an exception for HTTP errors
-            # logger.info("Token obtained")
-            return response.json()["access_token"]
+            token = response.json()
+            logger.info(f"Token obtained, expires in {token.get('expires_in')}s")
+            return token["access_token"], int(token.get("expires_in", 3599))
         except requests.exceptions.RequestException as e:
             logger.error("Failed to get access token", error=str(e))
             raise
 
+    def send_request(
+        self, url: str, params: dict, stream: bool = False, table_name: str = ""
+    ) -> requests.Response:
+        """
+        GET a url under the shared call budget, waiting out throttling and
+        refreshing the token once if it was rejected. Latency and status codes
+        are recorded under the table name.
+        """
+        throttled = 0
+        refreshed = False
+
+        while True:
+            token = self.token_cache.get()
+            headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+
+            # Wait for the shared call budget instead of a fixed sleep
+            self.rate_limiter.acquire()
+            request_start = time.perf_counter()
+            response = self.session.get(
+                url, params=params, headers=headers, timeout=60, stream=stream
+            )
+            HTTP_REQUEST_SECONDS.observe(
+                table_name, value=time.perf_counter() - request_start
+            )
+            HTTP_RESPONSES.inc(table_name, str(response.status_code))
+
+            if response.status_code == 429 and throttled < self.max_throttle_retries:
+                throttled += 1
+                self.rate_limiter.record_throttle(
+                    parse_retry_after(response.headers.get("Retry-After"), 60)
+                )
+                # Hand the connection back to the session before asking again
+                response.close()
+                continue
+
+            if response.status_code != 429:
+                self.rate_limiter.record_success()
+
+            if response.status_code == 401 and not refreshed:
+                logger.error("Token expired, getting a new one")
+                self.token_cache.invalidate(token)
+                refreshed = True
+                response.close()
+                continue
+
+            return response
+
+    def parse_response(self, endpoint_config: dict, data: dict) -> Tuple[list, str]:
+        """
+        Turn a decoded response into a list of rows and the next page link
+        """
+        # Handle different response structures based on endpoint
+        if "value" in data:
+            # Standard response with 'value' key
+            return data["value"], data.get("@odata.nextLink")
+
+        elif (
+            "exportFiles" in data
+            and endpoint_config["table_name"] == "ep_info_gathering"
+        ):
+            list_export_files = []
+            # Special case for ep_info_gathering - convert to list format
+            for export_file in data["exportFiles"]:
+                export_record = {
+                    "exportFiles": f"{export_file}",
+                    "generatedTime": f"{data['generatedTime']}",
+                }
+                list_export_files.append(export_record)
+            return list_export_files, None  # Return as list with single record
+
+        elif (
+            "score" in data and endpoint_config["table_name"] == "ep_exposure_score"
+        ):
+            # Special case for ep_exposure_score
+            exposure_record = {
+                "score": data["score"],
+                "time": data.get(
+                    "timestamp", data.get("time", "")
+                ),  # Handle different timestamp field names
+            }
+            # Return as list with single record
+            return [exposure_record], None
+
+        elif (
+            "score" in data
+            and endpoint_config["table_name"] == "ep_device_secure_score"
+        ):
+            # Special case for ep_device_secure_score
+            device_score_record = {
+                "score": data["score"],
+                "time": data.get(
+                    "timestamp", data.get("time", "")
+                ),  # Handle different timestamp field names
+            }
+            # Return as list with single record
+            return [device_score_record], None
+
+        else:
+            # Handle other response structures
+            if isinstance(data, dict) and len(data) > 0:
+                # Convert single object to list format, excluding metadata
+                clean_data = {
+                    k: v for k, v in data.items() if not k.startswith("@")
+                }
+                if clean_data:
+                    return [clean_data], None
+                else:
+                    logger.info(
+                        f"Empty response from API for endpoint {
+                            endpoint_config['endpoint']
+                        }"
+                    )
+                    return [], None
+            else:
+                logger.info(
+                    f"Empty or unexpected response from API for endpoint {
+                        endpoint_config['endpoint']
+                    }"
+                )
+                return [], None
+
     def run_query_api(
-        self, endpoint_config: dict, token: str, params: dict, next_url: str = None
+        self, endpoint_config: dict, params: dict, next_url: str = None
     ) -> dict:
         """
         Run the query against the API and return the data
@@ -89,120 +300,481 @@ class API:
         else:
             url = f"{self.base_url}/{endpoint_config['endpoint']}"
 
-        headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-
         try:
             # Only use params for the first request, not for next_url requests
             request_params = None if next_url else params
 
-            response = requests.get(
-                url, params=request_params, headers=headers, timeout=60
-            )
-            # Sleep 1 second to dont overload api
-            time.sleep(1)
-            if response.status_code == 401:
-                logger.error("Token expired, getting a new one")
-                token = self.get_token()
-                return self.run_query_api(endpoint_config, token, params, next_url)
-
+            table_name = endpoint_config["table_name"]
+            response = self.send_request(url, request_params, table_name=table_name)
             response.raise_for_status()
+
+            decode_start = time.perf_counter()
             data = response.json()
+            STAGE_SECONDS.observe(
+                table_name, "decode", value=time.perf_counter() - decode_start
+            )
+            RESPONSE_BYTES.inc(table_name, amount=len(response.content))
 
-            # Handle different response structures based on endpoint
-            if "value" in data:
-                # Standard response with 'value' key
-                return data["value"], data.get("@odata.nextLink")
+            rows, next_link = self.parse_response(endpoint_config, data)
+            if self.capture is not None and self.capture.capturing:
+                self.capture.store(
+                    endpoint_config, response.url, response.content, len(rows), next_link
+                )
+            return rows, next_link
 
-            elif (
-                "exportFiles" in data
-                and endpoint_config["table_name"] == "ep_info_gathering"
-            ):
-                list_export_files = []
-                # Special case for ep_info_gathering - convert to list format
-                for export_file in data["exportFiles"]:
-                    export_record = {
-                        "exportFiles": f"{export_file}",
-                        "generatedTime": f"{data['generatedTime']}",
-                    }
-                    list_export_files.append(export_record)
-                return list_export_files, None  # Return as list with single record
-
-            elif (
-                "score" in data and endpoint_config["table_name"] == "ep_exposure_score"
-            ):
-                # Special case for ep_exposure_score
-                exposure_record = {
-                    "score": data["score"],
-                    "time": data.get(
-                        "timestamp", data.get("time", "")
-                    ),  # Handle different timestamp field names
-                }
-                # Return as list with single record
-                return [exposure_record], None
+        except requests.exceptions.RequestException:
+            logger.error("API request failed")
+            raise
 
-            elif (
-                "score" in data
-                and endpoint_config["table_name"] == "ep_device_secure_score"
-            ):
-                # Special case for ep_device_secure_score
-                device_score_record = {
-                    "score": data["score"],
-                    "time": data.get(
-                        "timestamp", data.get("time", "")
-                    ),  # Handle different timestamp field names
-                }
-                # Return as list with single record
-                return [device_score_record], None
+    def stream_query_api(
+        self, endpoint_config: dict, params: dict, next_url: str = None
+    ) -> Iterator[Tuple[list, str, bool]]:
+        """
+        Run the query against the API and yield the rows of the page in chunks
+        while the body is still downloading, with the next page link and
+        whether the chunk is the last one of the page. The next page link comes
+        with the last chunk, the other chunks carry None.
+        """
 
+        if next_url:
+            url = next_url
+        else:
+            url = f"{self.base_url}/{endpoint_config['endpoint']}"
+
+        chunk_size = endpoint_config.get("stream_chunk_size", self.stream_chunk_size)
+
+        try:
+            # Only use params for the first request, not for next_url requests
+            request_params = None if next_url else params
+
+            table_name = endpoint_config["table_name"]
+            with self.send_request(
+                url, request_params, stream=True, table_name=table_name
+            ) as response:
+                response.raise_for_status()
+                byte_chunks = response.iter_content(chunk_size=1 << 16)
+                writer = None
+                if self.capture is not None and self.capture.capturing:
+                    writer = self.capture.page_writer(endpoint_config, response.url)
+                    byte_chunks = writer.tee(byte_chunks)
+                decoder = StreamingPageDecoder(byte_chunks, chunk_size=chunk_size)
+
+                # Time in the decoder, without the time chunks spend downstream
+                decode_start = time.perf_counter()
+                paused = 0.0
+
+                # Hold one chunk back so the last one can carry the next link,
+                # which usually comes after the "value" array
+                pending = None
+                page_rows = 0
+                try:
+                    for chunk in decoder:
+                        page_rows += len(chunk)
+                        if pending is not None:
+                            yielded = time.perf_counter()
+                            yield pending, None, False
+                            paused += time.perf_counter() - yielded
+                        pending = chunk
+                    if writer is not None:
+                        writer.commit(page_rows, decoder.fields.get("@odata.nextLink"))
+                finally:
+                    if writer is not None:
+                        writer.close()
+
+            decode_seconds = time.perf_counter() - decode_start - paused
+            STAGE_SECONDS.observe(
+                table_name, "decode", value=decode_seconds - decoder.read_seconds
+            )
+            RESPONSE_BYTES.inc(table_name, amount=decoder.bytes_read)
+
+            if decoder.found_array:
+                yield pending or [], decoder.fields.get("@odata.nextLink"), True
             else:
-                # Handle other response structures
-                if isinstance(data, dict) and len(data) > 0:
-                    # Convert single object to list format, excluding metadata
-                    clean_data = {
-                        k: v for k, v in data.items() if not k.startswith("@")
-                    }
-                    if clean_data:
-                        return [clean_data], None
-                    else:
-                        logger.info(
-                            f"Empty response from API for endpoint {
-                                endpoint_config['endpoint']
-                            }"
-                        )
-                        return [], None
-                else:
-                    logger.info(
-                        f"Empty or unexpected response from API for endpoint {
-                            endpoint_config['endpoint']
-                        }"
-                    )
-                    return [], None
+                yield *self.parse_response(endpoint_config, decoder.fields), True
 
         except requests.exceptions.RequestException:
             logger.error("API request failed")
             raise
 
-    def get_and_save_data(
-        self, endpoint_config: dict, db: Database
-    ) -> Tuple[bool, int]:
+    def iter_export_rows(
+        self, endpoint_config: dict, columns: list = None
+    ) -> Iterator[Tuple[list, str]]:
+        """
+        Request a "via files" export and yield the rows of its files in chunks,
+        with their fields named as the given table columns
+        """
+        url = f"{self.base_url}/{endpoint_config['export_endpoint']}"
+
+        try:
+            response = self.send_request(
+                url, None, table_name=endpoint_config["table_name"]
+            )
+            response.raise_for_status()
+            export = response.json()
+        except requests.exceptions.RequestException:
+            logger.error("API request failed")
+            raise
+
+        logger.info(
+            f"Export of {endpoint_config['table_name']} generated at "
+            f"{export.get('generatedTime')} with {len(export['exportFiles'])} files"
+        )
+
+        reader = ExportFileReader(
+            max_workers=self.export_download_workers,
+            chunk_size=endpoint_config.get("stream_chunk_size", self.stream_chunk_size),
+            columns=columns,
+        )
+        for chunk in reader.iter_chunks(export["exportFiles"]):
+            yield chunk, None
+
+    def iter_replayed_pages(self, endpoint_config: dict) -> Iterator[Tuple[list, str]]:
         """
-        Get data from the API with progress logging at 25%, 50%, and 75%
+        Yield the rows of the pages captured for an endpoint, read from the
+        capture cache instead of the API. Replayed pages have no position, a
+        replay always starts from the first page.
         """
+        table_name = endpoint_config["table_name"]
+
+        for page in self.capture.pages(endpoint_config):
+            decode_start = time.perf_counter()
+            if endpoint_config.get("stream", False):
+                decoder = StreamingPageDecoder(
+                    self.capture.iter_page(page),
+                    chunk_size=endpoint_config.get(
+                        "stream_chunk_size", self.stream_chunk_size
+                    ),
+                )
+                paused = 0.0
+                for chunk in decoder:
+                    yielded = time.perf_counter()
+                    yield chunk, None
+                    paused += time.perf_counter() - yielded
+                STAGE_SECONDS.observe(
+                    table_name,
+                    "decode",
+                    value=time.perf_counter() - decode_start - paused,
+                )
+                if not decoder.found_array:
+                    yield self.parse_response(endpoint_config, decoder.fields)[0], None
+            else:
+                data = json.loads(self.capture.read_page(page))
+                STAGE_SECONDS.observe(
+                    table_name, "decode", value=time.perf_counter() - decode_start
+                )
+                yield self.parse_response(endpoint_config, data)[0], None
 
-        # Get the token
-        token = self.get_token()
+    def count_rows(self, endpoint_config: dict, params: dict) -> int:
+        """
+        Number of rows the endpoint returns for the query, from the
+        @odata.count of a one-row request, or None if it does not count
+        """
+        url = f"{self.base_url}/{endpoint_config['endpoint']}"
+        count_params = {key: value for key, value in params.items() if key != "pagesize"}
+        count_params.update({"$top": 1, "$count": "true"})
 
-        # Initialize the start date
-        start_table_iteration = datetime.now()
+        try:
+            response = self.send_request(
+                url, count_params, table_name=endpoint_config["table_name"]
+            )
+            response.raise_for_status()
+            count = response.json().get("@odata.count")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(
+                f"Count probe of {endpoint_config['table_name']} failed: {e}"
+            )
+            return None
+        return int(count) if count is not None else None
 
-        # Get the parameters for the query pagesize is important to avoid pagination
-        params = {"pagesize": str(endpoint_config["pagesize"])}
+    def iter_shard(
+        self,
+        endpoint_config: dict,
+        params: dict,
+        start: int,
+        end: int = None,
+        retry: RetryPolicy = None,
+    ) -> Iterator[list]:
+        """
+        Yield the pages of rows start to end of an endpoint, requested with
+        $skip and $top. A shard without an end reads on until a page comes
+        back short. Every page is retried on its own under the retry policy.
+        """
+        pagesize = int(params["pagesize"])
+        shard_params = {key: value for key, value in params.items() if key != "pagesize"}
+
+        skip = start
+        while end is None or skip < end:
+            top = pagesize if end is None else min(pagesize, end - skip)
+            page_params = {**shard_params, "$top": top, "$skip": skip}
+
+            page_retries = 0
+            while True:
+                try:
+                    data, next_link = self.run_query_api(endpoint_config, page_params)
+                    break
+                except Exception as e:
+                    if retry is None or not retry.retry(e, page_retries):
+                        raise
+                    page_retries += 1
+
+            if data:
+                yield data
+            skip += len(data)
+
+            # A server sends no next link once $top is satisfied, so a full
+            # page asks for the next one. A short page ends the data, unless
+            # the server capped it below $top and links to the rest
+            if not data or (len(data) < top and not next_link):
+                break
+
+    def iter_sharded_pages(
+        self,
+        endpoint_config: dict,
+        params: dict,
+        expected: int,
+        retry: RetryPolicy = None,
+    ) -> Iterator[Tuple[list, PagePosition]]:
+        """
+        Split the expected rows of an endpoint, from a count probe, into
+        "shards" ranges of $skip/$top and read them at the same time, under
+        the shared call budget. The last range reads on to the end of the
+        data. Pages come in no particular order and have no position, a
+        sharded load starts over after a restart.
+        """
+        table_name = endpoint_config["table_name"]
+        shards = endpoint_config["shards"]
+
+        shard_size = -(-expected // shards)
+        if shard_size == 0:
+            logger.info(f"{table_name} counted no rows, reading it as one shard")
+            for data in self.iter_shard(endpoint_config, params, 0, None, retry):
+                yield data, None
+            return
+
+        ranges = [
+            (i * shard_size, (i + 1) * shard_size if i < shards - 1 else None)
+            for i in range(shards)
+        ]
         logger.info(
-            f"page size defined for this endpoint is {str(endpoint_config['pagesize'])}"
+            f"Reading {table_name} in {shards} shards of about {shard_size:,} rows "
+            f"(counted {expected:,} rows)"
         )
 
+        def producer(start: int, end: int):
+            def read():
+                shard_rows = 0
+                for data in self.iter_shard(endpoint_config, params, start, end, retry):
+                    shard_rows += len(data)
+                    yield data
+                if end is not None and start + shard_rows < end:
+                    # The data ended before this shard did
+                    yield _ShortShard(start, end, shard_rows)
+
+            return read
+
+        rows = 0
+        short_shards = []
+        for item in iter_concurrently(
+            [producer(start, end) for start, end in ranges], depth=shards
+        ):
+            if isinstance(item, _ShortShard):
+                short_shards.append(item)
+                continue
+            rows += len(item)
+            yield item, None
+
+        # Rows added or removed while the shards were read move the others
+        # past the $skip boundaries, which a serial read would not notice
+        if rows < expected or short_shards:
+            raise ValueError(
+                f"Sharded read of {table_name} is incomplete: {rows:,} rows "
+                f"instead of {expected:,}"
+                + (f", {len(short_shards)} shards ended early" if short_shards else "")
+            )
+        elif rows > expected:
+            logger.warning(
+                f"Sharded read of {table_name} returned {rows:,} rows, "
+                f"{rows - expected:,} more than counted before the read"
+            )
+
+    def get_page_url(self, endpoint_config: dict, params: dict) -> str:
+        """
+        Full url of the first page of an endpoint, query parameters included
+        """
+        url = f"{self.base_url}/{endpoint_config['endpoint']}"
+        return requests.Request("GET", url, params=params).prepare().url
+
+    def iter_pages(
+        self,
+        endpoint_config: dict,
+        params: dict,
+        resume: PagePosition = None,
+        tuner: SizeTuner = None,
+        retry: RetryPolicy = None,
+        columns: list = None,
+    ) -> Iterator[Tuple[list, PagePosition]]:
+        """
+        Yield the raw rows of every page of an endpoint, following @odata.nextLink,
+        each with the position to resume from once they are committed
+        """
+
+        if self.capture is not None and self.capture.replaying:
+            yield from self.iter_replayed_pages(endpoint_config)
+            return
+
+        # Export endpoints hand out files instead of pages
+        if endpoint_config.get("export_endpoint"):
+            yield from self.iter_export_rows(endpoint_config, columns)
+            return
+
+        # Endpoints with $skip/$top can be read in ranges at the same time,
+        # as long as they count their rows to check the ranges against
+        if endpoint_config.get("shards", 1) > 1 and resume is None:
+            expected = self.count_rows(endpoint_config, params)
+            if expected is not None:
+                yield from self.iter_sharded_pages(
+                    endpoint_config, params, expected, retry
+                )
+                return
+            logger.warning(
+                f"{endpoint_config['table_name']} did not count its rows, reading "
+                f"it serially instead of in shards"
+            )
+
         # Track the next URL for pagination
         next_url = None
+        skip_rows = 0
+        if resume is not None:
+            next_url, skip_rows = resume
+            logger.info(
+                f"Resuming {endpoint_config['table_name']} at {next_url}, "
+                f"skipping {skip_rows} committed rows of the page"
+            )
+
+        # Large pages can be decoded while they download, in chunks
+        stream = endpoint_config.get("stream", False)
+
+        # Rows asked for in the page being read
+        requested = int(params["pagesize"])
+        if next_url:
+            requested = get_page_size(next_url) or requested
+
+        while True:
+            # A page committed in chunks resumes at its own url
+            page_url = next_url or self.get_page_url(endpoint_config, params)
+
+            # A page that fails is read again after a backoff, skipping the
+            # rows already handed on
+            page_retries = 0
+            while True:
+                # Time spent downloading the page, without the time its rows
+                # spend downstream between two chunks
+                page_start = time.perf_counter()
+                paused = 0.0
+                sample = None
+                page_rows = 0
+                try:
+                    # Get the data from the api
+                    if stream:
+                        for data, next_link, last in self.stream_query_api(
+                            endpoint_config, params, next_url
+                        ):
+                            page_rows += len(data)
+                            if sample is None:
+                                sample = data
+                            if skip_rows:
+                                skipped = min(skip_rows, len(data))
+                                data = data[skipped:]
+                                skip_rows -= skipped
+                            yielded = time.perf_counter()
+                            if last:
+                                yield data, PagePosition(next_link)
+                            else:
+                                yield data, PagePosition(page_url, page_rows)
+                            paused += time.perf_counter() - yielded
+                    else:
+                        data, next_link = self.run_query_api(
+                            endpoint_config, params, next_url
+                        )
+                        page_rows = len(data)
+                        sample = data
+                        if skip_rows:
+                            data = data[skip_rows:]
+                            skip_rows = 0
+                        yielded = time.perf_counter()
+                        yield data, PagePosition(next_link)
+                        paused += time.perf_counter() - yielded
+                    break
+                except Exception as e:
+                    if retry is None or not retry.retry(e, page_retries):
+                        raise
+                    page_retries += 1
+                    skip_rows += page_rows
+
+            if tuner is not None:
+                tuner.observe_page(
+                    sample, page_rows, time.perf_counter() - page_start - paused
+                )
+
+            # If there is a next link, update the next_url for pagination
+            if not next_link:
+                break
+
+            # if len data < pagesize, break, unless a tuned page size went
+            # past what the server hands out
+            if page_rows < requested and not (
+                tuner is not None and tuner.page_capped(page_rows, requested)
+            ):
+                break
+
+            next_url = tuner.next_url(next_link) if tuner is not None else next_link
+            requested = get_page_size(next_url) or requested
+
+    def get_and_save_data(
+        self,
+        endpoint_config: dict,
+        db: Database,
+        target_table: str = None,
+        query_params: dict = None,
+        checkpoint: bool = False,
+        resume: dict = None,
+        retry: RetryPolicy = None,
+        row_filter: Callable[[list], list] = None,
+    ) -> Tuple[bool, int]:
+        """
+        Get data from the API into target_table (the endpoint's table by
+        default) and the API's sinks, with progress logging at 25%, 50%, and 75%
+        """
+
+        table_name = endpoint_config["table_name"]
+        target_table = target_table or table_name
+
+        # Get the parameters for the query pagesize is important to avoid pagination
+        pagesize = endpoint_config.get("pagesize", DEFAULT_PAGESIZE)
+        params = {"pagesize": str(pagesize)}
+        if query_params:
+            params.update(query_params)
+        logger.info(f"page size defined for this endpoint is {pagesize}")
+
+        # Pages in flight between stages, 0 runs fetch, clean and insert in sequence
+        pipeline_depth = endpoint_config.get("pipeline_depth", self.pipeline_depth)
+
+        retry = retry or self.retry_policy(table_name)
+
+        # Page and batch sizes follow the measured latency and memory use
+        tuner = None
+        if endpoint_config.get("auto_tune", self.auto_tune):
+            tuner = SizeTuner(
+                table_name,
+                pagesize,
+                endpoint_config.get(
+                    "batch_size", db.batch_size if db is not None else pagesize
+                ),
+                self.memory_limit_mb,
+                # A raw and a cleaned copy per page, plus the queued pages
+                pages_in_flight=2 + 2 * pipeline_depth,
+                stream=endpoint_config.get("stream", False),
+            )
 
         # Total table rows approximately (from config or estimate)
         estimated_total_rows = endpoint_config.get("total_rows", 0)
@@ -210,81 +782,118 @@ class API:
         # Progress tracking
         progress_milestones = {25: False, 50: False, 75: False}
 
-        logger.info(
-            f"Starting to get data from the API for table {
-                endpoint_config['table_name']
-            }"
-        )
+        logger.info(f"Starting to get data from the API for table {table_name}")
 
         total_rows_processed = 0
+        resume_position = None
+        if resume is not None:
+            total_rows_processed = resume["rows_committed"]
+            resume_position = PagePosition(resume["resume_url"], resume["skip_rows"])
+        timings = StageTimings(table_name)
+
+        # Learns the endpoint's row shape on the first page
+        cleaning_engine = CleaningEngine(table_name)
+        start_time = time.perf_counter()
+
+        writers = [sink.open(endpoint_config, target_table) for sink in self.sinks]
+        if writers and resume is not None:
+            logger.warning(
+                f"Resumed load of {table_name} only writes the rest of its pages "
+                f"to the {', '.join(sink.name for sink in self.sinks)} sink"
+            )
         success = False
 
-        # count for debugging
-        count = 0
-
         # Iterate ovr the endpoint config
-        with db.get_connection() as conn:
-            while True:
-                # Save start date in a variable to look for token expiration
-                # If start_table_iteration - now > 30 minutes, get a new token
-                if datetime.now() - start_table_iteration > timedelta(minutes=30):
-                    token = self.get_token()
-                    start_table_iteration = datetime.now()  # Reset the timer
-
-                # Get the data from the api
-                data, next_link = self.run_query_api(
-                    endpoint_config, token, params, next_url
-                )
+        with db.get_connection() if db is not None else nullcontext() as conn:
+            columns = None
+            if db is not None:
+                # Read the table schema once for the whole endpoint
+                db.invalidate_table(target_table)
+                columns = db.prepare_table(conn, target_table)
 
-                # process data
-                data = process_result(data)
+            def save_page(data: list, position: PagePosition) -> bool:
+                nonlocal total_rows_processed, progress_milestones
 
                 # Save total rows processed
                 total_rows_processed += len(data)
+                timings.pages += 1
+                timings.rows += len(data)
 
                 # Log progress at 25%, 50%, and 75% milestones
                 if estimated_total_rows > 0:
                     progress_milestones = self.log_progress(
                         total_rows_processed,
                         estimated_total_rows,
-                        endpoint_config["table_name"],
+                        table_name,
                         progress_milestones,
                     )
 
                 # Save the data into the mssql database
-                success = db.save_data(data, endpoint_config, conn)
-
-                if not success:
-                    logger.error(
-                        f"Failed to save data for {endpoint_config['table_name']}"
+                insert_start = time.perf_counter()
+                rows = row_filter(data) if row_filter is not None else data
+                # A checkpointed page commits its rows with its checkpoint, so
+                # a restart never finds them without it
+                checkpointed = checkpoint and position is not None and db is not None
+                saved = True
+                if db is not None:
+                    saved = db.save_data(
+                        rows,
+                        endpoint_config,
+                        conn,
+                        target_table,
+                        batch_size=tuner.batch_size if tuner is not None else None,
+                        commit=not checkpointed,
                     )
-                    break
+                if saved and tuner is not None:
+                    tuner.observe_insert(len(rows), time.perf_counter() - insert_start)
+                if saved:
+                    timings.count("insert", len(rows))
+                    for writer in writers:
+                        writer.write(data)
+                if not saved:
+                    logger.error(f"Failed to save data for {table_name}")
+                elif checkpointed:
+                    # Commits the page, a restart continues after it
+                    db.save_checkpoint(
+                        conn,
+                        table_name,
+                        position.url,
+                        position.skip_rows,
+                        total_rows_processed,
+                    )
+                return saved
 
-                # If there is a next link, update the next_url for pagination
-                if next_link:
-                    next_url = next_link
+            pages = self.iter_pages(
+                endpoint_config, params, resume_position, tuner, retry, columns
+            )
+            try:
+                if pipeline_depth > 0:
+                    success = run_pipelined(
+                        pages, cleaning_engine.clean, save_page, timings, pipeline_depth
+                    )
                 else:
-                    break
-
-                # if len data < pagesize, break
-                if len(data) < endpoint_config["pagesize"]:
-                    break
-
-                # count += 1
+                    success = run_sequential(
+                        pages, cleaning_engine.clean, save_page, timings
+                    )
+            finally:
+                for writer in writers:
+                    writer.close(success)
+                if db is not None:
+                    db.drop_writer_tables(target_table)
 
-                # if count == 2:
-                #     return True, total_rows_processed
+        timings.log(table_name, time.perf_counter() - start_time)
+        cleaning_engine.log_summary()
 
         # Final completion log
         if success:
             logger.info(
-                f"Completed processing {endpoint_config['table_name']}: {
+                f"Completed processing {table_name}: {
                     total_rows_processed
                 } total rows processed"
             )
         else:
             logger.error(
-                f"Failed processing {endpoint_config['table_name']}: {
+                f"Failed processing {table_name}: {
                     total_rows_processed
                 } rows processed before failure"
             )
@@ -0,0 +1,192 @@
+import json
+import os
+import re
+
+from loguru import logger
+
+# The pagesize query parameter of an MDE next link, whatever its case
+_PAGESIZE_PARAM = re.compile(r"([?&]pagesize=)\d+", re.IGNORECASE)
+
+# Rows sampled to estimate the size of a row
+_SAMPLE_ROWS = 50
+
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of the process, or 0 where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def get_page_size(url: str) -> int:
+    """
+    The pagesize of a url, or None if it has none
+    """
+    match = _PAGESIZE_PARAM.search(url)
+    return int(match.group(0).split("=")[1]) if match else None
+
+
+def set_page_size(url: str, pagesize: int) -> str:
+    """
+    Replace the pagesize of a next link. Links without one are returned as is,
+    the server decides their page size.
+    """
+    return _PAGESIZE_PARAM.sub(rf"\g<1>{pagesize}", url, count=1)
+
+
+def sample_row_bytes(rows: list) -> float:
+    """
+    Average JSON size of the first rows of a page
+    """
+    sample = rows[:_SAMPLE_ROWS]
+    if not sample:
+        return 0.0
+    return len(json.dumps(sample, default=str)) / len(sample)
+
+
+class SizeTuner:
+    """
+    Picks the page size and the insert batch size of one endpoint from what
+    the previous pages measured. A page is sized so it downloads in about
+    target_page_seconds and the pages in flight fit in the memory left under
+    the ceiling; a batch is sized so it inserts in about target_batch_seconds.
+    Sizes at most double from one page to the next and are halved when the
+    process gets close to the ceiling.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        pagesize: int,
+        batch_size: int,
+        memory_limit_mb: int,
+        pages_in_flight: int = 2,
+        stream: bool = False,
+        min_pagesize: int = 1000,
+        max_pagesize: int = 200000,
+        target_page_seconds: float = 20.0,
+        min_batch_size: int = 1000,
+        max_batch_size: int = 100000,
+        target_batch_seconds: float = 2.0,
+        object_overhead: float = 4.0,
+    ):
+        self.table_name = table_name
+        self.initial_pagesize = pagesize
+        self.pagesize = pagesize
+        self.batch_size = batch_size
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.pages_in_flight = pages_in_flight
+        # Streamed pages are held in chunks, their size does not drive memory
+        self.stream = stream
+        # A hand-tuned page size below the floor is kept as the floor
+        self.min_pagesize = min(min_pagesize, pagesize)
+        self.max_pagesize = max_pagesize
+        self.target_page_seconds = target_page_seconds
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_batch_seconds = target_batch_seconds
+        # Decoded Python rows take several times their JSON size
+        self.object_overhead = object_overhead
+
+        self.baseline_rss = current_rss_bytes()
+        self.row_bytes = 0.0
+        self.capped = False
+
+    def _memory_pressure(self) -> bool:
+        rss = current_rss_bytes()
+        return rss > 0 and rss > 0.9 * self.memory_limit
+
+    def _memory_rows(self, share: int) -> float:
+        """
+        Rows that fit in the memory left under the ceiling, split in `share` parts
+        """
+        if not self.row_bytes:
+            return float("inf")
+        budget = max(self.memory_limit - self.baseline_rss, 0) / share
+        return budget / (self.row_bytes * self.object_overhead)
+
+    def _step(self, current: int, wanted: float, low: int, high: int) -> int:
+        size = min(wanted, current * 2, high)
+        if size >= 1000:
+            size = size // 1000 * 1000
+        return int(max(size, low))
+
+    def observe_page(self, rows: list, page_rows: int, seconds: float):
+        """
+        Adjust the page size after a page of page_rows rows took seconds to
+        download. rows are some of the page's raw rows, to size a row.
+        """
+        if rows:
+            sampled = sample_row_bytes(rows)
+            self.row_bytes = sampled if not self.row_bytes else (
+                0.7 * self.row_bytes + 0.3 * sampled
+            )
+
+        previous = self.pagesize
+        if self._memory_pressure():
+            self.pagesize = max(self.pagesize // 2, self.min_pagesize)
+        elif page_rows > 0 and seconds > 0:
+            wanted = page_rows / seconds * self.target_page_seconds
+            if not self.stream:
+                wanted = min(wanted, self._memory_rows(self.pages_in_flight))
+            self.pagesize = self._step(
+                self.pagesize, wanted, self.min_pagesize, self.max_pagesize
+            )
+
+        if self.pagesize != previous:
+            logger.info(
+                f"Page size of {self.table_name} {previous:,} -> {self.pagesize:,} "
+                f"({page_rows:,} rows in {seconds:.1f}s, "
+                f"{self.row_bytes:,.0f} bytes/row, RSS {current_rss_bytes() / 2**20:,.0f} MB)"
+            )
+
+    def observe_insert(self, rows: int, seconds: float):
+        """
+        Adjust the batch size after rows were inserted in seconds
+        """
+        previous = self.batch_size
+        if self._memory_pressure():
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+        elif rows > 0 and seconds > 0:
+            wanted = min(
+                rows / seconds * self.target_batch_seconds,
+                # A batch is projected to tuples next to the page it comes from
+                self._memory_rows(4 * self.pages_in_flight),
+            )
+            self.batch_size = self._step(
+                self.batch_size, wanted, self.min_batch_size, self.max_batch_size
+            )
+
+        if self.batch_size != previous:
+            logger.info(
+                f"Batch size of {self.table_name} {previous:,} -> {self.batch_size:,} "
+                f"({rows / seconds:,.0f} rows/s)"
+            )
+
+    def page_capped(self, page_rows: int, requested: int) -> bool:
+        """
+        Whether a short page with a next link means the server caps the page
+        size below what was requested, instead of being the last page. The
+        size is then held at the cap.
+        """
+        if self.capped or page_rows == 0 or requested <= self.initial_pagesize:
+            return False
+        logger.info(
+            f"Server returned {page_rows:,} of {requested:,} rows for "
+            f"{self.table_name}, capping the page size"
+        )
+        self.capped = True
+        self.max_pagesize = page_rows
+        self.min_pagesize = min(self.min_pagesize, page_rows)
+        self.pagesize = page_rows
+        return True
+
+    def next_url(self, next_link: str) -> str:
+        """
+        The next link with the current page size
+        """
+        return set_page_size(next_link, self.pagesize)
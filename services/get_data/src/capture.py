@@ -0,0 +1,414 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+from loguru import logger
+
+CAPTURE = "capture"
+REPLAY = "replay"
+
+# How the pages of a captured load were requested: the whole endpoint, the
+# records changed since a watermark, or a delta export since a sync time
+SNAPSHOT = "snapshot"
+INCREMENTAL = "incremental"
+DELTA = "delta"
+# A load that continued an interrupted one, its pages are not the whole data
+RESUMED = "resumed"
+
+# Raw pages are JSON and shrink several times even at the fastest level,
+# higher levels cost more time per page than they save on disk
+COMPRESS_LEVEL = 1
+
+# Bytes per read when a replayed page is streamed back
+READ_BLOCK_SIZE = 1 << 16
+
+
+class PageWriter:
+    """
+    One raw page on its way into the cache. The body is compressed and hashed
+    as it is written and only becomes visible under its hash on commit.
+    """
+
+    def __init__(self, cache: "CaptureCache", endpoint_config: dict, url: str):
+        self.cache = cache
+        self.endpoint_config = endpoint_config
+        self.url = url
+        self.raw_bytes = 0
+        self.committed = False
+        self._hash = hashlib.sha256()
+        self._tmp_path = os.path.join(
+            cache.tmp_dir, f"{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+        )
+        self._file = open(self._tmp_path, "wb")
+        self._gzip = gzip.GzipFile(
+            fileobj=self._file, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0
+        )
+
+    def write(self, block: bytes):
+        self._hash.update(block)
+        self._gzip.write(block)
+        self.raw_bytes += len(block)
+
+    def tee(self, byte_chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass the blocks of a streamed body through, writing each one
+        """
+        for block in byte_chunks:
+            if block:
+                self.write(block)
+            yield block
+
+    def commit(self, rows: int, next_link: str):
+        """
+        Store the complete page and add it to the run's manifest
+        """
+        self._gzip.close()
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        stored_bytes = os.path.getsize(self._tmp_path)
+
+        self.cache.add_page(
+            self.endpoint_config,
+            self._tmp_path,
+            {
+                "url": self.url,
+                "sha256": sha256,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": stored_bytes,
+                "rows": rows,
+                "next_link": next_link,
+            },
+        )
+        self.committed = True
+
+    def close(self):
+        """
+        Drop the page unless it was committed, e.g. after a failed download
+        """
+        if self.committed:
+            return
+        self._gzip.close()
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class CaptureCache:
+    """
+    Local cache of raw API pages, so a run can be processed again without
+    calling the API. In capture mode every page body is stored gzipped under
+    its sha256 in objects/, and runs/<run_id>/<table>.jsonl lists the pages of
+    each load of a table in the order they were read, with their url, size,
+    rows and how the load requested them. With run_per_load every load of a
+    table gets a run of its own, as in daemon mode where loads never end a run. In replay mode the last load of a
+    table in a run (the latest one with the table unless `replay_run` is set)
+    is resolved before the table is touched, and its pages are read back in
+    that order.
+
+    Runs older than `max_age_days` are evicted, then the oldest runs until the
+    stored pages fit in `max_bytes`. Pages are only deleted once no run lists
+    them anymore.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        mode: str = CAPTURE,
+        replay_run: str = "",
+        max_bytes: int = 20 * 2**30,
+        max_age_days: float = 7,
+        run_per_load: bool = False,
+    ):
+        if mode not in (CAPTURE, REPLAY):
+            raise ValueError(f"Unknown capture mode {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self.replay_run = replay_run
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.run_per_load = run_per_load
+
+        self.objects_dir = os.path.join(directory, "objects")
+        self.runs_dir = os.path.join(directory, "runs")
+        self.tmp_dir = os.path.join(directory, "tmp")
+        for path in (self.objects_dir, self.runs_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+
+        self.run_id = self._new_run_id()
+        self._sequence = {}
+        # The load being captured, and the load resolved for replay, per table
+        self._loads = {}
+        self._replays = {}
+        # Runs with a load still being captured, kept by evict
+        self._active_runs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def capturing(self) -> bool:
+        return self.mode == CAPTURE
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _new_run_id(self) -> str:
+        return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.json.gz")
+
+    def _manifest_path(self, run_id: str, table_name: str) -> str:
+        return os.path.join(self.runs_dir, run_id, f"{table_name}.jsonl")
+
+    # Capture
+
+    def begin_load(
+        self, endpoint_config: dict, load: str, since: str = None, query: dict = None
+    ):
+        """
+        Start a new load of an endpoint's table. Its pages are recorded with
+        the load, the watermark it started from and its query parameters, so
+        a replay can load them the same way.
+        """
+        table_name = endpoint_config["table_name"]
+        with self._lock:
+            previous = self._loads.get(table_name)
+            run_id = self._new_run_id() if self.run_per_load else self.run_id
+            self._active_runs[table_name] = run_id
+            self._loads[table_name] = {
+                "run_id": run_id,
+                "load_id": 0 if previous is None else previous["load_id"] + 1,
+                "load": load,
+                "since": since,
+                "query": query or {},
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+    def end_load(self, endpoint_config: dict):
+        """
+        Mark the load of an endpoint's table as done, its run can be evicted
+        """
+        with self._lock:
+            self._active_runs.pop(endpoint_config["table_name"], None)
+
+    def page_writer(self, endpoint_config: dict, url: str) -> PageWriter:
+        return PageWriter(self, endpoint_config, url)
+
+    def store(
+        self, endpoint_config: dict, url: str, body: bytes, rows: int, next_link: str
+    ):
+        """
+        Store a page whose body was read in full
+        """
+        writer = self.page_writer(endpoint_config, url)
+        try:
+            writer.write(body)
+            writer.commit(rows, next_link)
+        finally:
+            writer.close()
+
+    def add_page(self, endpoint_config: dict, tmp_path: str, page: dict):
+        """
+        Move a written page into objects/ and list it in the manifest of its
+        load, both under the lock evict holds, so it never sees one without
+        the other
+        """
+        table_name = endpoint_config["table_name"]
+
+        with self._lock:
+            object_path = self.object_path(page["sha256"])
+            if os.path.exists(object_path):
+                # Same body as an earlier page, keep the one copy
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(tmp_path, object_path)
+
+            load = self._loads.get(table_name, {})
+            run_id = load.get("run_id", self.run_id)
+            manifest_path = self._manifest_path(run_id, table_name)
+            sequence = self._sequence.get(table_name, 0)
+            self._sequence[table_name] = sequence + 1
+            entry = {
+                "run_id": run_id,
+                "table_name": table_name,
+                "endpoint": endpoint_config["endpoint"],
+                "page": sequence,
+                "captured_at": datetime.now(timezone.utc).isoformat(),
+                **load,
+                **page,
+            }
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            with open(manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    # Replay
+
+    def list_runs(self) -> list:
+        """
+        Captured run ids, oldest first
+        """
+        return sorted(os.listdir(self.runs_dir))
+
+    def _read_manifest(self, run_id: str, table_name: str) -> list:
+        manifest_path = self._manifest_path(run_id, table_name)
+        if not os.path.exists(manifest_path):
+            return []
+        with open(manifest_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def resolve(self, endpoint_config: dict) -> dict:
+        """
+        The last captured load of an endpoint's table, with its run id, load,
+        since, query, endpoint, start time and pages in read order, or None
+        if no run has one. The load is kept for the pages of the replay that
+        follows. Pages captured without their load are never replayed.
+        """
+        table_name = endpoint_config["table_name"]
+        run_ids = [self.replay_run] if self.replay_run else reversed(self.list_runs())
+
+        for run_id in run_ids:
+            pages = [page for page in self._read_manifest(run_id, table_name) if "load" in page]
+            if not pages:
+                continue
+            load_id = max(page["load_id"] for page in pages)
+            pages = sorted(
+                (page for page in pages if page["load_id"] == load_id),
+                key=lambda page: page["page"],
+            )
+            first = pages[0]
+            replay = {
+                "run_id": run_id,
+                **{
+                    key: first[key]
+                    for key in ("load", "since", "query", "endpoint", "started_at")
+                },
+                "pages": pages,
+            }
+            with self._lock:
+                self._replays[table_name] = replay
+            logger.info(
+                f"Replaying the {replay['load']} load of {table_name} from run "
+                f"{run_id}: {len(pages)} pages"
+            )
+            return replay
+
+        with self._lock:
+            self._replays.pop(table_name, None)
+        return None
+
+    def pages(self, endpoint_config: dict) -> list:
+        """
+        Manifest entries of the pages of the load resolved for an endpoint
+        """
+        table_name = endpoint_config["table_name"]
+        endpoint = endpoint_config["endpoint"]
+        with self._lock:
+            replay = self._replays.get(table_name)
+        if replay is None or replay["endpoint"] != endpoint:
+            raise FileNotFoundError(
+                f"No captured load of {table_name} ({endpoint}) was resolved in "
+                f"{self.directory}"
+            )
+        return replay["pages"]
+
+    def read_page(self, page: dict) -> bytes:
+        with gzip.open(self.object_path(page["sha256"]), "rb") as f:
+            body = f.read()
+        if hashlib.sha256(body).hexdigest() != page["sha256"]:
+            raise ValueError(f"Captured page {page['sha256']} is corrupt")
+        return body
+
+    def iter_page(self, page: dict) -> Iterator[bytes]:
+        """
+        The body of a page in blocks, for pages decoded while they are read
+        """
+        with gzip.open(self.object_path(page["sha256"]), "rb") as f:
+            while block := f.read(READ_BLOCK_SIZE):
+                yield block
+
+    # Retention
+
+    def _run_age_days(self, run_id: str) -> float:
+        modified = os.path.getmtime(os.path.join(self.runs_dir, run_id))
+        return (time.time() - modified) / 86400
+
+    def _referenced_objects(self, run_id: str) -> set:
+        run_dir = os.path.join(self.runs_dir, run_id)
+        referenced = set()
+        for name in os.listdir(run_dir):
+            with open(os.path.join(run_dir, name), encoding="utf-8") as f:
+                referenced.update(json.loads(line)["sha256"] for line in f if line.strip())
+        return referenced
+
+    def _stored_objects(self) -> dict:
+        stored = {}
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                stored[name.split(".")[0]] = os.path.getsize(os.path.join(prefix_dir, name))
+        return stored
+
+    def evict(self):
+        """
+        Drop expired runs, then the oldest runs until the cache fits in
+        max_bytes, and delete the pages no remaining run lists. The current
+        run and the runs of loads still being captured are always kept.
+        """
+        with self._lock:
+            active = {self.run_id, *self._active_runs.values()}
+            runs = [run_id for run_id in self.list_runs() if run_id not in active]
+            evicted = [
+                run_id for run_id in runs if self._run_age_days(run_id) > self.max_age_days
+            ]
+            kept = [run_id for run_id in runs if run_id not in evicted]
+
+            referenced = {run_id: self._referenced_objects(run_id) for run_id in kept}
+            for run_id in active:
+                if os.path.isdir(os.path.join(self.runs_dir, run_id)):
+                    referenced[run_id] = self._referenced_objects(run_id)
+            stored = self._stored_objects()
+
+            def live_bytes() -> int:
+                live = set().union(*referenced.values())
+                return sum(size for sha256, size in stored.items() if sha256 in live)
+
+            while kept and live_bytes() > self.max_bytes:
+                run_id = kept.pop(0)
+                referenced.pop(run_id)
+                evicted.append(run_id)
+
+            for run_id in evicted:
+                shutil.rmtree(os.path.join(self.runs_dir, run_id), ignore_errors=True)
+
+            # Pages of downloads that died with their process
+            for name in os.listdir(self.tmp_dir):
+                tmp_path = os.path.join(self.tmp_dir, name)
+                if time.time() - os.path.getmtime(tmp_path) > 86400:
+                    os.remove(tmp_path)
+
+            live = set().union(*referenced.values())
+            freed = 0
+            for sha256, size in stored.items():
+                if sha256 not in live:
+                    os.remove(self.object_path(sha256))
+                    freed += size
+
+            total = sum(size for sha256, size in stored.items() if sha256 in live)
+
+        if evicted or freed:
+            logger.info(
+                f"Evicted {len(evicted)} captured runs, freed {freed / 2**20:.1f} MB, "
+                f"{total / 2**20:.1f} MB left in {self.directory}"
+            )
+        if total > self.max_bytes:
+            logger.warning(
+                f"Runs being captured alone take {total / 2**20:.1f} MB, "
+                f"more than the {self.max_bytes / 2**20:.0f} MB limit"
+            )
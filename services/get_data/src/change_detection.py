@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from loguru import logger
+
+from metrics import ROW_CHANGES
+
+# Column added to the changes table of an endpoint, with the row hashes
+# written to ep_row_hash along with the rows. The key hash of every row is
+# stored in the table itself, in its rowKeyHash column
+ROW_HASH_COLUMNS = {"rowHash": "BIGINT"}
+
+# Columns the loader fills in itself, never sent by the API
+LOADER_COLUMNS = ("rowKeyHash", *ROW_HASH_COLUMNS)
+
+# A key of the previous load that came back in this one
+_SEEN = None
+
+
+def stable_hash(value) -> int:
+    """
+    64-bit hash of a cleaned value, the same across runs and processes
+    """
+    text = json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class ChangeDetector:
+    """
+    Compares the cleaned rows of a full download with the row hashes of the
+    previous load, given as {key hash: row hash}, and keeps only the rows
+    that are new or changed. Every key's entry is marked once it is seen, so
+    the entries left unmarked at the end are the rows to delete. A key seen
+    twice in one download keeps its first row. Columns in ignore_columns,
+    such as collection timestamps, are left out of the row hash, so a row
+    that only changed in them keeps its stored values.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        key_columns: list,
+        previous: dict,
+        ignore_columns: list = (),
+    ):
+        self.table_name = table_name
+        self.key_columns = key_columns
+        self.previous = previous
+        self.ignore_columns = frozenset(ignore_columns)
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.duplicates = 0
+
+    def filter(self, rows: list) -> list:
+        """
+        The new and changed rows of a cleaned page, with their hashes added
+        """
+        previous = self.previous
+        ignore_columns = self.ignore_columns
+        changes = []
+        for row in rows:
+            key_hash = stable_hash([row.get(col) for col in self.key_columns])
+            if ignore_columns:
+                row_hash = stable_hash(
+                    {col: value for col, value in row.items() if col not in ignore_columns}
+                )
+            else:
+                row_hash = stable_hash(row)
+
+            if key_hash in previous:
+                old_hash = previous[key_hash]
+                if old_hash is _SEEN:
+                    self.duplicates += 1
+                    continue
+                if old_hash == row_hash:
+                    self.unchanged += 1
+                    previous[key_hash] = _SEEN
+                    continue
+                self.changed += 1
+            else:
+                self.new += 1
+            previous[key_hash] = _SEEN
+            changes.append({**row, "rowKeyHash": key_hash, "rowHash": row_hash})
+        return changes
+
+    def deleted(self) -> list:
+        """
+        Key hashes of the previous load that did not come back
+        """
+        return [key_hash for key_hash, row_hash in self.previous.items() if row_hash is not _SEEN]
+
+    def log_summary(self, deleted: int):
+        for change, rows in (
+            ("new", self.new),
+            ("changed", self.changed),
+            ("unchanged", self.unchanged),
+            ("deleted", deleted),
+        ):
+            ROW_CHANGES.inc(self.table_name, change, amount=rows)
+        logger.info(
+            f"Changes in {self.table_name}: {self.new:,} new, {self.changed:,} changed, "
+            f"{deleted:,} deleted, {self.unchanged:,} unchanged rows"
+        )
+        if self.duplicates:
+            logger.warning(
+                f"{self.duplicates:,} rows of {self.table_name} repeat the key "
+                f"{self.key_columns} of an earlier row, only the first one is kept"
+            )
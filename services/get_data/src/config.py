@@ -18,10 +18,69 @@ class Settings(BaseSettings):
     API_CLIENT_SECRET: str
     # API Base URL
     BASE_URL: str
+    # MDE API quotas, shared by every endpoint of the run
+    API_CALLS_PER_MINUTE: int = 100
+    API_CALLS_PER_HOUR: int = 1500
+    # Retries of failed pages, per page and per endpoint
+    MAX_PAGE_RETRIES: int = 5
+    MAX_ENDPOINT_RETRIES: int = 20
 
     BATCH_SIZE: int = 10000
 
-    # Endpoint configurations for data processing
+    # Connections inserting the batches of a page, "insert_writers" per endpoint
+    INSERT_WRITERS: int = 1
+    # SQL Server connections kept open between uses
+    DB_POOL_SIZE: int = 8
+
+    # Bind insert parameters with the type and size of their column
+    TYPED_BINDING: bool = False
+
+    # Size pages and batches from measured latency and memory, "auto_tune" per endpoint
+    AUTO_TUNE: bool = False
+    MEMORY_LIMIT_MB: int = 2048
+
+    # Number of endpoints loaded at the same time
+    MAX_WORKERS: int = 1
+
+    # Pages buffered between the fetch, clean and insert stages, 0 runs them in sequence
+    PIPELINE_DEPTH: int = 0
+
+    # Rows per chunk of the endpoints with "stream": True
+    STREAM_CHUNK_SIZE: int = 20000
+
+    # Parallel file downloads of the endpoints with an "export_endpoint"
+    EXPORT_DOWNLOAD_WORKERS: int = 4
+
+    # Load into <table>_staging and switch it into place, "staging" per endpoint
+    STAGING_LOAD: bool = False
+
+    # Checkpoints older than this are not resumed, keep it below the CronJob interval
+    CHECKPOINT_MAX_AGE_HOURS: int = 5
+
+    # Load every endpoint on its own cadence instead of one pass
+    DAEMON_MODE: bool = False
+    DAEMON_CADENCE_MINUTES: int = 360
+    DAEMON_JITTER_MINUTES: int = 5
+
+    # Prometheus metrics on METRICS_PORT (0 disables it) and/or in METRICS_TEXTFILE
+    METRICS_PORT: int = 0
+    METRICS_TEXTFILE: str = ""
+    METRICS_LINGER_SECONDS: int = 0
+
+    # "capture" keeps the raw API pages in CAPTURE_DIR, "replay" loads them again
+    CAPTURE_MODE: str = ""
+    CAPTURE_DIR: str = "capture"
+    CAPTURE_REPLAY_RUN: str = ""
+    CAPTURE_MAX_MB: int = 20480
+    CAPTURE_MAX_AGE_DAYS: int = 7
+
+    # Where the cleaned pages go: "sqlserver", "parquet" or "sqlserver,parquet"
+    SINKS: str = "sqlserver"
+    PARQUET_DIR: str = "parquet"
+    PARQUET_ROW_GROUP_ROWS: int = 100000
+    PARQUET_COMPRESSION: str = "zstd"
+
+    # Endpoint configurations for data processing, their keys are described in the README
     ENDPOINT_CONFIGS: dict = {
         "device_av_info": {
             "endpoint": "deviceavinfo",
@@ -40,12 +99,16 @@ class Settings(BaseSettings):
             "table_name": "ep_vulnerabilities",
             "pagesize": 8000,
             "total_rows": 261072,
+            "load_method": "openjson",
         },
         "machines": {
             "endpoint": "machines",
             "table_name": "ep_machines",
             "pagesize": 5000,
             "total_rows": 64404,
+            "incremental": {"field": "lastSeen", "key": ["id"]},
+            "cadence_minutes": 60,
+            "priority": 5,
         },
         "device_authenticated_scan_definitions": {
             "endpoint": "DeviceAuthenticatedScanDefinitions",
@@ -76,24 +139,40 @@ class Settings(BaseSettings):
             "table_name": "ep_software_vulnerabilities_by_machine",
             "pagesize": 200000,  # 100000,
             "total_rows": 3500000,
+            "export_endpoint": "machines/SoftwareVulnerabilitiesExport",
+            "stream": True,
+            "load_method": "openjson",
+            # Changes only, with a full snapshot once a week
+            "delta": {
+                "endpoint": "machines/SoftwareVulnerabilitiesChangesByMachine",
+                "key": ["id"],
+                "full_snapshot_hours": 168,
+            },
         },
         "vulnerabilities_by_machine": {
             "endpoint": "vulnerabilities/machinesVulnerabilities",
             "table_name": "ep_vulnerabilities_by_machine",
             "pagesize": 10000,
             "total_rows": 3099710,
+            "load_method": "openjson",
+            # No delta export exists for this endpoint, it stays a full snapshot
+            "cadence_minutes": 720,
+            "priority": -10,
+            "insert_writers": 4,
         },
         "certificate_assessments": {
             "endpoint": "machines/certificateAssessmentByMachine",
             "table_name": "ep_certificate_assessments",
             "pagesize": 100000,
             "total_rows": 5788,
+            "change_detection": {"key": ["deviceId", "thumbprint", "path"]},
         },
         "indicators": {
             "endpoint": "indicators",
             "table_name": "ep_indicators",
             "pagesize": 1000,
             "total_rows": 1745,
+            "incremental": {"field": "lastUpdateTime", "key": ["id"]},
         },
         "info_gathering": {
             "endpoint": "Machines/InfoGatheringExport",
@@ -106,54 +185,79 @@ class Settings(BaseSettings):
             "table_name": "ep_library_files",
             "pagesize": 1000,
             "total_rows": 16,
+            "cadence_minutes": 1440,
         },
         "machine_actions": {
             "endpoint": "machineactions",
             "table_name": "ep_machine_actions",
             "pagesize": 1000,
             "total_rows": 1475,
+            "incremental": {"field": "lastUpdateDateTimeUtc", "key": ["id"]},
+            "cadence_minutes": 30,
+            "priority": 20,
         },
         "exposure_score_by_machine_groups": {
             "endpoint": "exposureScore/ByMachineGroups",
             "table_name": "ep_exposure_score_by_machine_groups",
             "pagesize": 1000,
             "total_rows": 22,
+            "cadence_minutes": 60,
+            "priority": 10,
         },
         "exposure_score": {
             "endpoint": "exposureScore",
             "table_name": "ep_exposure_score",
             "pagesize": 1000,
             "total_rows": 0,
+            "cadence_minutes": 60,
+            "priority": 10,
         },
         "configuration_score": {
             "endpoint": "configurationScore",
             "table_name": "ep_device_secure_score",
             "pagesize": 1000,
             "total_rows": 0,
+            "cadence_minutes": 60,
+            "priority": 10,
         },
         "baseline_compliance_assessment": {
             "endpoint": "machines/baselineComplianceAssessmentByMachine",
             "table_name": "ep_baseline_compliance_assessment",
             "pagesize": 5000,
             "total_rows": 15750,
+            "change_detection": {
+                "key": ["deviceId", "profileId", "configurationId"],
+                "ignore": ["dataCollectionTimeOffset", "complianceCalculationTimeOffset"],
+            },
         },
         "baseline_profiles": {
             "endpoint": "baselineProfiles",
             "table_name": "ep_baseline_profiles",
             "pagesize": 1000,
             "total_rows": 2,
+            "cadence_minutes": 1440,
         },
         "baseline_configurations": {
             "endpoint": "baselineConfigurations",
             "table_name": "ep_baseline_configurations",
             "pagesize": 1000,
             "total_rows": 315,
+            "cadence_minutes": 1440,
         },
         "secure_config_assessment": {
             "endpoint": "machines/SecureConfigurationsAssessmentByMachine",
             "table_name": "ep_secure_config_assessment",
             "pagesize": 200000,  # 100000,
             "total_rows": 4400000,
+            "export_endpoint": "machines/SecureConfigurationsAssessmentExport",
+            "stream": True,
+            "load_method": "openjson",
+            "change_detection": {
+                "key": ["deviceId", "configurationId"],
+                "ignore": ["timestamp"],
+            },
+            "cadence_minutes": 720,
+            "priority": -10,
         },
         "remediation_tasks": {
             "endpoint": "remediationTasks",
@@ -166,12 +270,23 @@ class Settings(BaseSettings):
             "table_name": "ep_non_product_software_inventory",
             "pagesize": 200000,  # 200000,
             "total_rows": 2539196,
+            "export_endpoint": "machines/SoftwareInventoryNoProductCodeExport",
+            "stream": True,
+            "load_method": "openjson",
+            "cadence_minutes": 720,
+            "priority": -10,
+            "insert_writers": 4,
         },
         "software_inventory": {
             "endpoint": "machines/SoftwareInventoryByMachine",
             "table_name": "ep_software_inventory",
             "pagesize": 50000,
             "total_rows": 879345,  # TO: Memery error check
+            "export_endpoint": "machines/SoftwareInventoryExport",
+            "stream": True,
+            "cadence_minutes": 720,
+            "priority": -10,
+            "insert_writers": 4,
         },
         "browser_extensions_permissions": {
             "endpoint": "browserextensions/permissionsinfo",
@@ -184,5 +299,8 @@ class Settings(BaseSettings):
             "table_name": "ep_alerts",
             "pagesize": 5000,
             "total_rows": 49855,
+            "incremental": {"field": "lastUpdateTime", "key": ["id"]},
+            "cadence_minutes": 30,
+            "priority": 20,
         },
     }
@@ -1,8 +1,71 @@
 import pyodbc
 from loguru import logger
-from contextlib import contextmanager
-import pandas as pd
-import gc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from operator import itemgetter
+import json
+import threading
+import time
+from typing import Callable
+
+from change_detection import LOADER_COLUMNS
+from metrics import STAGE_SECONDS
+from sql_types import TypedBinding, json_default
+
+class ConnectionPool:
+    """
+    Open connections handed out by Database.get_connection and taken back
+    when it is done with them, shared by a Database and its clones. Up to
+    max_idle connections are kept between uses, and a connection idle for
+    more than max_idle_seconds is closed instead of reused, since the
+    server or a firewall may have dropped it in the meantime.
+    """
+
+    def __init__(self, connection_string: str, max_idle: int = 8, max_idle_seconds: float = 300):
+        self.connection_string = connection_string
+        self.max_idle = max_idle
+        self.max_idle_seconds = max_idle_seconds
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> pyodbc.Connection:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released = self._idle.pop()
+            if now - released <= self.max_idle_seconds:
+                return conn
+            self._close(conn)
+
+        conn = pyodbc.connect(self.connection_string)
+        conn.autocommit = False
+        return conn
+
+    def release(self, conn: pyodbc.Connection, healthy: bool = True):
+        """
+        Take a connection back, or close it if it failed or the pool is full
+        """
+        if healthy:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append((conn, time.monotonic()))
+                    return
+        self._close(conn)
+
+    def _close(self, conn: pyodbc.Connection):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
 
 class Database:
     def __init__(self, 
@@ -12,6 +75,10 @@ class Database:
         password: str,
         port: int,
         batch_size: int,
+        typed_binding: bool = False,
+        insert_writers: int = 1,
+        pool_size: int = 8,
+        pool: ConnectionPool = None,
     ):
         self.host = host
         self.database = database
@@ -19,9 +86,40 @@ class Database:
         self.password = password
         self.port = port
         self.batch_size = batch_size
+        self.typed_binding = typed_binding
+        # Connections inserting the batches of one save_data call at once
+        self.insert_writers = insert_writers
         self.connection_string = self._build_connection_string()
+        self.pool = pool or ConnectionPool(self.connection_string, max_idle=pool_size)
+
+        # Per-run schema and statement cache, filled when an endpoint starts
+        self.table_columns = {}
+        self.table_column_types = {}
+        self.insert_statements = {}
+        self.typed_bindings = {}
+        self.checked_column_sets = set()
+        # Whether the row locks of a table were kept from escalating, so
+        # parallel writers can share it
+        self.lock_escalation_disabled = {}
+        # Heaps of the extra writers of pages committed in one transaction
+        self.writer_tables = {}
+        # Whether ep_execution_log has the retries column, checked on first use
+        self.execution_log_retries = None
+
+    def clone(self) -> "Database":
+        """Return a new Database with the same settings, one per worker"""
+        return Database(
+            host=self.host,
+            database=self.database,
+            username=self.username,
+            password=self.password,
+            port=self.port,
+            batch_size=self.batch_size,
+            typed_binding=self.typed_binding,
+            insert_writers=self.insert_writers,
+            pool=self.pool,
+        )
 
-    
     def _build_connection_string(self):
         return (
             f"DRIVER={{ODBC Driver 18 for SQL Server}};"
@@ -37,21 +135,27 @@ class Database:
         )
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
+        """
+        Context manager for database connections, borrowed from the pool.
+        Work left uncommitted is rolled back before the connection goes back,
+        and a connection that cannot roll back is closed.
+        """
         conn = None
         try:
-            conn = pyodbc.connect(self.connection_string)
-            conn.autocommit = False
+            conn = self.pool.acquire()
             #logger.info(f"Successfully connected to database {self.database}")
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Database connection error: {e}")
             raise
         finally:
             if conn:
-                conn.close()
+                healthy = True
+                try:
+                    conn.rollback()
+                except pyodbc.Error:
+                    healthy = False
+                self.pool.release(conn, healthy)
 
     def clean_table(self, table_name: str):
         """Clean table with proper connection management"""
@@ -67,6 +171,432 @@ class Database:
                 logger.error(f"Error cleaning table {table_name}: {e}")
                 raise
 
+    def create_staging_table(self, table_name: str, suffix: str = "staging") -> str:
+        """
+        Create an empty heap with the columns of a table to load into
+        """
+        staging_table = f"{table_name}_{suffix}"
+
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"IF OBJECT_ID('{staging_table}', 'U') IS NOT NULL DROP TABLE {staging_table}"
+                )
+                cursor.execute(f"SELECT TOP 0 * INTO {staging_table} FROM {table_name}")
+                conn.commit()
+                logger.info(f"Staging table {staging_table} created")
+            except pyodbc.Error as e:
+                logger.error(f"Error creating staging table {staging_table}: {e}")
+                raise
+
+        return staging_table
+
+    def swap_staging_table(self, table_name: str, staging_table: str):
+        """
+        Replace the rows of a table with the rows of its staging table. The
+        truncate and the switch run in one transaction, so readers see either
+        the previous snapshot or the new one.
+        """
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"TRUNCATE TABLE {table_name}")
+                cursor.execute(f"ALTER TABLE {staging_table} SWITCH TO {table_name}")
+                conn.commit()
+                logger.info(f"Table {table_name} replaced by {staging_table}")
+            except pyodbc.Error as e:
+                conn.rollback()
+                logger.error(f"Error switching {staging_table} into {table_name}: {e}")
+                raise
+
+    def drop_table(self, table_name: str):
+        """Drop a table if it exists"""
+        with self.get_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE {table_name}"
+                )
+                conn.commit()
+                logger.info(f"Table {table_name} dropped")
+            except pyodbc.Error as e:
+                logger.error(f"Error dropping table {table_name}: {e}")
+                raise
+
+    def merge_table(self,
+                    source_table: str,
+                    table_name: str,
+                    key_columns: list,
+                    order_column: str = None,
+                    delete_when: tuple = None):
+        """
+        Upsert the rows of a source table into a table by key. When a key
+        appears more than once in the source, the row with the latest
+        order_column timestamp wins. Keys whose winning source row has the
+        (column, value) given in delete_when are deleted instead, in the
+        same transaction.
+        """
+        with self.get_connection() as conn:
+            columns = self.get_table_columns(conn, table_name)
+            source_columns = set(self.get_table_columns(conn, source_table))
+            columns = [col for col in columns if col in source_columns]
+
+            order_by = (
+                f"TRY_CONVERT(DATETIMEOFFSET, [{order_column}]) DESC"
+                if order_column else "(SELECT NULL)"
+            )
+            partition_by = ",".join(f"[{col}]" for col in key_columns)
+            # Keys may have NULL parts, which "=" never matches
+            on_clause = " AND ".join(
+                f"(target.[{col}] = source.[{col}]"
+                f" OR (target.[{col}] IS NULL AND source.[{col}] IS NULL))"
+                for col in key_columns
+            )
+            update_set = ",".join(
+                f"target.[{col}] = source.[{col}]"
+                for col in columns if col not in key_columns
+            )
+            insert_columns = ",".join(f"[{col}]" for col in columns)
+            insert_values = ",".join(f"source.[{col}]" for col in columns)
+
+            latest_rows = f"""
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY {partition_by} ORDER BY {order_by}) AS row_number
+                    FROM {source_table}
+                ) AS ranked
+                WHERE row_number = 1
+            """
+            upsert_where = ""
+            params = ()
+            if delete_when:
+                status_column, deleted_status = delete_when
+                upsert_where = f"WHERE ISNULL(latest.[{status_column}], '') <> ?"
+                params = (deleted_status,)
+
+            query = f"""
+            MERGE {table_name} WITH (HOLDLOCK) AS target
+            USING (
+                SELECT {insert_columns} FROM ({latest_rows}) AS latest {upsert_where}
+            ) AS source
+            ON {on_clause}
+            WHEN MATCHED THEN UPDATE SET {update_set}
+            WHEN NOT MATCHED BY TARGET THEN INSERT ({insert_columns}) VALUES ({insert_values});
+            """
+
+            try:
+                cursor = conn.cursor()
+                deleted_rows = 0
+                if delete_when:
+                    cursor.execute(f"""
+                    DELETE target FROM {table_name} AS target
+                    JOIN ({latest_rows}) AS source ON {on_clause}
+                    WHERE source.[{status_column}] = ?
+                    """, *params)
+                    deleted_rows = cursor.rowcount
+
+                cursor.execute(query, *params)
+                merged_rows = cursor.rowcount
+                conn.commit()
+                logger.info(
+                    f"Merged {merged_rows} rows from {source_table} into {table_name}"
+                    + (f", deleted {deleted_rows}" if delete_when else "")
+                )
+                return merged_rows
+            except pyodbc.Error as e:
+                conn.rollback()
+                logger.error(f"Error merging {source_table} into {table_name}: {e}")
+                raise
+
+    def get_row_hashes(self, table_name: str) -> dict:
+        """
+        Key and row hashes of a table as of its last change-detected load
+        """
+        query = "SELECT key_hash, row_hash FROM ep_row_hash WHERE table_name = ?"
+        row_hashes = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (table_name,))
+            while rows := cursor.fetchmany(100000):
+                row_hashes.update(rows)
+        return row_hashes
+
+    def clear_row_hashes(self, table_name: str):
+        """
+        Forget the row hashes of a table, its next load writes every row
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM ep_row_hash WHERE table_name = ?", (table_name,))
+            conn.commit()
+
+    def table_has_rows(self, table_name: str) -> bool:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT TOP 1 1 FROM {table_name}")
+            return cursor.fetchone() is not None
+
+    def add_row_key_hash(self, table_name: str) -> bool:
+        """
+        Add the indexed rowKeyHash column that change detection matches rows
+        on to a table created without it. Returns whether it was added, in
+        which case none of the table's rows have a key hash yet.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COL_LENGTH(?, 'rowKeyHash')", (table_name,))
+            if cursor.fetchone()[0] is not None:
+                return False
+            try:
+                cursor.execute(f"ALTER TABLE {table_name} ADD rowKeyHash BIGINT NULL")
+                cursor.execute(
+                    f"CREATE INDEX IX_{table_name}_rowKeyHash ON {table_name} (rowKeyHash)"
+                )
+                conn.commit()
+                logger.info(f"Added rowKeyHash to {table_name}")
+                return True
+            except pyodbc.Error as e:
+                conn.rollback()
+                logger.error(f"Error adding rowKeyHash to {table_name}: {e}")
+                raise
+
+    def apply_row_changes(self,
+                    changes_table: str,
+                    table_name: str,
+                    deleted_key_hashes: list) -> tuple:
+        """
+        Replace the rows of a table whose key hash is in the changes table
+        with the rows of the changes table, delete the rows of the given key
+        hashes and update ep_row_hash to match, in one transaction. Rows are
+        matched on their rowKeyHash column.
+        """
+        with self.get_connection() as conn:
+            change_columns = set(self.get_table_columns(conn, changes_table))
+            columns = [
+                col for col in self.get_table_columns(conn, table_name)
+                if col in change_columns
+            ]
+            insert_columns = ",".join(f"[{col}]" for col in columns)
+            deleted_json = json.dumps(deleted_key_hashes)
+
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                DELETE FROM {table_name}
+                WHERE rowKeyHash IN (SELECT rowKeyHash FROM {changes_table})
+                """)
+                deleted_rows = 0
+                if deleted_key_hashes:
+                    cursor.execute(f"""
+                    DELETE FROM {table_name}
+                    WHERE rowKeyHash IN (SELECT CAST(value AS BIGINT) FROM OPENJSON(?))
+                    """, deleted_json)
+                    deleted_rows = cursor.rowcount
+                    cursor.execute("""
+                    DELETE FROM ep_row_hash
+                    WHERE table_name = ?
+                    AND key_hash IN (SELECT CAST(value AS BIGINT) FROM OPENJSON(?))
+                    """, table_name, deleted_json)
+
+                cursor.execute(f"""
+                INSERT INTO {table_name} ({insert_columns})
+                SELECT {insert_columns} FROM {changes_table}
+                """)
+                written_rows = cursor.rowcount
+
+                cursor.execute(f"""
+                DELETE hashes FROM ep_row_hash AS hashes
+                JOIN {changes_table} AS changes ON hashes.key_hash = changes.rowKeyHash
+                WHERE hashes.table_name = ?
+                """, table_name)
+                cursor.execute(f"""
+                INSERT INTO ep_row_hash (table_name, key_hash, row_hash)
+                SELECT ?, rowKeyHash, rowHash FROM {changes_table}
+                """, table_name)
+                conn.commit()
+                logger.info(
+                    f"Wrote {written_rows} new and changed rows from {changes_table} "
+                    f"into {table_name}, deleted {deleted_rows}"
+                )
+                return written_rows, deleted_rows
+            except pyodbc.Error as e:
+                conn.rollback()
+                logger.error(f"Error applying {changes_table} to {table_name}: {e}")
+                raise
+
+    def add_columns(self, table_name: str, columns: dict):
+        """
+        Add columns, given as name and SQL type, to a table
+        """
+        definitions = ",".join(f"[{name}] {sql_type}" for name, sql_type in columns.items())
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"ALTER TABLE {table_name} ADD {definitions}")
+            conn.commit()
+
+    def get_sync_state(self, table_name: str) -> tuple:
+        """
+        Get the watermark and the time of the last full snapshot of a table
+        """
+        query = "SELECT watermark, full_sync_time FROM ep_sync_watermark WHERE table_name = ?"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (table_name,))
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+
+    def get_max_timestamp(self, table_name: str, column: str) -> str:
+        """
+        Latest ISO 8601 timestamp stored as text in a column, or None
+        """
+        query = f"""
+        SELECT CONVERT(NVARCHAR(50), MAX(TRY_CONVERT(DATETIMEOFFSET, [{column}])), 127)
+        FROM {table_name}
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            return cursor.fetchone()[0]
+
+    def get_watermark(self, table_name: str) -> str:
+        """
+        Get the high-water mark of an incrementally synced table, or None
+        """
+        return self.get_sync_state(table_name)[0]
+
+    def set_watermark(self, table_name: str, watermark: str, full_sync: bool = False):
+        """
+        Save the high-water mark of an incrementally synced table, and the
+        time of the full snapshot when the table was loaded in full
+        """
+        if watermark is None:
+            return
+
+        query = """
+        MERGE ep_sync_watermark WITH (HOLDLOCK) AS target
+        USING (SELECT ? AS table_name, ? AS watermark, ? AS full_sync) AS source
+        ON target.table_name = source.table_name
+        WHEN MATCHED THEN UPDATE SET
+            watermark = source.watermark,
+            full_sync_time = CASE WHEN source.full_sync = 1 THEN GETUTCDATE() ELSE target.full_sync_time END,
+            updated_at = GETDATE()
+        WHEN NOT MATCHED THEN INSERT (table_name, watermark, full_sync_time)
+            VALUES (source.table_name, source.watermark, CASE WHEN source.full_sync = 1 THEN GETUTCDATE() END);
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (table_name, watermark, 1 if full_sync else 0))
+            conn.commit()
+            logger.info(f"Watermark of {table_name} set to {watermark}")
+
+    def table_exists(self, table_name: str) -> bool:
+        """Check whether a table exists"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT OBJECT_ID(?, 'U')", (table_name,))
+            return cursor.fetchone()[0] is not None
+
+    def get_checkpoint(self, table_name: str) -> dict:
+        """
+        Get the checkpoint of an endpoint in the current run, or None
+        """
+        query = """
+        SELECT target_table, status, resume_url, skip_rows, rows_committed
+        FROM ep_checkpoint WHERE table_name = ?
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (table_name,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return {
+                "target_table": row[0],
+                "status": row[1],
+                "resume_url": row[2],
+                "skip_rows": row[3],
+                "rows_committed": row[4],
+            }
+
+    def _set_checkpoint_status(self, table_name: str, target_table: str, status: str):
+        query = """
+        MERGE ep_checkpoint WITH (HOLDLOCK) AS target
+        USING (SELECT ? AS table_name, ? AS target_table, ? AS status) AS source
+        ON target.table_name = source.table_name
+        WHEN MATCHED THEN UPDATE SET
+            target_table = source.target_table,
+            status = source.status,
+            resume_url = NULL,
+            skip_rows = 0,
+            rows_committed = 0,
+            updated_at = GETDATE()
+        WHEN NOT MATCHED THEN INSERT (table_name, target_table, status)
+            VALUES (source.table_name, source.target_table, source.status);
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (table_name, target_table, status))
+            conn.commit()
+
+    def start_checkpoint(self, table_name: str, target_table: str):
+        """
+        Mark an endpoint as loading into target_table from its first page
+        """
+        self._set_checkpoint_status(table_name, target_table, "IN_PROGRESS")
+
+    def finish_checkpoint(self, table_name: str):
+        """
+        Mark an endpoint as loaded, a restart of the run skips it
+        """
+        self._set_checkpoint_status(table_name, table_name, "DONE")
+        logger.info(f"Checkpoint of {table_name} marked as done")
+
+    def save_checkpoint(self,
+        conn,
+        table_name: str,
+        resume_url: str,
+        skip_rows: int,
+        rows_committed: int,
+    ):
+        """
+        Save the position after a page of an endpoint and commit it in one
+        transaction with the page's rows, on the connection that wrote them
+        """
+        query = """
+        UPDATE ep_checkpoint
+        SET resume_url = ?, skip_rows = ?, rows_committed = ?, updated_at = GETDATE()
+        WHERE table_name = ?
+        """
+        cursor = conn.cursor()
+        cursor.execute(query, (resume_url, skip_rows, rows_committed, table_name))
+        commit_start = time.perf_counter()
+        conn.commit()
+        STAGE_SECONDS.observe(
+            table_name, "commit", value=time.perf_counter() - commit_start
+        )
+        logger.debug(f"Checkpoint of {table_name} at {rows_committed:,} rows")
+
+    def clear_checkpoints(self, older_than_hours: int = None, table_name: str = None):
+        """
+        Delete the checkpoints of every endpoint, or only the ones not updated
+        in the last older_than_hours, or only the one of table_name
+        """
+        query = "DELETE FROM ep_checkpoint"
+        params = ()
+        if older_than_hours is not None:
+            query += " WHERE updated_at < DATEADD(HOUR, -?, GETDATE())"
+            params = (older_than_hours,)
+        elif table_name is not None:
+            query += " WHERE table_name = ?"
+            params = (table_name,)
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, *params)
+            conn.commit()
+            if cursor.rowcount > 0:
+                logger.info(f"Cleared {cursor.rowcount} checkpoints")
+
     def get_table_columns(self, 
                     conn: pyodbc.Connection, 
                     table_name: str) -> list:
@@ -90,121 +620,565 @@ class Database:
             logger.error(f"Error getting columns for table {table_name}: {e}")
             return []
         
-    def save_data(self, 
-                data: dict, 
-                endpoint_config: dict,
-                conn: pyodbc.Connection):
+    def get_table_column_types(self,
+                    conn: pyodbc.Connection,
+                    table_name: str) -> dict:
         """
-        Save the data into the database 
+        Get the SQL type of every column of a table, as used in a column definition
+        """
+
+        query = """
+        SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = ?
+        ORDER BY ORDINAL_POSITION
         """
 
-        table_name = endpoint_config['table_name']
+        column_types = {}
+        cursor = conn.cursor()
+        cursor.execute(query, (table_name,))
+        for name, data_type, max_length, precision, scale in cursor.fetchall():
+            data_type = data_type.upper()
+            if data_type in ("NTEXT", "TEXT"):
+                # OPENJSON cannot return the deprecated LOB types
+                column_types[name] = "NVARCHAR(MAX)"
+            elif max_length is not None:
+                length = "MAX" if max_length == -1 else max_length
+                column_types[name] = f"{data_type}({length})"
+            elif data_type in ("DECIMAL", "NUMERIC"):
+                column_types[name] = f"{data_type}({precision},{scale})"
+            else:
+                column_types[name] = data_type
+        return column_types
 
-        # Get columns from database
+    def prepare_table(self,
+                    conn: pyodbc.Connection,
+                    table_name: str) -> list:
+        """
+        Load the columns of a table into the schema cache
+        """
         columns_db = self.get_table_columns(conn, table_name)
+        self.table_columns[table_name] = columns_db
+        return columns_db
 
-        # If you convert to DataFrame first
-        df = pd.DataFrame(data)  
+    def invalidate_table(self, table_name: str):
+        """
+        Drop the cached columns and statements of a table
+        """
+        self.table_columns.pop(table_name, None)
+        self.table_column_types.pop(table_name, None)
+        self.insert_statements = {
+            key: query for key, query in self.insert_statements.items()
+            if key[0] != table_name
+        }
+        self.typed_bindings = {
+            key: binding for key, binding in self.typed_bindings.items()
+            if key[0] != table_name
+        }
+        self.checked_column_sets = {
+            key for key in self.checked_column_sets if key[0] != table_name
+        }
+        self.lock_escalation_disabled.pop(table_name, None)
 
-        # Free memory
-        del data
-        gc.collect()
+    def get_cached_column_types(self,
+                    conn: pyodbc.Connection,
+                    table_name: str) -> dict:
+        """
+        Column types of a table from the schema cache, loading them on first use
+        """
+        column_types = self.table_column_types.get(table_name)
+        if column_types is None:
+            column_types = self.get_table_column_types(conn, table_name)
+            self.table_column_types[table_name] = column_types
+        return column_types
 
-        # Check which columns exist in both dataframe and database
-        available_df_columns = df.columns.tolist()
-        valid_columns = [col for col in columns_db if col in available_df_columns]
-        
-        # Validate database table and data api exctracted have same columns
-        if len(columns_db) != len(available_df_columns):
-            logger.info(f"{columns_db=}")
-            logger.info(f"Available_df_columns: {available_df_columns}")
-            logger.info(f"Valid_columns       : {valid_columns}")
-            logger.error(f"Database table and data api have different number of columns, it was fixed...")
+    def get_typed_binding(self,
+                    conn: pyodbc.Connection,
+                    table_name: str,
+                    columns: list) -> TypedBinding:
+        """
+        Parameter types and value conversions for inserting the given columns
+        into a table, built once per table and column list
+        """
+        key = (table_name, tuple(columns))
+        binding = self.typed_bindings.get(key)
+        if binding is None:
+            column_types = self.get_cached_column_types(conn, table_name)
+            binding = TypedBinding(column_types, columns)
+            self.typed_bindings[key] = binding
+        return binding
 
-        df = df[valid_columns]  # This will only keep the specified columns
+    def get_insert_statement(self, table_name: str, columns: list) -> str:
+        """
+        Build the INSERT statement for a table and column list once and reuse it
+        """
+        key = (table_name, tuple(columns))
+        query = self.insert_statements.get(key)
+        if query is None:
+            #Creating place holders
+            insert_columns = f"({','.join(f'[{col}]' for col in columns)})"
+            place_holders = f"({','.join('?' for col in columns)})"
 
+            query = f"""
+            INSERT INTO {table_name} {insert_columns}
+            VALUES {place_holders}
+            """
+            self.insert_statements[key] = query
+        return query
 
+    def get_openjson_statement(self,
+                    conn: pyodbc.Connection,
+                    table_name: str,
+                    columns: list,
+                    tablock: bool = True) -> str:
+        """
+        Build the bulk INSERT statement for a table and column list. The batch
+        is sent as one JSON array of row arrays and shredded by OPENJSON on the
+        server, and TABLOCK lets SQL Server minimally log the insert into the heap.
+        Parallel writers go without it, its exclusive lock would serialize them.
+        """
+        key = (table_name, tuple(columns), "openjson" if tablock else "openjson-shared")
+        query = self.insert_statements.get(key)
+        if query is None:
+            column_types = self.get_cached_column_types(conn, table_name)
 
-        total_rows = len(df)
-        for i in range(0, total_rows, self.batch_size):
+            insert_columns = ",".join(f"[{col}]" for col in columns)
+            json_columns = ",".join(
+                f"[{col}] {column_types[col]} '$[{position}]'"
+                for position, col in enumerate(columns)
+            )
 
-            # Initialize batch start and end for each iteration
-            batch_end = min(i + self.batch_size, total_rows)
+            hint = "WITH (TABLOCK) " if tablock else ""
+            query = f"""
+            INSERT INTO {table_name} {hint}({insert_columns})
+            SELECT {insert_columns}
+            FROM OPENJSON(?) WITH ({json_columns})
+            """
+            self.insert_statements[key] = query
+        return query
 
-            # Create batch to insert into the database
-            batch = df[i:batch_end]
+    def get_load_statement(self,
+                    conn: pyodbc.Connection,
+                    table_name: str,
+                    columns: list,
+                    load_method: str,
+                    tablock: bool = True) -> str:
+        """
+        The statement inserting a batch into a table with a load method
+        """
+        if load_method == "openjson":
+            return self.get_openjson_statement(conn, table_name, columns, tablock)
+        return self.get_insert_statement(table_name, columns)
 
-            # Convert to records with memory optimization
-            # Use itertuples instead of to_records for better memory efficiency
-            data_as_tuples = [tuple(row[1:]) for row in batch.itertuples()]
+    def get_row_projector(self, columns: list) -> Callable[[dict], tuple]:
+        """
+        Return a function turning a cleaned row into a parameter tuple in
+        the given column order, missing keys become None
+        """
+        getter = itemgetter(*columns)
+        single = len(columns) == 1
 
+        def project(row: dict) -> tuple:
+            try:
+                values = getter(row)
+            except KeyError:
+                return tuple(row.get(col) for col in columns)
+            return (values,) if single else values
 
-            #Creating place holders
-            insert_columns = f"({','.join(valid_columns)})"
-            place_holders= f"({','.join( '?' for col in valid_columns)})"
+        return project
 
-            # Create query (removed extra quote)
-            query = f"""
-            INSERT INTO {table_name} {insert_columns} 
-            VALUES {place_holders}
-            """
+    def save_data(self,
+                data: list[dict],
+                endpoint_config: dict,
+                conn: pyodbc.Connection,
+                table_name: str = None,
+                batch_size: int = None,
+                commit: bool = True):
+        """
+        Save the data into the database, in the endpoint's table unless
+        another table is given, in batches of batch_size rows (the endpoint's
+        "batch_size" or BATCH_SIZE by default). Without commit the rows on
+        the given connection are left for the caller to commit.
+        """
 
-            # Initialize variables 
-            cursor = conn.cursor()
-            cursor.fast_executemany = True
+        table_name = table_name or endpoint_config['table_name']
+        batch_size = batch_size or endpoint_config.get("batch_size", self.batch_size)
+
+        if not data:
+            return True
+
+        # Check which columns exist in both the api data and the database
+        available_columns = set().union(*data)
+
+        # Get columns from the schema cache, loading them on first use
+        columns_db = self.table_columns.get(table_name)
+        if columns_db is None:
+            columns_db = self.prepare_table(conn, table_name)
 
+        # Validate database table and data api exctracted have same columns,
+        # apart from the loader's own columns the rows do not carry
+        api_columns = [
+            col for col in columns_db
+            if col in available_columns or col not in LOADER_COLUMNS
+        ]
+        if len(api_columns) != len(available_columns):
+            column_set = (table_name, frozenset(available_columns))
+            if column_set not in self.checked_column_sets:
+                # The table may have changed since it was cached, read it again
+                # once per new set of api columns
+                columns_db = self.prepare_table(conn, table_name)
+                self.checked_column_sets.add(column_set)
+
+                valid_columns = [col for col in columns_db if col in available_columns]
+                logger.info(f"{columns_db=}")
+                logger.info(f"Available_columns: {sorted(available_columns)}")
+                logger.info(f"Valid_columns    : {valid_columns}")
+                logger.error(f"Database table and data api have different number of columns, it was fixed...")
+
+        valid_columns = [col for col in columns_db if col in available_columns]
+        if not valid_columns:
+            logger.error(f"No api columns match the table {table_name}")
+            return False
+
+        # "executemany" sends parameterised INSERT batches, "openjson" sends each
+        # batch as a single JSON parameter for a bulk INSERT ... SELECT
+        load_method = endpoint_config.get("load_method", "executemany")
+        total_rows = len(data)
+        writers = min(
+            endpoint_config.get("insert_writers", self.insert_writers),
+            -(-total_rows // batch_size),
+        )
+        if writers > 1 and not self.disable_lock_escalation(table_name):
+            writers = 1
+        query = self.get_load_statement(
+            conn, table_name, valid_columns, load_method, tablock=writers <= 1
+        )
+        project = self.get_row_projector(valid_columns)
+
+        # Bind every parameter as its column's type and size instead of
+        # letting the driver guess one from the first row of each batch
+        binding = None
+        if self.typed_binding:
+            binding = self.get_typed_binding(conn, table_name, valid_columns)
+
+        start_time = time.perf_counter()
+        if writers > 1:
+            saved = self.save_batches_parallel(
+                data, endpoint_config, conn, table_name, batch_size, writers,
+                query, load_method, project, binding, commit, valid_columns,
+            )
+            if not saved:
+                return False
+        else:
+            # Initialize variables
+            cursor = self.get_insert_cursor(conn, load_method, binding)
+            for i in range(0, total_rows, batch_size):
+                rows = data[i:i + batch_size]
+                try:
+                    self.insert_batch(cursor, query, load_method, project, binding, rows)
+
+                    if commit:
+                        commit_start = time.perf_counter()
+                        conn.commit()
+                        STAGE_SECONDS.observe(
+                            endpoint_config['table_name'], "commit",
+                            value=time.perf_counter() - commit_start,
+                        )
+
+                except Exception as e:
+                    self.log_insert_error(e, table_name, len(rows), query)
+                    if not commit:
+                        self.rollback_all([conn])
+                    return False
+
+        seconds = time.perf_counter() - start_time
+        logger.debug(
+            f"Inserted {total_rows:,} rows into {table_name} with {load_method} "
+            f"in {seconds:.2f}s ({total_rows / max(seconds, 1e-9):,.0f} rows/s"
+            + (f", {writers} writers)" if writers > 1 else ")")
+        )
+        return True
+
+    def disable_lock_escalation(self, table_name: str) -> bool:
+        """
+        Keep the row locks of parallel writers on a table from escalating to a
+        table lock, which would block the other writers until a commit that
+        waits for them. Returns False if the table could not be altered.
+        """
+        disabled = self.lock_escalation_disabled.get(table_name)
+        if disabled is not None:
+            return disabled
+
+        disabled = True
+        with self.get_connection() as conn:
             try:
-                cursor.executemany(query, data_as_tuples)
-                conn.commit()
-                # Clean up
-                del data_as_tuples
-                gc.collect()
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT lock_escalation_desc FROM sys.tables WHERE object_id = OBJECT_ID(?)",
+                    (table_name,),
+                )
+                row = cursor.fetchone()
+                if row is None or row[0] != "DISABLE":
+                    cursor.execute(f"ALTER TABLE {table_name} SET (LOCK_ESCALATION = DISABLE)")
+                    conn.commit()
+                    logger.info(f"Disabled lock escalation on {table_name}")
+            except pyodbc.Error as e:
+                logger.warning(
+                    f"Could not disable lock escalation on {table_name}, inserting "
+                    f"into it with a single writer: {e}"
+                )
+                disabled = False
 
-            except Exception as e:
-                logger.error(f"Error loading data into the database, table_name: {table_name}, n_rows= {len(data_as_tuples)}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error message: {str(e)}")
-                logger.error(f"Query: {query}")
-                
-                # Try to get more specific error information
-                if hasattr(e, 'args') and e.args:
-                    logger.error(f"Error args: {e.args}")
-                
+        self.lock_escalation_disabled[table_name] = disabled
+        return disabled
+
+    def get_insert_cursor(self,
+                    conn: pyodbc.Connection,
+                    load_method: str,
+                    binding: TypedBinding = None) -> pyodbc.Cursor:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        if binding is not None and load_method != "openjson" and binding.input_sizes is not None:
+            cursor.setinputsizes(binding.input_sizes)
+        return cursor
+
+    def insert_batch(self,
+                    cursor: pyodbc.Cursor,
+                    query: str,
+                    load_method: str,
+                    project: Callable[[dict], tuple],
+                    binding: TypedBinding,
+                    rows: list[dict]):
+        """
+        Send one batch of cleaned rows, without committing it
+        """
+        # Project the rows of the batch straight into parameter tuples
+        data_as_tuples = [project(row) for row in rows]
+        if binding is not None:
+            data_as_tuples = [binding.convert(values) for values in data_as_tuples]
+
+        if load_method == "openjson":
+            cursor.execute(
+                query,
+                json.dumps(
+                    data_as_tuples,
+                    ensure_ascii=False,
+                    allow_nan=False,
+                    default=json_default,
+                ),
+            )
+        else:
+            cursor.executemany(query, data_as_tuples)
+
+    def save_batches_parallel(self,
+                    data: list[dict],
+                    endpoint_config: dict,
+                    conn: pyodbc.Connection,
+                    table_name: str,
+                    batch_size: int,
+                    writers: int,
+                    query: str,
+                    load_method: str,
+                    project: Callable[[dict], tuple],
+                    binding: TypedBinding = None,
+                    commit: bool = True,
+                    columns: list = None) -> bool:
+        """
+        Insert the batches of data from the given connection and writers - 1
+        more from the pool at once. Every writer rolls back if one fails,
+        otherwise all commit once done, the given one only with commit.
+        """
+        batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        failed = threading.Event()
+
+        # Without commit the other writers fill heaps of their own, so the
+        # whole page reaches the table in the transaction of the given one
+        writer_tables = [None] * writers
+        queries = [query] * writers
+        if not commit:
+            writer_tables[1:] = self.get_writer_tables(table_name, writers - 1)
+            queries[1:] = [
+                self.get_load_statement(conn, writer_table, columns, load_method)
+                for writer_table in writer_tables[1:]
+            ]
+
+        def write(
+            writer_conn: pyodbc.Connection,
+            writer_batches: list,
+            writer_table: str,
+            writer_query: str,
+        ) -> bool:
+            cursor = self.get_insert_cursor(writer_conn, load_method, binding)
+            if writer_table is not None:
+                # Rows of an earlier page whose copy did not commit
+                cursor.execute(f"TRUNCATE TABLE {writer_table}")
+            for rows in writer_batches:
+                if failed.is_set():
+                    return False
+                try:
+                    self.insert_batch(cursor, writer_query, load_method, project, binding, rows)
+                except Exception as e:
+                    failed.set()
+                    self.log_insert_error(e, table_name, len(rows), writer_query)
+                    return False
+            return True
+
+        with ExitStack() as stack:
+            connections = [conn] + [
+                stack.enter_context(self.get_connection()) for _ in range(writers - 1)
+            ]
+            with ThreadPoolExecutor(
+                max_workers=writers, thread_name_prefix="writer"
+            ) as executor:
+                results = list(executor.map(
+                    write,
+                    connections,
+                    [batches[index::writers] for index in range(writers)],
+                    writer_tables,
+                    queries,
+                ))
+
+            if not all(results):
+                self.rollback_all(connections)
+                logger.error(
+                    f"Rolled back the {len(data):,} rows of the {writers} writers of {table_name}"
+                )
                 return False
 
-#       logger.info(f"Successfully processed all {total_processed:,} rows for {table_name}")
+            commit_start = time.perf_counter()
+            committed = 0
+            try:
+                for writer_conn in connections if commit else connections[1:]:
+                    writer_conn.commit()
+                    committed += 1
+            except pyodbc.Error as e:
+                logger.error(
+                    f"Error committing writer {committed + 1} of {writers} for {table_name}, "
+                    f"{committed} writers had committed: {e}"
+                )
+                self.rollback_all(connections[committed:])
+                return False
+            STAGE_SECONDS.observe(
+                endpoint_config['table_name'], "commit",
+                value=time.perf_counter() - commit_start,
+            )
+
+        if not commit:
+            insert_columns = ",".join(f"[{col}]" for col in columns)
+            try:
+                cursor = conn.cursor()
+                for writer_table in writer_tables[1:]:
+                    cursor.execute(f"""
+                    INSERT INTO {table_name} ({insert_columns})
+                    SELECT {insert_columns} FROM {writer_table}
+                    """)
+            except pyodbc.Error as e:
+                self.rollback_all([conn])
+                logger.error(f"Error copying the rows of the writers into {table_name}: {e}")
+                return False
         return True
 
+    def get_writer_tables(self, table_name: str, count: int) -> list:
+        """
+        Heaps shaped like a table for count writers, created on first use in a load
+        """
+        writer_tables = self.writer_tables.setdefault(table_name, [])
+        while len(writer_tables) < count:
+            writer_tables.append(
+                self.create_staging_table(table_name, f"writer{len(writer_tables) + 1}")
+            )
+        return writer_tables[:count]
+
+    def drop_writer_tables(self, table_name: str):
+        """
+        Drop the heaps of the writers of a table, once its load is done
+        """
+        for writer_table in self.writer_tables.pop(table_name, []):
+            self.drop_table(writer_table)
+
+    def rollback_all(self, connections: list):
+        """
+        Roll back every connection, even if some of them are broken
+        """
+        for conn in connections:
+            try:
+                conn.rollback()
+            except pyodbc.Error as e:
+                logger.error(f"Error rolling back a writer connection: {e}")
+
+    def log_insert_error(self, e: Exception, table_name: str, n_rows: int, query: str):
+        logger.error(f"Error loading data into the database, table_name: {table_name}, n_rows= {n_rows}")
+        logger.error(f"Error type: {type(e).__name__}")
+        logger.error(f"Error message: {str(e)}")
+        logger.error(f"Query: {query}")
+
+        # Try to get more specific error information
+        if hasattr(e, 'args') and e.args:
+            logger.error(f"Error args: {e.args}")
+
 
 
+    def has_execution_log_retries(self, conn: pyodbc.Connection) -> bool:
+        """
+        Add the retries column to an ep_execution_log created before it had
+        one. Returns False if the column is missing and could not be added.
+        """
+        if self.execution_log_retries is None:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                IF COL_LENGTH('ep_execution_log', 'retries') IS NULL
+                    ALTER TABLE ep_execution_log ADD retries INT NOT NULL DEFAULT 0
+                """)
+                conn.commit()
+                self.execution_log_retries = True
+            except pyodbc.Error as e:
+                conn.rollback()
+                logger.warning(
+                    f"Could not add the retries column to ep_execution_log, "
+                    f"logging runs without it: {e}"
+                )
+                self.execution_log_retries = False
+        return self.execution_log_retries
+
     def log_status_process(self,
                            table_name: str,
                            start_time_endpoint: str,
                            end_time_endpoint: str, 
                            status: str, 
                            total_rows: int,
+                           retries: int = 0,
                            ) -> bool:
 
         """
         Save status process in a database table called ep_execution_log
         """
 
-        # Create query - removed extra quote and adjusted parameters
-        query = """
-            INSERT INTO ep_execution_log (table_name, start_time_endpoint, end_time_endpoint, status, total_rows)
-            VALUES (?, ?, ?, ?, ?)
-            """
         with self.get_connection() as conn:
+            # Create query - removed extra quote and adjusted parameters
+            params = (table_name, start_time_endpoint, end_time_endpoint, status, total_rows)
+            if self.has_execution_log_retries(conn):
+                query = """
+                    INSERT INTO ep_execution_log (table_name, start_time_endpoint, end_time_endpoint, status, total_rows, retries)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """
+                params += (retries,)
+            else:
+                query = """
+                    INSERT INTO ep_execution_log (table_name, start_time_endpoint, end_time_endpoint, status, total_rows)
+                    VALUES (?, ?, ?, ?, ?)
+                    """
+
             # Initialize variables
             cursor = conn.cursor()
 
             try:
-                logger.info(f"Saving process status in the table ep_execution_log with values: {table_name}, {start_time_endpoint}, {end_time_endpoint}, {status}, {total_rows}")
-                cursor.execute(query, (table_name, start_time_endpoint, end_time_endpoint, status, total_rows))
+                logger.info(f"Saving process status in the table ep_execution_log with values: {table_name}, {start_time_endpoint}, {end_time_endpoint}, {status}, {total_rows}, {retries}")
+                cursor.execute(query, params)
                 conn.commit()   
                 return True
             
             except Exception as e:
                 logger.error(f"Error logging status process in the database table {table_name}")
                 logger.error(f"error = {e}")
-                return False
\ No newline at end of file
+                return False
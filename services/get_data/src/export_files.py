@@ -0,0 +1,147 @@
+import gzip
+import io
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+import requests
+from loguru import logger
+
+# Put by a download worker after the last chunk of its file
+_FILE_DONE = object()
+
+
+def column_renamer(columns: list) -> Callable[[dict], dict]:
+    """
+    Return a function giving the keys of a row the names of the columns they
+    match case-insensitively, the export files do not use the API's casing
+    """
+    by_lower = {col.lower(): col for col in columns}
+    names = {}
+
+    def rename(row: dict) -> dict:
+        try:
+            return {names[key]: value for key, value in row.items()}
+        except KeyError:
+            for key in row:
+                if key not in names:
+                    names[key] = by_lower.get(key.lower(), key)
+            return {names[key]: value for key, value in row.items()}
+
+    return rename
+
+
+class _DownloadError:
+    def __init__(self, url: str, error: Exception):
+        self.url = url
+        self.error = error
+
+
+class ExportFileReader:
+    """
+    Download the gzip JSON-lines files of an MDE "via files" export in
+    parallel and yield their rows in chunks. The files are decompressed and
+    decoded while they download, and at most `queue_depth` chunks wait for
+    the consumer, so memory does not depend on the file sizes. Given the
+    columns of a table, the fields of every row are named after them.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        chunk_size: int = 20000,
+        queue_depth: int = 4,
+        timeout: int = 300,
+        columns: list = None,
+    ):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.rename = column_renamer(columns) if columns else None
+
+    def _put(self, chunks: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _download(self, url: str, chunks: queue.Queue, stop: threading.Event):
+        """
+        Stream one file into the chunk queue
+        """
+        try:
+            # SAS urls carry their own authorization, no bearer token is sent
+            with requests.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                # Let gzip see the compressed bytes even if a Content-Encoding is set
+                response.raw.decode_content = False
+
+                lines = io.TextIOWrapper(
+                    gzip.GzipFile(fileobj=response.raw), encoding="utf-8"
+                )
+                chunk = []
+                for line in lines:
+                    if stop.is_set():
+                        return
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    chunk.append(self.rename(row) if self.rename else row)
+                    if len(chunk) >= self.chunk_size:
+                        if not self._put(chunks, chunk, stop):
+                            return
+                        chunk = []
+
+                if chunk:
+                    self._put(chunks, chunk, stop)
+            self._put(chunks, _FILE_DONE, stop)
+
+        except Exception as e:
+            self._put(chunks, _DownloadError(url, e), stop)
+
+    def iter_chunks(self, urls: list) -> Iterator[list]:
+        """
+        Yield the rows of every file in chunks, in no particular file order
+        """
+        if not urls:
+            return
+
+        chunks = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        remaining = len(urls)
+
+        logger.info(
+            f"Downloading {len(urls)} export files with {self.max_workers} workers"
+        )
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="export-download"
+        )
+        try:
+            for url in urls:
+                executor.submit(self._download, url, chunks, stop)
+
+            while remaining:
+                item = chunks.get()
+                if item is _FILE_DONE:
+                    remaining -= 1
+                elif isinstance(item, _DownloadError):
+                    # Keep the url out of the message and the traceback, its
+                    # SAS token grants access to the file
+                    message = f"Export file download failed: {type(item.error).__name__}"
+                    if isinstance(item.error, requests.HTTPError):
+                        message += f" (HTTP {item.error.response.status_code})"
+                    raise RuntimeError(message) from None
+                else:
+                    yield item
+        finally:
+            # Stop the other downloads if the consumer gave up early, and
+            # drop the ones that did not start yet
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,147 @@
+import codecs
+import json
+import re
+import time
+from typing import Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Drop consumed text from the buffer once this many characters were read
+_TRIM_THRESHOLD = 1 << 20
+
+
+class TruncatedStreamError(ValueError):
+    """
+    The stream ended before the JSON object did, e.g. a body cut short
+    """
+
+
+class StreamingPageDecoder:
+    """
+    Decode a JSON object from a stream of bytes, yielding the items of one
+    array key in lists of `chunk_size`. Every other top-level key is kept in
+    `fields`, so peak memory depends on the chunk size and not on the page size.
+    Time spent waiting for the stream is kept in `read_seconds`.
+    """
+
+    def __init__(
+        self,
+        byte_chunks: Iterable[bytes],
+        array_key: str = "value",
+        chunk_size: int = 10000,
+    ):
+        self.byte_chunks = iter(byte_chunks)
+        self.array_key = array_key
+        self.chunk_size = chunk_size
+        self.fields = {}
+        self.found_array = False
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _read_more(self) -> bool:
+        """
+        Append the next block of the stream to the buffer
+        """
+        if self._exhausted:
+            return False
+
+        if self._pos > _TRIM_THRESHOLD:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+
+        start = time.perf_counter()
+        for block in self.byte_chunks:
+            if not block:
+                continue
+            self.read_seconds += time.perf_counter() - start
+            self.bytes_read += len(block)
+            self._buffer += self._text_decoder.decode(block)
+            return True
+        self.read_seconds += time.perf_counter() - start
+
+        try:
+            self._buffer += self._text_decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise TruncatedStreamError("JSON stream ends inside a character") from e
+        self._exhausted = True
+        return False
+
+    def _peek(self) -> str:
+        """
+        Skip whitespace and return the next character without consuming it
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                raise TruncatedStreamError("Unexpected end of JSON stream")
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(
+                f"Expected {char!r} at position {self._pos} of JSON stream"
+            )
+        self._pos += 1
+
+    def _decode_value(self):
+        """
+        Decode the next complete JSON value. A value that ends exactly at the
+        end of the buffer may be a truncated number, so more is read first.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                if end < len(self._buffer) or self._exhausted:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._exhausted:
+                    raise
+            self._read_more()
+
+    def __iter__(self) -> Iterator[list]:
+        self._expect("{")
+
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                return
+            if char == ",":
+                self._pos += 1
+                continue
+
+            key = self._decode_value()
+            self._expect(":")
+
+            if key != self.array_key or self._peek() != "[":
+                self.fields[key] = self._decode_value()
+                continue
+
+            self.found_array = True
+            self._pos += 1
+            chunk = []
+            while True:
+                char = self._peek()
+                if char == "]":
+                    self._pos += 1
+                    break
+                if char == ",":
+                    self._pos += 1
+                    continue
+
+                chunk.append(self._decode_value())
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+
+            if chunk:
+                yield chunk
@@ -1,87 +1,709 @@
-from datetime import datetime
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Tuple
 
 from api import API
+from capture import DELTA, INCREMENTAL, RESUMED, SNAPSHOT, CaptureCache
+from change_detection import ROW_HASH_COLUMNS, ChangeDetector
 from config import Settings
 from database import Database
 from loguru import logger
+from metrics import ENDPOINT_LAST_RUN, ENDPOINT_SECONDS, ENDPOINT_SUCCESS, REGISTRY
+from rate_limiter import RateLimiter
+from retry import RetryPolicy
+from scheduler import Scheduler
+from sinks import ParquetSink
 
+# Columns of a delta export row that are not in the table
+DELTA_COLUMNS = {"status": "NVARCHAR(50)", "eventTimestamp": "NVARCHAR(255)"}
+DELTA_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
-def main(
+
+def begin_capture(
+    api: API, endpoint_config: dict, load: str, since: str = None, query_params: dict = None
+):
+    """
+    Record how the next pages of an endpoint are requested, when capturing
+    """
+    if api.capture is not None and api.capture.capturing:
+        api.capture.begin_load(endpoint_config, load, since, query_params)
+
+
+def end_capture(api: API, endpoint_config: dict):
+    """
+    Mark the load of an endpoint as done, when capturing
+    """
+    if api.capture is not None and api.capture.capturing:
+        api.capture.end_load(endpoint_config)
+
+
+def replaying(api: API) -> bool:
+    return api.capture is not None and api.capture.replaying
+
+
+def earliest(*timestamps: str) -> str:
+    """
+    The earliest of some ISO 8601 timestamps, ignoring the missing ones
+    """
+
+    def moment(timestamp: str) -> datetime:
+        parsed = datetime.fromisoformat(timestamp)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    return min(filter(None, timestamps), key=moment, default=None)
+
+
+def load_snapshot(
     api: API,
     db: Database,
-    endpoint_configs: dict,
-):
-    # 2. Iterate over the endpoint configs and get the data
-    for endpoint_name, endpoint_config in endpoint_configs.items():
-        table_name = endpoint_config["table_name"]
+    endpoint_config: dict,
+    staging: bool,
+    retry: RetryPolicy = None,
+) -> Tuple[bool, int]:
+    """
+    Replace the whole table with a fresh download of the endpoint. A load cut
+    short earlier in the run continues from its last committed page.
+    """
+    table_name = endpoint_config["table_name"]
 
-        # Record start time for logs
-        start_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-            :-3
-        ]  # Format: 2025-05-29 04:34:31.457
+    # Resume only into the table the interrupted load was writing to.
+    # Replayed pages have no position, a replay always loads all of them
+    resume = db.get_checkpoint(table_name)
+    if (
+        resume is None
+        or replaying(api)
+        or resume["status"] != "IN_PROGRESS"
+        or not resume["resume_url"]
+        or (resume["target_table"] != table_name) != staging
+        or not db.table_exists(resume["target_table"])
+    ):
+        resume = None
+    else:
+        logger.info(
+            f"Resuming {table_name} after {resume['rows_committed']:,} committed rows"
+        )
+    begin_capture(api, endpoint_config, SNAPSHOT if resume is None else RESUMED)
 
-        try:
+    if not staging:
+        if resume is None:
             # 2.1 Clean the table in the database
             db.clean_table(table_name)
+            db.start_checkpoint(table_name, table_name)
 
-            # 2.3. Get the data
-            success, total_rows = api.get_and_save_data(endpoint_config, db)
+        # 2.3. Get the data
+        return api.get_and_save_data(
+            endpoint_config, db, checkpoint=True, resume=resume, retry=retry
+        )
 
-            # Data for logs
-            end_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                :-3
-            ]  # Format: 2025-05-29 04:34:31.457
+    # Load into a staging table and swap it in on success, so the live table
+    # keeps its previous snapshot while loading and after a failed run
+    if resume is None:
+        staging_table = db.create_staging_table(table_name)
+        db.start_checkpoint(table_name, staging_table)
+    else:
+        staging_table = resume["target_table"]
+    try:
+        success, total_rows = api.get_and_save_data(
+            endpoint_config,
+            db,
+            staging_table,
+            checkpoint=True,
+            resume=resume,
+            retry=retry,
+        )
+        if success:
+            db.swap_staging_table(table_name, staging_table)
+    finally:
+        db.drop_table(staging_table)
 
-        except Exception as e:
-            logger.info(f"Error processing table: {table_name}")
-            logger.info(f"{str(e)}")
-            success = False
-            total_rows = 0
-            end_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return success, total_rows
 
-        # 2.4 Save the status in the database table
-        status = "SUCCESS" if success else "FAILED"
-        db.log_status_process(
-            table_name, start_time_endpoint, end_time_endpoint, status, total_rows
+
+def load_incremental(
+    api: API,
+    db: Database,
+    endpoint_config: dict,
+    staging: bool,
+    retry: RetryPolicy = None,
+    captured: dict = None,
+) -> Tuple[bool, int]:
+    """
+    Download only the records changed since the table's watermark and merge
+    them into the table by key. Without a watermark the table is loaded in
+    full first. A replay follows the captured load instead, and only moves
+    the watermark back to where the replayed changes start.
+    """
+    table_name = endpoint_config["table_name"]
+    incremental = endpoint_config["incremental"]
+    field = incremental["field"]
+
+    watermark = db.get_watermark(table_name)
+    if captured is not None:
+        full_load = captured["load"] == SNAPSHOT
+    else:
+        full_load = watermark is None
+        if full_load:
+            logger.info(f"No watermark for {table_name}, loading it in full")
+
+    if full_load:
+        success, total_rows = load_snapshot(
+            api, db, endpoint_config, staging, retry
         )
+        source_table = table_name
+    else:
+        since = watermark if captured is None else captured["since"]
+        query_params = {"$filter": f"{field} ge {since}"}
+        logger.info(f"Loading {table_name} changes since {field} {since}")
+        begin_capture(api, endpoint_config, INCREMENTAL, since, query_params)
+        source_table = db.create_staging_table(table_name)
+        try:
+            success, total_rows = api.get_and_save_data(
+                endpoint_config,
+                db,
+                source_table,
+                query_params=query_params,
+                retry=retry,
+            )
+            if success and total_rows > 0:
+                db.merge_table(source_table, table_name, incremental["key"], field)
+        except Exception:
+            db.drop_table(source_table)
+            raise
+
+    if success and total_rows > 0:
+        if full_load or captured is None:
+            # Move the watermark to the newest change that was loaded
+            db.set_watermark(table_name, db.get_max_timestamp(source_table, field))
+        else:
+            # The next live run reads again whatever changed after the
+            # replayed changes, in case they overwrote newer rows
+            db.set_watermark(table_name, earliest(watermark, captured["since"]))
 
-        if not success:
-            logger.error(
-                f"Error getting data from the API for table {
-                    endpoint_config['table_name']
-                }"
+    if source_table != table_name:
+        db.drop_table(source_table)
+
+    return success, total_rows
+
+
+def load_delta(
+    api: API,
+    db: Database,
+    endpoint_config: dict,
+    staging: bool,
+    retry: RetryPolicy = None,
+    captured: dict = None,
+) -> Tuple[bool, int]:
+    """
+    Apply the adds, updates and deletes the delta export reports since the
+    last run. A full snapshot runs instead on the first run and every
+    full_snapshot_hours. A replay follows the captured load instead, and
+    only moves the sync time back to where the replayed changes start.
+    """
+    table_name = endpoint_config["table_name"]
+    delta = endpoint_config["delta"]
+
+    # The next delta starts where this run started
+    run_started = datetime.now(timezone.utc)
+    since_time, full_sync_time = db.get_sync_state(table_name)
+
+    if captured is not None:
+        full_snapshot = captured["load"] == SNAPSHOT
+    else:
+        full_snapshot = (
+            since_time is None
+            or full_sync_time is None
+            or run_started.replace(tzinfo=None) - full_sync_time
+            >= timedelta(hours=delta["full_snapshot_hours"])
+        )
+
+    if full_snapshot:
+        logger.info(f"Running a full snapshot of {table_name}")
+        success, total_rows = load_snapshot(
+            api, db, endpoint_config, staging, retry
+        )
+        if success:
+            # A replayed snapshot is as recent as its capture
+            synced = (
+                run_started
+                if captured is None
+                else datetime.fromisoformat(captured["started_at"])
+            )
+            db.set_watermark(
+                table_name, synced.strftime(DELTA_TIME_FORMAT), full_sync=True
+            )
+        return success, total_rows
+
+    since = since_time if captured is None else captured["since"]
+    logger.info(f"Loading {table_name} changes since {since}")
+    delta_config = {**endpoint_config, "endpoint": delta["endpoint"], "export_endpoint": None}
+    query_params = {"sinceTime": since}
+    begin_capture(api, delta_config, DELTA, since, query_params)
+    source_table = db.create_staging_table(table_name)
+    try:
+        db.add_columns(source_table, DELTA_COLUMNS)
+        success, total_rows = api.get_and_save_data(
+            delta_config,
+            db,
+            source_table,
+            query_params=query_params,
+            retry=retry,
+        )
+        if success and total_rows > 0:
+            db.merge_table(
+                source_table,
+                table_name,
+                delta["key"],
+                "eventTimestamp",
+                delete_when=("status", "Fixed"),
             )
-            continue
+        if success:
+            if captured is None:
+                db.set_watermark(table_name, run_started.strftime(DELTA_TIME_FORMAT))
+            else:
+                # The next live delta reads again whatever changed after the
+                # replayed changes, in case they overwrote newer rows
+                db.set_watermark(table_name, earliest(since_time, since))
+    finally:
+        db.drop_table(source_table)
+
+    return success, total_rows
+
+
+def load_changes(
+    api: API,
+    db: Database,
+    endpoint_config: dict,
+    retry: RetryPolicy = None,
+) -> Tuple[bool, int]:
+    """
+    Download the endpoint in full but write only the rows that changed since
+    the last load, found by comparing row hashes with ep_row_hash. Without
+    row hashes, or with an empty table, every row is written.
+    """
+    table_name = endpoint_config["table_name"]
+    change_detection = endpoint_config["change_detection"]
+
+    # A table created before rows carried their key hash has none to match
+    key_hash_added = db.add_row_key_hash(table_name)
+    row_hashes = db.get_row_hashes(table_name)
+    if key_hash_added or not row_hashes or not db.table_has_rows(table_name):
+        logger.info(f"No row hashes for {table_name}, loading every row")
+        db.clear_row_hashes(table_name)
+        db.clean_table(table_name)
+        row_hashes = {}
+
+    detector = ChangeDetector(
+        table_name,
+        change_detection["key"],
+        row_hashes,
+        change_detection.get("ignore", ()),
+    )
+    begin_capture(api, endpoint_config, SNAPSHOT)
+    changes_table = db.create_staging_table(table_name)
+    try:
+        db.add_columns(changes_table, ROW_HASH_COLUMNS)
+        success, total_rows = api.get_and_save_data(
+            endpoint_config,
+            db,
+            changes_table,
+            retry=retry,
+            row_filter=detector.filter,
+        )
+        if success:
+            # Only a complete download shows which rows are gone
+            deleted = detector.deleted()
+            detector.log_summary(len(deleted))
+            db.apply_row_changes(changes_table, table_name, deleted)
+    finally:
+        db.drop_table(changes_table)
+
+    return success, total_rows
+
+
+def run_endpoint(
+    api: API,
+    db: Database,
+    endpoint_name: str,
+    endpoint_config: dict,
+    staging_load: bool = False,
+) -> bool:
+    """
+    Load a single endpoint and write its row to ep_execution_log. Without a
+    database the endpoint is only downloaded in full to the API's sinks.
+    """
+    table_name = endpoint_config["table_name"]
+
+    # Endpoints finished before a restart of this run are not loaded again
+    checkpoint = db.get_checkpoint(table_name) if db is not None else None
+    if checkpoint is not None and checkpoint["status"] == "DONE":
+        logger.info(f"{table_name} was already loaded in this run, skipping it")
+        return True
+
+    # Record start time for logs
+    start_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+        :-3
+    ]  # Format: 2025-05-29 04:34:31.457
+    run_start = time.perf_counter()
+
+    staging = endpoint_config.get("staging", staging_load)
+
+    # A replay loads the last captured load of the endpoint the same way it
+    # was loaded, found before any table is touched. Endpoints without one,
+    # like the export endpoints whose files are never captured, are skipped
+    captured = None
+    if replaying(api):
+        captured = api.capture.resolve(endpoint_config)
+        loads = {SNAPSHOT}
+        if db is not None and endpoint_config.get("delta"):
+            loads.add(DELTA)
+        elif db is not None and endpoint_config.get("incremental"):
+            loads.add(INCREMENTAL)
+        if captured is None or captured["load"] not in loads:
+            logger.warning(
+                f"No replayable capture of {table_name}"
+                + (f" (last load {captured['load']})" if captured else "")
+                + ", skipping it"
+            )
+            return True
+
+    # Page retries of this endpoint, recorded in ep_execution_log
+    retry = api.retry_policy(table_name)
+
+    try:
+        if db is None:
+            # No watermarks or checkpoints to load changes or resume from
+            begin_capture(api, endpoint_config, SNAPSHOT)
+            success, total_rows = api.get_and_save_data(
+                endpoint_config, None, retry=retry
+            )
+        elif endpoint_config.get("delta"):
+            success, total_rows = load_delta(
+                api, db, endpoint_config, staging, retry, captured
+            )
+        elif endpoint_config.get("incremental"):
+            success, total_rows = load_incremental(
+                api, db, endpoint_config, staging, retry, captured
+            )
+        elif endpoint_config.get("change_detection"):
+            success, total_rows = load_changes(api, db, endpoint_config, retry)
         else:
-            logger.info(
-                f"Data saved successfully for table {endpoint_config['table_name']}"
+            success, total_rows = load_snapshot(
+                api, db, endpoint_config, staging, retry
             )
-            logger.info("------------------------------------------")
+
+        if success and db is not None:
+            db.finish_checkpoint(table_name)
+
+        # Data for logs
+        end_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+            :-3
+        ]  # Format: 2025-05-29 04:34:31.457
+
+    except Exception as e:
+        logger.info(f"Error processing table: {table_name}")
+        logger.info(f"{str(e)}")
+        success = False
+        total_rows = 0
+        end_time_endpoint = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    finally:
+        end_capture(api, endpoint_config)
+
+    # 2.4 Save the status in the database table
+    status = "SUCCESS" if success else "FAILED"
+    if db is not None:
+        db.log_status_process(
+            table_name,
+            start_time_endpoint,
+            end_time_endpoint,
+            status,
+            total_rows,
+            retry.retries,
+        )
+    ENDPOINT_SECONDS.set(table_name, value=time.perf_counter() - run_start)
+    ENDPOINT_SUCCESS.set(table_name, value=1 if success else 0)
+    ENDPOINT_LAST_RUN.set(table_name, value=time.time())
+
+    if not success:
+        logger.error(
+            f"Error getting data from the API for table {
+                endpoint_config['table_name']
+            }"
+        )
+    else:
+        logger.info(
+            f"Data saved successfully for table {endpoint_config['table_name']}"
+        )
+        logger.info("------------------------------------------")
+
+    return success
+
+
+def main(
+    api: API,
+    db: Database,
+    endpoint_configs: dict,
+    max_workers: int = 1,
+    staging_load: bool = False,
+    checkpoint_max_age_hours: int = 5,
+    metrics_port: int = 0,
+    metrics_textfile: str = None,
+    metrics_linger_seconds: int = 0,
+):
+    # Expose the run's metrics for scraping while it runs
+    metrics_server = REGISTRY.serve(metrics_port) if metrics_port else None
+
+    # Newer checkpoints were left by this run before the pod restarted, older
+    # ones by a run that never finished
+    if db is not None:
+        db.clear_checkpoints(older_than_hours=checkpoint_max_age_hours)
+
+    run_endpoints(
+        api, db, endpoint_configs, max_workers, staging_load, metrics_textfile
+    )
+
+    # The run is over, the next one starts from scratch
+    if db is not None:
+        db.clear_checkpoints()
+
+    # Keep the capture cache within its retention limits
+    if api.capture is not None and api.capture.capturing:
+        api.capture.evict()
+
+    write_metrics(metrics_textfile)
+    if metrics_server is not None and metrics_linger_seconds > 0:
+        # Give the scraper a chance to collect the final values before the
+        # pod goes away
+        logger.info(f"Keeping the metrics endpoint up for {metrics_linger_seconds}s")
+        time.sleep(metrics_linger_seconds)
+
+
+def run_daemon(
+    api: API,
+    db: Database,
+    endpoint_configs: dict,
+    max_workers: int = 1,
+    staging_load: bool = False,
+    checkpoint_max_age_hours: int = 5,
+    metrics_port: int = 0,
+    metrics_textfile: str = None,
+    default_cadence_minutes: float = 360,
+    default_jitter_minutes: float = 5,
+):
+    """
+    Keep loading every endpoint on its own cadence until SIGTERM or SIGINT,
+    with the API session, token and ODBC connection pool kept warm between
+    runs. A load cut short by a restart resumes from its checkpoint on the
+    endpoint's first run.
+    """
+    metrics_server = REGISTRY.serve(metrics_port) if metrics_port else None
+
+    if db is not None:
+        db.clear_checkpoints(older_than_hours=checkpoint_max_age_hours)
+
+    worker_db = worker_databases(db)
+
+    def run_scheduled(endpoint_name: str, endpoint_config: dict) -> bool:
+        worker = worker_db()
+        success = run_endpoint(
+            api, worker, endpoint_name, endpoint_config, staging_load
+        )
+        # The DONE checkpoint only protects a batch run against restarts, the
+        # endpoint's next scheduled run loads it again
+        if worker is not None:
+            worker.clear_checkpoints(table_name=endpoint_config["table_name"])
+        if api.capture is not None and api.capture.capturing:
+            api.capture.evict()
+        write_metrics(metrics_textfile)
+        return success
+
+    scheduler = Scheduler(
+        run_scheduled,
+        endpoint_configs,
+        max_workers=max_workers,
+        default_cadence_minutes=default_cadence_minutes,
+        default_jitter_minutes=default_jitter_minutes,
+    )
+
+    def shut_down(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after the running endpoints")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, shut_down)
+    signal.signal(signal.SIGINT, shut_down)
+
+    scheduler.run_forever()
+
+    write_metrics(metrics_textfile)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+
+
+def worker_databases(db: Database) -> Callable[[], Database]:
+    """
+    Return a function giving every worker thread its own Database instance,
+    cloned from db on first use
+    """
+    worker_state = threading.local()
+
+    def worker_db() -> Database:
+        if not hasattr(worker_state, "db"):
+            worker_state.db = db.clone() if db is not None else None
+        return worker_state.db
+
+    return worker_db
+
+
+def write_metrics(metrics_textfile: str):
+    """
+    Write the metrics textfile, if one is configured
+    """
+    if not metrics_textfile:
+        return
+    try:
+        REGISTRY.write_textfile(metrics_textfile)
+    except OSError as e:
+        logger.error(f"Error writing metrics to {metrics_textfile}: {e}")
+
+
+def run_endpoints(
+    api: API,
+    db: Database,
+    endpoint_configs: dict,
+    max_workers: int,
+    staging_load: bool,
+    metrics_textfile: str = None,
+):
+    # 2. Iterate over the endpoint configs and get the data
+    if max_workers <= 1:
+        for endpoint_name, endpoint_config in endpoint_configs.items():
+            run_endpoint(api, db, endpoint_name, endpoint_config, staging_load)
+            write_metrics(metrics_textfile)
+        return
+
+    # Schedule the largest endpoints first, so the run takes about as long as
+    # the biggest table instead of the biggest table plus whatever queued behind it
+    ordered_configs = sorted(
+        endpoint_configs.items(),
+        key=lambda item: item[1].get("total_rows", 0),
+        reverse=True,
+    )
+    logger.info(
+        f"Running {len(ordered_configs)} endpoints with {max_workers} workers"
+    )
+
+    worker_db = worker_databases(db)
+
+    def run_in_worker(endpoint_name: str, endpoint_config: dict) -> bool:
+        return run_endpoint(
+            api, worker_db(), endpoint_name, endpoint_config, staging_load
+        )
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="endpoint"
+    ) as executor:
+        futures = {
+            executor.submit(run_in_worker, endpoint_name, endpoint_config): endpoint_name
+            for endpoint_name, endpoint_config in ordered_configs
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Worker failed for endpoint {futures[future]}: {e}")
+            write_metrics(metrics_textfile)
 
 
 if __name__ == "__main__":
     settings = Settings()
 
+    capture = None
+    if settings.CAPTURE_MODE:
+        capture = CaptureCache(
+            settings.CAPTURE_DIR,
+            mode=settings.CAPTURE_MODE,
+            replay_run=settings.CAPTURE_REPLAY_RUN,
+            max_bytes=settings.CAPTURE_MAX_MB * 2**20,
+            max_age_days=settings.CAPTURE_MAX_AGE_DAYS,
+            # A daemon never ends its run, every load is a run of its own
+            run_per_load=settings.DAEMON_MODE,
+        )
+        logger.info(f"Capture cache in {settings.CAPTURE_MODE} mode at {settings.CAPTURE_DIR}")
+
+    sink_names = {name.strip() for name in settings.SINKS.split(",") if name.strip()}
+    unknown = sink_names - {"sqlserver", "parquet"}
+    if unknown or not sink_names:
+        raise ValueError(f"Unknown SINKS {settings.SINKS!r}, use sqlserver and/or parquet")
+    sinks = []
+    if "parquet" in sink_names:
+        sinks.append(
+            ParquetSink(
+                settings.PARQUET_DIR,
+                row_group_rows=settings.PARQUET_ROW_GROUP_ROWS,
+                compression=settings.PARQUET_COMPRESSION,
+            )
+        )
+
     # Initialize the API
     api = API(
         api_tenant_id=settings.API_TENANT_ID,
         api_client_id=settings.API_CLIENT_ID,
         api_client_secret=settings.API_CLIENT_SECRET,
         base_url=settings.BASE_URL,
+        pipeline_depth=settings.PIPELINE_DEPTH,
+        rate_limiter=RateLimiter(
+            calls_per_minute=settings.API_CALLS_PER_MINUTE,
+            calls_per_hour=settings.API_CALLS_PER_HOUR,
+        ),
+        stream_chunk_size=settings.STREAM_CHUNK_SIZE,
+        export_download_workers=settings.EXPORT_DOWNLOAD_WORKERS,
+        auto_tune=settings.AUTO_TUNE,
+        memory_limit_mb=settings.MEMORY_LIMIT_MB,
+        max_page_retries=settings.MAX_PAGE_RETRIES,
+        max_endpoint_retries=settings.MAX_ENDPOINT_RETRIES,
+        capture=capture,
+        sinks=sinks,
     )
 
-    # Initialize the database
-    db = Database(
-        host=settings.SQL_HOST,
-        database=settings.SQL_DATABASE,
-        username=settings.SQL_USERNAME,
-        password=settings.SQL_PASSWORD,
-        port=settings.SQL_PORT,
-        batch_size=settings.BATCH_SIZE,
-    )
+    # Initialize the database, unless the run only writes to other sinks
+    db = None
+    if "sqlserver" in sink_names:
+        db = Database(
+            host=settings.SQL_HOST,
+            database=settings.SQL_DATABASE,
+            username=settings.SQL_USERNAME,
+            password=settings.SQL_PASSWORD,
+            port=settings.SQL_PORT,
+            batch_size=settings.BATCH_SIZE,
+            typed_binding=settings.TYPED_BINDING,
+            insert_writers=settings.INSERT_WRITERS,
+            pool_size=settings.DB_POOL_SIZE,
+        )
 
-    main(
-        api,
-        db,
-        settings.ENDPOINT_CONFIGS,
-    )
+    if settings.DAEMON_MODE:
+        run_daemon(
+            api,
+            db,
+            settings.ENDPOINT_CONFIGS,
+            max_workers=settings.MAX_WORKERS,
+            staging_load=settings.STAGING_LOAD,
+            checkpoint_max_age_hours=settings.CHECKPOINT_MAX_AGE_HOURS,
+            metrics_port=settings.METRICS_PORT,
+            metrics_textfile=settings.METRICS_TEXTFILE,
+            default_cadence_minutes=settings.DAEMON_CADENCE_MINUTES,
+            default_jitter_minutes=settings.DAEMON_JITTER_MINUTES,
+        )
+    else:
+        main(
+            api,
+            db,
+            settings.ENDPOINT_CONFIGS,
+            max_workers=settings.MAX_WORKERS,
+            staging_load=settings.STAGING_LOAD,
+            checkpoint_max_age_hours=settings.CHECKPOINT_MAX_AGE_HOURS,
+            metrics_port=settings.METRICS_PORT,
+            metrics_textfile=settings.METRICS_TEXTFILE,
+            metrics_linger_seconds=settings.METRICS_LINGER_SECONDS,
+        )
@@ -0,0 +1,278 @@
+import os
+import resource
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+# Seconds buckets shared by the latency histograms
+SECONDS_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    A metric family with one value per set of label values
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(labels)
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+    def _render_value(self, labels: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_max(self, *labels, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = SECONDS_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, *labels, value: float):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def total(self, *labels) -> tuple:
+        """
+        Number and sum of the observations with the given labels
+        """
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], 0.0))
+        return counts[-1], total
+
+    def _render_value(self, labels: tuple, value) -> list:
+        counts, total = value
+        labelnames = self.labelnames + ("le",)
+        lines = [
+            f"{self.name}_bucket{_format_labels(labelnames, labels + (_format_value(bound),))} {count}"
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(
+            f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+        )
+        lines.append(
+            f"{self.name}_count{_format_labels(self.labelnames, labels)} {counts[-1]}"
+        )
+        return lines
+
+
+class Registry:
+    """
+    The metrics of the process, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = SECONDS_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        # ru_maxrss is in kilobytes on Linux
+        PEAK_RSS_BYTES.set_max(
+            value=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        )
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """
+        Write the metrics for the node_exporter textfile collector. The file is
+        replaced in one step so the collector never reads half of it.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int) -> ThreadingHTTPServer:
+        """
+        Serve the metrics on http://0.0.0.0:<port>/metrics from a daemon thread
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        thread = threading.Thread(
+            target=server.serve_forever, name="metrics-server", daemon=True
+        )
+        thread.start()
+        logger.info(f"Serving metrics on port {port}")
+        return server
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "mde_http_request_seconds",
+    "Time until the MDE API answered a request, per endpoint",
+    ("endpoint",),
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    "mde_http_responses_total",
+    "MDE API responses per endpoint and status code",
+    ("endpoint", "code"),
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "mde_response_bytes_total",
+    "Bytes of MDE API page bodies read, per endpoint",
+    ("endpoint",),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "mde_stage_seconds",
+    "Time per page spent in the fetch, decode, clean, insert and commit stages",
+    ("endpoint", "stage"),
+)
+ROWS = REGISTRY.counter(
+    "mde_rows_total",
+    "Rows that went through the fetch, clean and insert stages",
+    ("endpoint", "stage"),
+)
+INSERT_ROWS_PER_SECOND = REGISTRY.gauge(
+    "mde_insert_rows_per_second",
+    "Insert throughput of the last run of an endpoint",
+    ("endpoint",),
+)
+ROW_CHANGES = REGISTRY.counter(
+    "mde_row_changes_total",
+    "Rows of change-detected endpoints that were new, changed, unchanged or deleted",
+    ("endpoint", "change"),
+)
+RETRIES = REGISTRY.counter(
+    "mde_page_retries_total",
+    "Pages read again after a retryable error, per endpoint",
+    ("endpoint",),
+)
+ENDPOINT_SECONDS = REGISTRY.gauge(
+    "mde_endpoint_duration_seconds",
+    "Wall time of the last run of an endpoint",
+    ("endpoint",),
+)
+ENDPOINT_SUCCESS = REGISTRY.gauge(
+    "mde_endpoint_success",
+    "1 if the last run of an endpoint succeeded, 0 if it failed",
+    ("endpoint",),
+)
+ENDPOINT_SKIPPED_RUNS = REGISTRY.counter(
+    "mde_endpoint_skipped_runs_total",
+    "Scheduled runs of an endpoint skipped because its previous run was still going",
+    ("endpoint",),
+)
+ENDPOINT_LAST_RUN = REGISTRY.gauge(
+    "mde_endpoint_last_run_timestamp_seconds",
+    "Unix time the last run of an endpoint finished",
+    ("endpoint",),
+)
+PEAK_RSS_BYTES = REGISTRY.gauge(
+    "mde_peak_rss_bytes",
+    "Peak resident set size of the process",
+)
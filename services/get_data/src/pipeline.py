@@ -0,0 +1,247 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+from loguru import logger
+from metrics import INSERT_ROWS_PER_SECOND, ROWS, STAGE_SECONDS
+
+# Marks the end of the page stream between stages
+_DONE = object()
+
+STAGES = ("fetch", "clean", "insert")
+
+
+class _StageError:
+    """
+    Carries an exception raised in a worker stage to the insert stage
+    """
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class StageTimings:
+    """
+    Wall time spent per stage for one endpoint, also exported as metrics
+    when the endpoint's table name is given
+    """
+
+    def __init__(self, table_name: str = None):
+        self.table_name = table_name
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.pages = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.seconds[stage] += seconds
+        if self.table_name:
+            STAGE_SECONDS.observe(self.table_name, stage, value=seconds)
+
+    def count(self, stage: str, rows: int):
+        if self.table_name:
+            ROWS.inc(self.table_name, stage, amount=rows)
+
+    def bottleneck(self) -> str:
+        return max(self.seconds, key=self.seconds.get)
+
+    def log(self, table_name: str, wall_seconds: float):
+        stages = ", ".join(
+            f"{stage} {seconds:.1f}s" for stage, seconds in self.seconds.items()
+        )
+        insert_rate = self.rows / max(self.seconds["insert"], 1e-9)
+        if self.table_name:
+            INSERT_ROWS_PER_SECOND.set(table_name, value=insert_rate)
+        logger.info(
+            f"Stage timings for {table_name}: {stages} "
+            f"({self.pages} pages, {self.rows:,} rows, wall {wall_seconds:.1f}s, "
+            f"insert {insert_rate:,.0f} rows/s, bottleneck: {self.bottleneck()})"
+        )
+
+
+def _put(target: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Put an item in a bounded queue, giving up if the pipeline was stopped
+    """
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_sequential(
+    pages: Iterable[Tuple[list, Any]],
+    clean: Callable[[list], list],
+    save: Callable[[list, Any], bool],
+    timings: StageTimings,
+) -> bool:
+    """
+    Fetch, clean and insert one page at a time. Each page comes with a position
+    that is handed to save untouched.
+    """
+    success = False
+    iterator = iter(pages)
+
+    while True:
+        start = time.perf_counter()
+        page = next(iterator, _DONE)
+        if page is _DONE:
+            break
+        timings.add("fetch", time.perf_counter() - start)
+
+        data, position = page
+        timings.count("fetch", len(data))
+
+        start = time.perf_counter()
+        data = clean(data)
+        timings.add("clean", time.perf_counter() - start)
+        timings.count("clean", len(data))
+
+        start = time.perf_counter()
+        success = save(data, position)
+        timings.add("insert", time.perf_counter() - start)
+
+        if not success:
+            break
+
+    return success
+
+
+def run_pipelined(
+    pages: Iterable[Tuple[list, Any]],
+    clean: Callable[[list], list],
+    save: Callable[[list, Any], bool],
+    timings: StageTimings,
+    depth: int,
+) -> bool:
+    """
+    Fetch, clean and insert in separate threads, connected by queues that hold
+    at most `depth` pages each. The insert stage runs in the calling thread so
+    the database connection never changes thread.
+    """
+    raw_pages = queue.Queue(maxsize=depth)
+    clean_pages = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def fetch_stage():
+        try:
+            iterator = iter(pages)
+            while not stop.is_set():
+                start = time.perf_counter()
+                page = next(iterator, _DONE)
+                if page is _DONE:
+                    break
+                timings.add("fetch", time.perf_counter() - start)
+                if not _put(raw_pages, page, stop):
+                    return
+            _put(raw_pages, _DONE, stop)
+        except Exception as e:
+            _put(raw_pages, _StageError(e), stop)
+
+    def clean_stage():
+        while not stop.is_set():
+            try:
+                page = raw_pages.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if page is _DONE or isinstance(page, _StageError):
+                _put(clean_pages, page, stop)
+                return
+
+            data, position = page
+            timings.count("fetch", len(data))
+            try:
+                start = time.perf_counter()
+                data = clean(data)
+                timings.add("clean", time.perf_counter() - start)
+                timings.count("clean", len(data))
+            except Exception as e:
+                _put(clean_pages, _StageError(e), stop)
+                return
+
+            if not _put(clean_pages, (data, position), stop):
+                return
+
+    workers = [
+        threading.Thread(target=fetch_stage, name="pipeline-fetch", daemon=True),
+        threading.Thread(target=clean_stage, name="pipeline-clean", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    success = False
+    try:
+        while True:
+            page = clean_pages.get()
+            if page is _DONE:
+                break
+            if isinstance(page, _StageError):
+                raise page.error
+
+            data, position = page
+            start = time.perf_counter()
+            success = save(data, position)
+            timings.add("insert", time.perf_counter() - start)
+
+            if not success:
+                break
+    finally:
+        # Unblock the other stages and wait for them to finish their current page
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    return success
+
+
+def iter_concurrently(
+    producers: list[Callable[[], Iterable]], depth: int
+) -> Iterator:
+    """
+    Run every producer in its own thread and yield their items in the order
+    they arrive, holding at most `depth` items between the producers and the
+    caller. The first error raised by a producer stops the others and is
+    raised to the caller.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce(producer: Callable[[], Iterable]):
+        try:
+            for item in producer():
+                if not _put(items, item, stop):
+                    return
+            _put(items, _DONE, stop)
+        except Exception as e:
+            _put(items, _StageError(e), stop)
+
+    workers = [
+        threading.Thread(
+            target=produce, args=(producer,), name=f"producer-{i}", daemon=True
+        )
+        for i, producer in enumerate(producers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    running = len(workers)
+    try:
+        while running:
+            item = items.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Unblock the producers and wait for them to finish their current item
+        stop.set()
+        for worker in workers:
+            worker.join()
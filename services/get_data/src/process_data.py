@@ -1,62 +1,157 @@
-import pandas as pd
 from loguru import logger
 import time
 import json
 
+# Kinds of values a planned column can hold, anything else goes to the generic path
+_TEXT_KINDS = frozenset({str, type(None)})
+_NUMBER_KINDS = frozenset({int, float, bool, type(None)})
+_JSON_KINDS = frozenset({dict, list, type(None)})
 
-def remove_empty_values(
-      result: list[dict]  
-    ) -> list[dict]:
 
-        # declare output list
-    new_result_list = []
+def clean_value(value):
+    """
+    Clean a single value: empty dicts and lists become None, non-empty ones
+    JSON strings, numbers become floats and everything else is kept as is
+    """
+    kind = type(value)
+    if kind is str or value is None:
+        return value
+    # Convert to float for consistency (Polars can handle this better)
+    if kind is float or kind is int or kind is bool:
+        return float(value)
+    if kind is dict or kind is list:
+        # Convert non-empty dicts and lists to JSON string for SQL Server
+        return json.dumps(value) if value else None
+
+    # Subclasses of the builtin types
+    if isinstance(value, dict):
+        return json.dumps(value) if value != {} else None
+    if isinstance(value, list):
+        return json.dumps(value) if len(value) > 0 else None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def clean_row(row: dict) -> dict:
+    """
+    Clean one row, skipping @odata.type metadata fields and fields with dots
+    """
+    return {
+        key: clean_value(value)
+        for key, value in row.items()
+        if not (("@" in key) or ("." in key))
+    }
+
+
+def _clean_number(value):
+    return None if value is None else float(value)
+
+
+def _clean_json(value):
+    return json.dumps(value) if value else None
+
+
+class CleaningPlan:
+    """
+    Precompiled cleaning of rows sharing one key set. Each kept key gets the
+    converter matching the value kinds seen on the first page.
+    """
 
-    start_cleaning_time = time.time()
-    
-    # Iterate over the current result
-    for row in result:
-        cleaned_row = {}
-        for key, value in row.items():
-            # Skip @odata.type metadata fields and fields with dots
+    def __init__(self, source_keys: tuple, kinds: dict):
+        self.source_keys = frozenset(source_keys)
+        self.fields = []
+        for key in source_keys:
             if ("@" in key) or ("." in key):
                 continue
-            # Handle empty dict
-            elif value == {}:
-                cleaned_row[key] = None
-            elif isinstance(value, dict):
-                cleaned_row[key] = json.dumps(value)
-            # Handle lists (both empty and non-empty)
-            elif isinstance(value, list):
-                if len(value) == 0:
-                    cleaned_row[key] = None
-                else:
-                    # Convert non-empty lists to JSON string for SQL Server
-                    cleaned_row[key] = json.dumps(value)
-            # Handle None values
-            elif value is None:
-                cleaned_row[key] = None
-            # Convert all numeric values to consistent types
-            elif isinstance(value, (int, float)):
-                # Convert to float for consistency (Polars can handle this better)
-                cleaned_row[key] = float(value) if value is not None else None    
+            seen = kinds[key]
+            if seen <= _TEXT_KINDS:
+                self.fields.append((key, _TEXT_KINDS, None))
+            elif seen <= _NUMBER_KINDS:
+                self.fields.append((key, _NUMBER_KINDS, _clean_number))
+            elif seen <= _JSON_KINDS:
+                self.fields.append((key, _JSON_KINDS, _clean_json))
+            else:
+                self.fields.append((key, None, clean_value))
+
+    @classmethod
+    def learn(cls, rows: list[dict]) -> "CleaningPlan":
+        """
+        Build a plan from the key set of the first row and the value kinds
+        of every row of the page with the same keys
+        """
+        source_keys = tuple(rows[0])
+        key_set = rows[0].keys()
+        kinds = {key: set() for key in source_keys}
+        for row in rows:
+            if row.keys() != key_set:
+                continue
+            for key, value in row.items():
+                kinds[key].add(type(value))
+        return cls(source_keys, kinds)
+
+    def apply(self, row: dict) -> dict:
+        """
+        Clean a row with the plan, or return None if the row has another shape
+        """
+        if row.keys() != self.source_keys:
+            return None
+
+        cleaned = {}
+        for key, kinds, convert in self.fields:
+            value = row[key]
+            if kinds is None or type(value) not in kinds:
+                cleaned[key] = clean_value(value)
+            elif convert is None:
+                cleaned[key] = value
             else:
-                cleaned_row[key] = value
-        
-        new_result_list.append(cleaned_row)
-                
-    end_cleaning_time = time.time()
-    time_cleaning = end_cleaning_time - start_cleaning_time                
+                cleaned[key] = convert(value)
+        return cleaned
 
-    return new_result_list
 
-def process_result(
-        result: list[dict]
-    ):
-    """"
-    Replace {} values in columns by None, it is due to polars cand handle this cases, and it needs to be modify
+class CleaningEngine:
     """
+    Cleans the pages of one endpoint, learning a plan from the first page and
+    falling back to the generic path for rows with unexpected keys
+    """
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self.plan = None
+        self.last_seconds = 0.0
+        self.total_seconds = 0.0
+        self.planned_rows = 0
+        self.generic_rows = 0
+
+    def clean(self, result: list[dict]) -> list[dict]:
+        start_cleaning_time = time.perf_counter()
+
+        if self.plan is None and result:
+            self.plan = CleaningPlan.learn(result)
+
+        new_result_list = []
+        generic_rows = 0
+        for row in result:
+            cleaned_row = self.plan.apply(row)
+            if cleaned_row is None:
+                cleaned_row = clean_row(row)
+                generic_rows += 1
+            new_result_list.append(cleaned_row)
+
+        self.last_seconds = time.perf_counter() - start_cleaning_time
+        self.total_seconds += self.last_seconds
+        self.planned_rows += len(result) - generic_rows
+        self.generic_rows += generic_rows
 
-    # Remove empty values
-    new_result_list = remove_empty_values(result)
+        logger.debug(
+            f"Cleaned {len(result):,} rows for {self.table_name} in "
+            f"{self.last_seconds:.3f}s ({generic_rows:,} on the generic path)"
+        )
+        return new_result_list
 
-    return new_result_list
\ No newline at end of file
+    def log_summary(self):
+        logger.info(
+            f"Cleaning for {self.table_name}: {self.total_seconds:.1f}s, "
+            f"{self.planned_rows:,} rows with the compiled plan, "
+            f"{self.generic_rows:,} on the generic path"
+        )
@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from loguru import logger
+
+
+class TokenBucket:
+    """
+    Token bucket holding `capacity` calls, refilled evenly over `period` seconds
+    """
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float, factor: float):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate * factor)
+        self.updated = now
+
+    def wait_time(self, factor: float) -> float:
+        """
+        Seconds until one token is available
+        """
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / (self.rate * factor)
+
+
+class RateLimiter:
+    """
+    Call budget shared by every endpoint of the process, sized to the MDE API
+    quotas. The refill rate is only lowered when the API answers with 429 and
+    recovers gradually after successful calls.
+    """
+
+    def __init__(
+        self,
+        calls_per_minute: int = 100,
+        calls_per_hour: int = 1500,
+        min_factor: float = 0.1,
+        recovery_step: float = 0.05,
+    ):
+        self.buckets = [
+            TokenBucket(calls_per_minute, 60),
+            TokenBucket(calls_per_hour, 3600),
+        ]
+        self.min_factor = min_factor
+        self.recovery_step = recovery_step
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a call is allowed by every bucket
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                for bucket in self.buckets:
+                    bucket.refill(now, self.factor)
+
+                wait = max(
+                    [self.paused_until - now]
+                    + [bucket.wait_time(self.factor) for bucket in self.buckets]
+                )
+                if wait <= 0:
+                    for bucket in self.buckets:
+                        bucket.tokens -= 1
+                    return
+
+            time.sleep(wait)
+
+    def record_success(self):
+        """
+        Speed back up after the service stopped pushing back
+        """
+        if self.factor < 1.0:
+            with self._lock:
+                self.factor = min(1.0, self.factor + self.recovery_step)
+
+    def record_throttle(self, retry_after: float):
+        """
+        Pause every caller for `retry_after` seconds and halve the call rate
+        """
+        with self._lock:
+            self.paused_until = max(
+                self.paused_until, time.monotonic() + retry_after
+            )
+            self.factor = max(self.min_factor, self.factor / 2)
+            factor = self.factor
+
+        logger.warning(
+            f"API throttled the client, pausing {retry_after:.1f}s "
+            f"and running at {factor:.0%} of the call budget"
+        )
+
+
+def parse_retry_after(value: str, default: float) -> float:
+    """
+    Read a Retry-After header, given either in seconds or as an HTTP date
+    """
+    if not value:
+        return default
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,99 @@
+import json
+import random
+import threading
+import time
+
+import requests
+from json_stream import TruncatedStreamError
+from loguru import logger
+from metrics import RETRIES
+
+# HTTP statuses worth asking again for, anything else is fatal
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed page request may succeed when sent again: timeouts,
+    dropped connections, truncated or malformed bodies and 408, 429 and 5xx
+    answers. Other HTTP errors, such as 400, 403 or a 401 after the token was
+    refreshed, are fatal.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return (
+            error.response is not None
+            and error.response.status_code in RETRYABLE_STATUS
+        )
+    if isinstance(
+        error,
+        (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.ContentDecodingError,
+        ),
+    ):
+        return True
+    # Bodies cut short by the server fail to decode, other ValueErrors are bugs
+    return isinstance(error, (json.JSONDecodeError, TruncatedStreamError))
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with full jitter for the given retry, starting at 0
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+class RetryPolicy:
+    """
+    Page retries of one endpoint. Every page may be retried max_page_retries
+    times, and all the pages of the endpoint share a budget of max_retries.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        max_retries: int = 20,
+        max_page_retries: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 120.0,
+    ):
+        self.table_name = table_name
+        self.max_retries = max_retries
+        self.max_page_retries = max_page_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def retry(self, error: Exception, page_retries: int) -> bool:
+        """
+        Decide whether to retry a failed page that was already retried
+        page_retries times, and wait the backoff delay if so
+        """
+        if not is_retryable(error):
+            logger.error(
+                f"Fatal error reading {self.table_name}: {type(error).__name__}: {error}"
+            )
+            return False
+
+        with self._lock:
+            if page_retries >= self.max_page_retries or self.retries >= self.max_retries:
+                logger.error(
+                    f"Giving up on {self.table_name} after {page_retries} retries "
+                    f"of the page and {self.retries} retries of the endpoint: "
+                    f"{type(error).__name__}: {error}"
+                )
+                return False
+            self.retries += 1
+        RETRIES.inc(self.table_name)
+
+        delay = backoff_delay(page_retries, self.base_delay, self.max_delay)
+        logger.warning(
+            f"Page of {self.table_name} failed ({type(error).__name__}: {error}), "
+            f"retry {page_retries + 1}/{self.max_page_retries} in {delay:.1f}s "
+            f"({self.retries}/{self.max_retries} for the endpoint)"
+        )
+        time.sleep(delay)
+        return True
@@ -0,0 +1,146 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from loguru import logger
+from metrics import ENDPOINT_SKIPPED_RUNS
+
+# Longest sleep between two looks at the schedule
+MAX_WAIT_SECONDS = 60
+
+
+class Scheduler:
+    """
+    Runs every endpoint on its own cadence from a pool of max_workers
+    threads. An endpoint is first due at start plus a random jitter, then
+    every "cadence_minutes" (plus a new jitter) after its previous start.
+    When more endpoints are due than workers are free, the ones with the
+    highest "priority" start first. An endpoint that comes due while its
+    previous run is still going skips that run.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[str, dict], bool],
+        endpoint_configs: dict,
+        max_workers: int = 1,
+        default_cadence_minutes: float = 360,
+        default_jitter_minutes: float = 5,
+        seed: int = None,
+    ):
+        self.run = run
+        self.endpoint_configs = endpoint_configs
+        self.max_workers = max(1, max_workers)
+        self.default_cadence_minutes = default_cadence_minutes
+        self.default_jitter_minutes = default_jitter_minutes
+        self.random = random.Random(seed)
+
+        self.stopping = threading.Event()
+        # Set whenever a worker frees up, so a waiting endpoint can start
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._running = set()
+        self._ready = set()
+        self._due = []
+
+    def cadence_seconds(self, endpoint_name: str) -> float:
+        config = self.endpoint_configs[endpoint_name]
+        return 60 * config.get("cadence_minutes", self.default_cadence_minutes)
+
+    def jitter_seconds(self, endpoint_name: str) -> float:
+        config = self.endpoint_configs[endpoint_name]
+        return 60 * self.random.uniform(
+            0, config.get("jitter_minutes", self.default_jitter_minutes)
+        )
+
+    def priority(self, endpoint_name: str) -> int:
+        return self.endpoint_configs[endpoint_name].get("priority", 0)
+
+    def _schedule(self, endpoint_name: str, due: float):
+        heapq.heappush(self._due, (due, endpoint_name))
+
+    def _collect_due(self, now: float):
+        """
+        Move the endpoints whose time came into the ready set
+        """
+        while self._due and self._due[0][0] <= now:
+            due, endpoint_name = heapq.heappop(self._due)
+            with self._lock:
+                running = endpoint_name in self._running
+            if running:
+                logger.warning(
+                    f"{endpoint_name} is due but its previous run is still going, "
+                    f"skipping this run"
+                )
+                ENDPOINT_SKIPPED_RUNS.inc(self.endpoint_configs[endpoint_name]["table_name"])
+                self._schedule(
+                    endpoint_name,
+                    due + self.cadence_seconds(endpoint_name) + self.jitter_seconds(endpoint_name),
+                )
+                continue
+            self._ready.add(endpoint_name)
+
+    def _run_endpoint(self, endpoint_name: str):
+        try:
+            self.run(endpoint_name, self.endpoint_configs[endpoint_name])
+        except Exception as e:
+            logger.error(f"Scheduled run of {endpoint_name} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(endpoint_name)
+            self._wake.set()
+
+    def _start_ready(self, executor: ThreadPoolExecutor, now: float):
+        """
+        Start ready endpoints, highest priority first, while workers are free
+        """
+        for endpoint_name in sorted(self._ready, key=lambda name: -self.priority(name)):
+            with self._lock:
+                if len(self._running) >= self.max_workers:
+                    return
+                self._running.add(endpoint_name)
+            self._ready.discard(endpoint_name)
+            # The next run is due a cadence after this one started
+            self._schedule(
+                endpoint_name,
+                now + self.cadence_seconds(endpoint_name) + self.jitter_seconds(endpoint_name),
+            )
+            executor.submit(self._run_endpoint, endpoint_name)
+
+    def run_forever(self):
+        """
+        Run the schedule until stop is called, then wait for the running
+        endpoints to finish
+        """
+        start = time.monotonic()
+        for endpoint_name in self.endpoint_configs:
+            self._schedule(endpoint_name, start + self.jitter_seconds(endpoint_name))
+        logger.info(
+            f"Scheduling {len(self.endpoint_configs)} endpoints with {self.max_workers} workers"
+        )
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="endpoint"
+        ) as executor:
+            while not self.stopping.is_set():
+                self._wake.clear()
+                now = time.monotonic()
+                self._collect_due(now)
+                self._start_ready(executor, now)
+
+                wait = MAX_WAIT_SECONDS
+                if self._due:
+                    wait = min(wait, max(0.0, self._due[0][0] - time.monotonic()))
+                self._wake.wait(wait)
+
+            with self._lock:
+                running = sorted(self._running)
+            if running:
+                logger.info(f"Waiting for {', '.join(running)} to finish")
+
+    def stop(self):
+        self.stopping.set()
+        self._wake.set()
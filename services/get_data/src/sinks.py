@@ -0,0 +1,237 @@
+import os
+import re
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from sql_types import parse_timestamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only the parquet sink needs it
+    pa = pq = None
+
+# Cleaned text values that are ISO 8601 timestamps, as the API returns them
+_ISO_TIMESTAMP = re.compile(
+    r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})?$"
+)
+
+
+class EndpointWriter:
+    """
+    Writes the cleaned pages of one endpoint load to a sink
+    """
+
+    def write(self, rows: list):
+        raise NotImplementedError
+
+    def close(self, success: bool):
+        """
+        Finish the load. A failed load should leave nothing behind.
+        """
+
+
+class Sink:
+    """
+    An output for the cleaned pages of every endpoint, next to or instead of
+    SQL Server. open is called once per endpoint load, and the writer it
+    returns is only used by the thread loading that endpoint.
+    """
+
+    name = ""
+
+    def open(self, endpoint_config: dict, target_table: str) -> EndpointWriter:
+        raise NotImplementedError
+
+
+def _infer_type(values: list):
+    """
+    Arrow type of a column from the cleaned values of its first row group
+    """
+    kinds = {type(value) for value in values if value is not None}
+    if not kinds:
+        return pa.string()
+    if kinds <= {float, int}:
+        return pa.float64()
+    if kinds == {str} and all(
+        _ISO_TIMESTAMP.match(value) for value in values if value is not None
+    ):
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetEndpointWriter(EndpointWriter):
+    """
+    Buffers up to `row_group_rows` cleaned rows and writes them as one row
+    group. The schema is set by the first row group: later columns are
+    dropped and values that do not fit their column's type become nulls.
+    """
+
+    def __init__(self, sink: "ParquetSink", path: str, metadata: dict):
+        self.sink = sink
+        self.path = path
+        self.tmp_path = os.path.join(
+            os.path.dirname(path), f".{os.path.basename(path)}.tmp"
+        )
+        self.metadata = metadata
+        self.table_name = metadata["table_name"]
+        self.schema = None
+        self.rows = 0
+        self.mismatched = 0
+        self._buffer = []
+        self._writer = None
+        self._dropped_columns = set()
+
+    def write(self, rows: list):
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.sink.row_group_rows:
+            group = self._buffer[: self.sink.row_group_rows]
+            del self._buffer[: self.sink.row_group_rows]
+            self._write_group(group)
+
+    def _learn_schema(self, rows: list):
+        columns = {}
+        for row in rows:
+            for key in row:
+                columns.setdefault(key, None)
+        self.schema = pa.schema(
+            [
+                pa.field(name, _infer_type([row.get(name) for row in rows]))
+                for name in columns
+            ],
+            metadata={key: str(value) for key, value in self.metadata.items()},
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._writer = pq.ParquetWriter(
+            self.tmp_path, self.schema, compression=self.sink.compression
+        )
+
+    def _column(self, field, values: list):
+        try:
+            if pa.types.is_timestamp(field.type):
+                return pa.array(values, type=pa.string()).cast(field.type)
+            return pa.array(values, type=field.type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            pass
+
+        # Some values do not fit the type learned from the first row group
+        if pa.types.is_timestamp(field.type):
+            converted = [
+                value if value is None else parse_timestamp(value) for value in values
+            ]
+        elif pa.types.is_floating(field.type):
+            converted = [value if value is None else _to_float(value) for value in values]
+        else:
+            converted = [value if value is None else str(value) for value in values]
+        self.mismatched += sum(
+            value is not None and new is None for value, new in zip(values, converted)
+        )
+        return pa.array(converted, type=field.type)
+
+    def _write_group(self, rows: list):
+        if not rows:
+            return
+        if self.schema is None:
+            self._learn_schema(rows)
+
+        extra = set().union(*rows) - set(self.schema.names) - self._dropped_columns
+        if extra:
+            logger.warning(
+                f"Parquet file of {self.table_name} has no column for "
+                f"{sorted(extra)}, dropping them"
+            )
+            self._dropped_columns |= extra
+
+        arrays = [
+            self._column(field, [row.get(field.name) for row in rows])
+            for field in self.schema
+        ]
+        self._writer.write_table(
+            pa.Table.from_arrays(arrays, schema=self.schema),
+            row_group_size=len(rows),
+        )
+        self.rows += len(rows)
+
+    def close(self, success: bool):
+        if success:
+            self._write_group(self._buffer)
+        self._buffer = []
+        if self._writer is not None:
+            self._writer.close()
+
+        if not success:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+            return
+        if self._writer is None:
+            logger.info(f"No rows for {self.table_name}, no parquet file written")
+            return
+
+        # Readers skip dot files, the file only shows up once it is complete
+        os.replace(self.tmp_path, self.path)
+        logger.info(
+            f"Wrote {self.rows:,} rows of {self.table_name} to {self.path}"
+            + (
+                f" ({self.mismatched:,} values did not fit their column type)"
+                if self.mismatched
+                else ""
+            )
+        )
+
+
+class ParquetSink(Sink):
+    """
+    Writes every endpoint load to a compressed Parquet file under
+    <directory>/endpoint=<table>/run_date=<YYYY-MM-DD>/, typed from the
+    cleaned values: numbers as doubles, ISO 8601 text as UTC timestamps and
+    the rest, JSON columns included, as strings. Memory stays at about one
+    row group per endpoint being loaded.
+    """
+
+    name = "parquet"
+
+    def __init__(
+        self,
+        directory: str,
+        row_group_rows: int = 100000,
+        compression: str = "zstd",
+    ):
+        if pa is None:
+            raise ImportError(
+                "The parquet sink needs pyarrow, install it with `uv sync --extra parquet`"
+            )
+        self.directory = directory
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.started = datetime.now(timezone.utc)
+        self.run_id = self.started.strftime("%Y%m%dT%H%M%SZ")
+
+    def open(self, endpoint_config: dict, target_table: str) -> EndpointWriter:
+        table_name = endpoint_config["table_name"]
+        # Named after the load, a long-running process loads an endpoint
+        # more than once per sink
+        opened = datetime.now(timezone.utc)
+        path = os.path.join(
+            self.directory,
+            f"endpoint={table_name}",
+            f"run_date={opened:%Y-%m-%d}",
+            f"{target_table}-{opened:%Y%m%dT%H%M%S%fZ}.parquet",
+        )
+        return ParquetEndpointWriter(
+            self,
+            path,
+            {
+                "table_name": table_name,
+                "target_table": target_table,
+                "endpoint": endpoint_config["endpoint"],
+                "run_id": self.run_id,
+            },
+        )
@@ -0,0 +1,175 @@
+import re
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+import pyodbc
+
+# "NVARCHAR(255)", "DECIMAL(10,2)" or "INT", as returned by
+# Database.get_table_column_types
+_SQL_TYPE = re.compile(r"^(\w+)(?:\((\w+)(?:,(\d+))?\))?$")
+
+# Fractions of a second past microseconds, which some endpoints send
+_SUB_MICROSECONDS = re.compile(r"(\.\d{6})\d+")
+
+_TRUE_STRINGS = frozenset({"true", "1", "yes"})
+_FALSE_STRINGS = frozenset({"false", "0", "no"})
+
+
+def to_text(value):
+    """
+    Text for a character column, numbers without a trailing .0
+    """
+    if value is None or type(value) is str:
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_timestamp(value):
+    """
+    ISO 8601 text as a datetime, or None if it is not a timestamp
+    """
+    try:
+        return datetime.fromisoformat(_SUB_MICROSECONDS.sub(r"\1", value))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_datetime(value):
+    """
+    ISO 8601 text as a naive UTC datetime, or None if it is not a timestamp
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    moment = parse_timestamp(value)
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def to_int(value):
+    if value is None or type(value) is int:
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def to_float(value):
+    if value is None or type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_bit(value):
+    if value is None or type(value) is bool:
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+        return None
+    return bool(value)
+
+
+def to_decimal(value):
+    if value is None:
+        return value
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+# Parameter type, size and decimal digits for setinputsizes, and the
+# converter of the cleaned values, per SQL Server base type
+_INTEGER_TYPES = {
+    "BIGINT": pyodbc.SQL_BIGINT,
+    "INT": pyodbc.SQL_INTEGER,
+    "SMALLINT": pyodbc.SQL_SMALLINT,
+    "TINYINT": pyodbc.SQL_TINYINT,
+}
+_TEXT_TYPES = {
+    "NVARCHAR": pyodbc.SQL_WVARCHAR,
+    "NCHAR": pyodbc.SQL_WVARCHAR,
+    "VARCHAR": pyodbc.SQL_VARCHAR,
+    "CHAR": pyodbc.SQL_VARCHAR,
+}
+
+
+def column_binding(sql_type: str) -> tuple:
+    """
+    The setinputsizes entry and the value converter of a column type, or
+    (None, None) to leave the column to pyodbc
+    """
+    match = _SQL_TYPE.match(sql_type.upper())
+    if match is None:
+        return None, None
+    base, size, scale = match.groups()
+
+    if base in _TEXT_TYPES:
+        # 0 binds (N)VARCHAR(MAX) without a length limit
+        length = 0 if size in (None, "MAX") else int(size)
+        return (_TEXT_TYPES[base], length, 0), to_text
+    if base == "DATETIME2":
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 27, 7), to_datetime
+    if base in ("DATETIME", "SMALLDATETIME"):
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 23, 3), to_datetime
+    if base in _INTEGER_TYPES:
+        return (_INTEGER_TYPES[base], 0, 0), to_int
+    if base == "FLOAT":
+        return (pyodbc.SQL_DOUBLE, 0, 0), to_float
+    if base == "REAL":
+        return (pyodbc.SQL_REAL, 0, 0), to_float
+    if base == "BIT":
+        return (pyodbc.SQL_BIT, 0, 0), to_bit
+    if base in ("DECIMAL", "NUMERIC"):
+        return (pyodbc.SQL_DECIMAL, int(size or 18), int(scale or 0)), to_decimal
+    return None, None
+
+
+class TypedBinding:
+    """
+    Explicit parameter types for an INSERT into a table's columns, and the
+    conversion of cleaned rows into values of those types. Values that do
+    not fit their column (text in an INT column, say) become NULL. With a
+    column type it does not know, input_sizes is None and the driver keeps
+    picking the parameter types.
+    """
+
+    def __init__(self, column_types: dict, columns: list):
+        self.columns = columns
+        bindings = [column_binding(column_types.get(col, "")) for col in columns]
+        self.input_sizes = [size for size, _ in bindings]
+        if None in self.input_sizes:
+            self.input_sizes = None
+        self.converters = [convert for _, convert in bindings]
+
+    def convert(self, values: tuple) -> tuple:
+        return tuple(
+            [
+                value if convert is None else convert(value)
+                for convert, value in zip(self.converters, values)
+            ]
+        )
+
+
+def json_default(value):
+    """
+    Encode the converted datetimes and decimals of a batch for OPENJSON
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
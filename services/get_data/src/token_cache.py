@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Callable, Tuple
+
+from loguru import logger
+
+
+class TokenCache:
+    """
+    Thread-safe cache for the OAuth access token. The token is refreshed in
+    the background `refresh_margin` seconds before it expires, and concurrent
+    401s on the same token trigger a single refresh.
+    """
+
+    def __init__(
+        self,
+        fetch_token: Callable[[], Tuple[str, int]],
+        refresh_margin: float = 300,
+        retry_delay: float = 30,
+    ):
+        self.fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self._token = None
+        self._expires_at = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        """
+        Return a valid token, fetching one only if none is cached
+        """
+        if self._token and time.monotonic() < self._expires_at:
+            return self._token
+
+        with self._lock:
+            if not self._token or time.monotonic() >= self._expires_at:
+                self._refresh()
+            return self._token
+
+    def invalidate(self, stale_token: str) -> str:
+        """
+        Replace a token the API rejected. Callers that saw the same stale
+        token share one refresh.
+        """
+        with self._lock:
+            if self._token == stale_token:
+                self._refresh()
+            return self._token
+
+    def close(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _refresh(self):
+        token, expires_in = self.fetch_token()
+        self._token = token
+        self._expires_at = time.monotonic() + expires_in
+        self._schedule(max(expires_in - self.refresh_margin, expires_in / 2))
+
+    def _schedule(self, delay: float):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            try:
+                self._refresh()
+            except Exception as e:
+                # Keep serving the current token while it is still valid
+                remaining = self._expires_at - time.monotonic()
+                logger.warning(f"Background token refresh failed: {e}")
+                if remaining > self.retry_delay:
+                    self._schedule(self.retry_delay)